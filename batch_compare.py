@@ -0,0 +1,223 @@
+"""Headless PO vs WO comparison over a directory or manifest CSV of document pairs
+
+Usage:
+    python batch_compare.py pairs_dir/ -o results.csv
+    python batch_compare.py manifest.csv -o results.csv --workers 4
+
+A directory is paired by file name: "12345_PO.pdf" goes with "12345_WO.pdf"
+(the PO/WO token may be separated by "_", "-", "." or a space). A manifest CSV
+needs "po" and "wo" columns and may add a "pair" column; relative paths are
+resolved against the manifest's folder.
+"""
+
+import argparse
+import csv
+import logging
+import os
+import re
+import sys
+from typing import List, Tuple
+
+import pandas as pd
+
+from po_wo_comparison import (
+    BACKEND_SCORE_TOLERANCE,
+    GOLDEN_SIMILARITY_PAIRS,
+    MODEL_BACKEND,
+    MODEL_BACKENDS,
+    EmbeddingCache,
+    check_backend_accuracy,
+    compare_fields_batch,
+    format_score_tier_counts,
+    iter_extracted_pairs,
+    load_sentence_model,
+    score_tier_counts,
+)
+from patterns import PATTERNS
+
+logger = logging.getLogger("batch_compare")
+
+RESULT_COLUMNS = ["Pair", "PO File", "WO File", "Field", "WO Value", "PO Value", "Score", "Verdict", "Error"]
+
+DOC_TYPE_TOKEN = re.compile(r"(?:^|(?<=[\s_\-.]))(PO|WO)(?=$|[\s_\-.])", re.IGNORECASE)
+
+def pairs_from_directory(directory: str) -> List[Tuple[str, str, str]]:
+    """(pair, po_path, wo_path) for every PO/WO PDF pair in a directory"""
+    found = {}
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() != ".pdf":
+            continue
+        match = DOC_TYPE_TOKEN.search(stem)
+        if not match:
+            logger.warning(f"Skipping {name}: no PO/WO token in the file name")
+            continue
+        pair = (stem[:match.start()] + stem[match.end():]).strip(" _-.") or stem
+        found.setdefault(pair, {})[match.group(1).upper()] = os.path.join(directory, name)
+
+    pairs = []
+    for pair, docs in found.items():
+        if "PO" in docs and "WO" in docs:
+            pairs.append((pair, docs["PO"], docs["WO"]))
+        else:
+            logger.warning(f"Skipping {pair}: missing {'WO' if 'PO' in docs else 'PO'} file")
+    return pairs
+
+def pairs_from_manifest(manifest: str) -> List[Tuple[str, str, str]]:
+    """(pair, po_path, wo_path) for every row of a manifest CSV"""
+    base = os.path.dirname(os.path.abspath(manifest))
+    pairs = []
+    with open(manifest, newline="", encoding="utf-8-sig") as f:
+        for row_num, row in enumerate(csv.DictReader(f), start=1):
+            row = {key.strip().lower(): (value or "").strip() for key, value in row.items() if key}
+            if not row.get("po") or not row.get("wo"):
+                logger.warning(f"Skipping manifest row {row_num}: 'po' and 'wo' are required")
+                continue
+            po_path = os.path.join(base, row["po"])
+            wo_path = os.path.join(base, row["wo"])
+            pairs.append((row.get("pair") or str(row_num), po_path, wo_path))
+    return pairs
+
+def golden_pairs_from_csv(path: str) -> List[Tuple[str, str]]:
+    """(WO, PO) value pairs from a results CSV of an earlier run, for --check-backend"""
+    results = pd.read_csv(path, dtype=str, keep_default_na=False)
+    missing = [column for column in ("WO Value", "PO Value") if column not in results.columns]
+    if missing:
+        raise ValueError(f"{path} has no {' / '.join(missing)} column; expected a results CSV of batch_compare.py")
+    pairs = []
+    for wo_value, po_value in zip(results["WO Value"], results["PO Value"]):
+        if wo_value and po_value and "Not found" not in (wo_value, po_value):
+            pairs.append((wo_value, po_value))
+    return pairs
+
+def backend_within_tolerance(model, golden: List[Tuple[str, str]], max_drift: float) -> bool:
+    """Score the golden pairs with model and the fp32 model, log the comparison and judge the drift"""
+    reference = load_sentence_model([model.resolved_model_name], "torch")
+    report = check_backend_accuracy(model, reference, golden)
+    logger.info(
+        f"Backend {model.inference_backend} vs fp32 on {report['pairs']} golden pairs: "
+        f"max diff {report['max_score_diff']:.2f}, mean diff {report['mean_score_diff']:.2f} points, "
+        f"verdicts unchanged {report['verdict_agreement']:.0%}, {report['speedup']:.1f}x encode speed"
+    )
+    return report["max_score_diff"] <= max_drift
+
+class ResultWriter:
+    """Appends result rows to the consolidated CSV as batches complete"""
+
+    def __init__(self, output: str):
+        self.output = output
+        self.header = True
+
+    def write(self, rows: List[list]):
+        pd.DataFrame(rows, columns=RESULT_COLUMNS).to_csv(
+            self.output, mode="w" if self.header else "a", header=self.header, index=False
+        )
+        self.header = False
+
+def compare_and_write(extracted: List[tuple], model, embedding_cache, writer: ResultWriter):
+    """One batched comparison (and encode) for a group of extracted pairs"""
+    results = compare_fields_batch([(wo, po) for _, _, _, wo, po in extracted], model, embedding_cache)
+    rows = []
+    for (pair, po_path, wo_path, _, _), results_df in zip(extracted, results):
+        match_count = len([v for v in results_df["Verdict"] if "✅" in v])
+        logger.info(f"{pair}: {match_count}/{len(results_df)} fields matched")
+        for field, wo_value, po_value, score, verdict in results_df.itertuples(index=False):
+            rows.append([pair, po_path, wo_path, field, wo_value, po_value, score, verdict, ""])
+    writer.write(rows)
+
+def run_batch(pairs: List[Tuple[str, str, str]], output: str, model, embedding_cache=None,
+              batch_size: int = 16, workers: int = 1) -> int:
+    """Compare every pair and write one consolidated CSV; returns the number of failed pairs"""
+    writer = ResultWriter(output)
+    failed = 0
+    extracted = []
+
+    # Pairs stream back from the extraction workers and are scored in batches as they arrive
+    for pair, po_path, wo_path, fields, error in iter_extracted_pairs(pairs, workers):
+        if error is not None:
+            logger.error(f"{pair}: extraction failed: {error}")
+            failed += 1
+            writer.write([[pair, po_path, wo_path, "", "", "", "", "❌ Processing error", str(error)]])
+            continue
+        extracted.append((pair, po_path, wo_path, fields["wo_fields"], fields["po_fields"]))
+        if len(extracted) >= batch_size:
+            compare_and_write(extracted, model, embedding_cache, writer)
+            extracted = []
+
+    if extracted:
+        compare_and_write(extracted, model, embedding_cache, writer)
+    if writer.header:
+        writer.write([])
+    return failed
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare PO/WO PDF pairs without the Streamlit UI")
+    parser.add_argument("source", help="directory of *_PO.pdf / *_WO.pdf files, or a manifest CSV")
+    parser.add_argument("-o", "--output", default="po_wo_comparison_results.csv",
+                        help="consolidated results CSV (default: %(default)s)")
+    parser.add_argument("--batch-size", type=int, default=16,
+                        help="pairs compared per batched encode (default: %(default)s)")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="processes used for PDF parsing and field extraction; 0 uses every CPU "
+                             "(default: %(default)s)")
+    parser.add_argument("--model", help="sentence transformer name or path (default: the app's fallback list)")
+    parser.add_argument("--backend", choices=MODEL_BACKENDS, default=MODEL_BACKEND,
+                        help="similarity model inference backend (default: %(default)s, from PO_WO_MODEL_BACKEND)")
+    parser.add_argument("--check-backend", action="store_true",
+                        help="before comparing, score a golden set of field pairs with the backend and the fp32 "
+                             "model and stop if any score moves by more than --max-drift points")
+    parser.add_argument("--golden", help="results CSV of an earlier run to use as the golden set "
+                                         "(default: a built-in set of field pairs)")
+    parser.add_argument("--max-drift", type=float, default=BACKEND_SCORE_TOLERANCE,
+                        help="largest accepted semantic score change for --check-backend (default: %(default)s)")
+    parser.add_argument("--no-embedding-cache", action="store_true",
+                        help="do not read or write the persistent embedding cache")
+    parser.add_argument("--pattern-stats", action="store_true",
+                        help="log how often each extraction pattern matched")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    if os.path.isdir(args.source):
+        pairs = pairs_from_directory(args.source)
+    else:
+        pairs = pairs_from_manifest(args.source)
+    if not pairs:
+        logger.error(f"No PO/WO pairs found in {args.source}")
+        return 1
+    # The golden set is checked before any model is loaded for it
+    if args.check_backend:
+        try:
+            golden = golden_pairs_from_csv(args.golden) if args.golden else GOLDEN_SIMILARITY_PAIRS
+        except (OSError, ValueError) as e:
+            logger.error(f"Cannot read the golden set: {e}")
+            return 1
+        if not golden:
+            logger.error(f"No usable golden pairs in {args.golden}: no row has both a WO and a PO value")
+            return 1
+
+    # The model is loaded once for the whole run
+    if args.model:
+        model = load_sentence_model([args.model], args.backend)
+    else:
+        model = load_sentence_model(backend=args.backend)
+    logger.info(f"Comparing {len(pairs)} pairs with {model.resolved_model_name} ({args.backend})")
+    if args.check_backend:
+        if not backend_within_tolerance(model, golden, args.max_drift):
+            logger.error(f"Backend {args.backend} drifts more than {args.max_drift} points from fp32; not comparing")
+            return 1
+    embedding_cache = None if args.no_embedding_cache else EmbeddingCache()
+
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    failed = run_batch(pairs, args.output, model, embedding_cache, max(1, args.batch_size), workers)
+    logger.info(f"Wrote {args.output} ({len(pairs) - failed} compared, {failed} failed)")
+    logger.info(f"Scoring tiers: {format_score_tier_counts(score_tier_counts())}")
+    if embedding_cache:
+        logger.info(f"Embedding cache: {embedding_cache.stats()}")
+    if args.pattern_stats:
+        for name, hits in sorted(PATTERNS.hit_counts().items(), key=lambda x: -x[1]):
+            logger.info(f"Pattern {name}: {hits} hits")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,8 @@ import threading
 import webbrowser
 import time
 
+from embedding_server import ensure_embedding_server
+
 # -----------------------------
 # Configuration
 st.set_page_config(page_title="Care Labels Dashboard - ITL", layout="wide")
@@ -73,8 +75,10 @@ def open_new_script():
     new_py_path = os.path.join(base_path, "new.py")
 
     if os.path.exists(new_py_path):
+        # new.py encodes through one shared model server instead of loading its own model
+        env = dict(os.environ, PO_WO_EMBEDDING_SERVER=ensure_embedding_server())
         def run_script():
-            subprocess.run([sys.executable, "-m", "streamlit", "run", new_py_path, "--server.port", "8506"])
+            subprocess.run([sys.executable, "-m", "streamlit", "run", new_py_path, "--server.port", "8506"], env=env)
         threading.Thread(target=run_script, daemon=True).start()
         time.sleep(3)  # Wait for server to start
         webbrowser.open_new_tab("http://localhost:8506")
@@ -0,0 +1,325 @@
+"""Shared embedding server: one sentence transformer per host for every app process
+
+Usage:
+    python embedding_server.py                      # http://127.0.0.1:8765
+    python embedding_server.py --port 8800 --backend int8
+
+The server loads the model once (same resolution as the app: PO_WO_MODEL_DIRS, the
+model registry, then the built-in fallbacks) and answers POST /encode with float32
+vectors. Requests arriving within --coalesce-ms of each other are merged into one
+model.encode batch. Apps use it when PO_WO_EMBEDDING_SERVER is set to its URL;
+care_dashboard.py starts it on demand before launching new.py.
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger("embedding_server")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# URL of the shared server; apps load their own model when it is unset
+EMBEDDING_SERVER_URL = os.environ.get("PO_WO_EMBEDDING_SERVER", "")
+# How long a client waits for a server that is still loading its model
+EMBEDDING_SERVER_WAIT = float(os.environ.get("PO_WO_EMBEDDING_SERVER_WAIT", "60"))
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+SERVER_LOG_PATH = os.path.join(os.path.expanduser("~"), ".cache", "po_wo_comparison", "embedding_server.log")
+
+# ======================
+# SERVER
+# ======================
+
+class EncodeBatcher:
+    """Coalesces concurrent encode requests into shared model.encode batches"""
+
+    def __init__(self, model, max_batch: int = 512, coalesce_seconds: float = 0.01):
+        self.model = model
+        self.max_batch = max_batch
+        self.coalesce_seconds = coalesce_seconds
+        self.dimension = int(model.encode(["dimension probe"], convert_to_numpy=True, show_progress_bar=False).shape[1])
+        self.requests = 0
+        self.batches = 0
+        self.texts_encoded = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, name="encode-batcher", daemon=True).start()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Vectors for texts, encoded together with whatever other requests are waiting"""
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        future = Future()
+        self._queue.put((texts, future))
+        return future.result()
+
+    def _next_batch(self) -> list:
+        """The oldest waiting request plus any that arrive within the coalescing window"""
+        pending = [self._queue.get()]
+        count = len(pending[0][0])
+        deadline = time.monotonic() + self.coalesce_seconds
+        while count < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                pending.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+            count += len(pending[-1][0])
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._next_batch()
+            # Texts shared between requests are encoded once
+            unique_texts = list(dict.fromkeys(text for texts, _ in pending for text in texts))
+            try:
+                vectors = dict(zip(unique_texts, self.model.encode(unique_texts, convert_to_numpy=True, show_progress_bar=False)))
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            for texts, future in pending:
+                future.set_result(np.stack([vectors[text] for text in texts]).astype(np.float32))
+            with self._lock:
+                self.requests += len(pending)
+                self.batches += 1
+                self.texts_encoded += len(unique_texts)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"requests": self.requests, "batches": self.batches, "texts_encoded": self.texts_encoded}
+
+class EmbeddingRequestHandler(BaseHTTPRequestHandler):
+    """GET /info describes the model; POST /encode {"texts": [...]} returns float32 vectors"""
+
+    server_version = "POWOEmbedding/1.0"
+
+    def do_GET(self):
+        if self.path != "/info":
+            self.send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        model = self.server.model
+        self.send_json(200, {
+            "model": model.resolved_model_name,
+            "backend": model.inference_backend,
+            "dimension": self.server.batcher.dimension,
+            "load_seconds": model.load_seconds,
+            "stats": self.server.batcher.stats(),
+        })
+
+    def do_POST(self):
+        if self.path != "/encode":
+            self.send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_REQUEST_BYTES:
+            self.send_json(413, {"error": f"Request larger than {MAX_REQUEST_BYTES} bytes"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(length))
+            texts = payload.get("texts") if isinstance(payload, dict) else None
+            if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                raise ValueError('expected {"texts": [list of strings]}')
+        except ValueError as e:
+            self.send_json(400, {"error": f"Bad encode request: {e}"})
+            return
+        try:
+            vectors = self.server.batcher.encode(texts)
+        except Exception as e:
+            logger.exception("Encode failed")
+            self.send_json(500, {"error": f"Encode failed: {e}"})
+            return
+        body = np.ascontiguousarray(vectors, dtype="<f4").tobytes()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-Embedding-Shape", f"{vectors.shape[0]},{vectors.shape[1]}")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+class EmbeddingServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the model and its EncodeBatcher"""
+
+    daemon_threads = True
+    model = None
+    batcher = None
+
+    def handle_error(self, request, client_address):
+        # A client that gave up (e.g. a probe that timed out while the model loaded) is not a server error
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            logger.debug(f"{client_address[0]} disconnected before the reply")
+            return
+        super().handle_error(request, client_address)
+
+def bind_server(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> EmbeddingServer:
+    """Listening server; model and batcher are attached once the model has loaded"""
+    return EmbeddingServer((host, port), EmbeddingRequestHandler)
+
+# ======================
+# CLIENT
+# ======================
+
+def server_info(url: str, timeout: float = 2.0) -> dict:
+    with urllib.request.urlopen(f"{url.rstrip('/')}/info", timeout=timeout) as response:
+        return json.loads(response.read())
+
+class RemoteEmbeddingModel:
+    """Stands in for the SentenceTransformer in the comparison, encoding through an embedding server
+
+    Carries the served model's name and backend, so cached embeddings are shared with
+    processes that load the same model themselves. A server that stops answering is
+    reconnected to once per encode; when that fails too, lost is set and ConnectionError raised.
+    """
+
+    def __init__(self, url: str, info: dict, timeout: float = 120.0):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.lost = False
+        self.skipped_models = []
+        self._use_info(info)
+
+    def _use_info(self, info: dict):
+        self.resolved_model_name = info["model"]
+        self.inference_backend = info["backend"]
+        self.dimension = info["dimension"]
+        self.load_seconds = info["load_seconds"]
+
+    def encode(self, sentences, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        """Vectors for a list of texts (or one vector for a single text), like SentenceTransformer.encode"""
+        texts = [sentences] if isinstance(sentences, str) else list(sentences)
+        try:
+            vectors = self._post_encode(texts)
+        except OSError as e:
+            # Connection refused, reset or timed out (HTTP errors are raised as RuntimeError): the server died or restarted: wait for one to answer on the same URL and retry once
+            logger.warning(f"Embedding server {self.url} did not answer ({getattr(e, 'reason', e)}); reconnecting")
+            try:
+                self._use_info(wait_for_server(self.url))
+                vectors = self._post_encode(texts)
+            except OSError as retry_error:
+                self.lost = True
+                raise ConnectionError(f"Embedding server {self.url} is unavailable: "
+                                      f"{getattr(retry_error, 'reason', retry_error)}") from retry_error
+        return vectors[0] if isinstance(sentences, str) else vectors
+
+    def _post_encode(self, texts: List[str]) -> np.ndarray:
+        request = urllib.request.Request(
+            f"{self.url}/encode",
+            data=json.dumps({"texts": texts}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                rows, dimension = (int(n) for n in response.headers["X-Embedding-Shape"].split(","))
+                return np.frombuffer(response.read(), dtype="<f4").reshape(rows, dimension)
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(f"Embedding server error {e.code}: {e.read().decode('utf-8', 'replace')}") from e
+
+def wait_for_server(url: str, wait: float = EMBEDDING_SERVER_WAIT) -> dict:
+    """server_info of the server at url, waiting up to wait seconds for one that is still loading its model"""
+    deadline = time.monotonic() + wait
+    while True:
+        try:
+            # A server still loading its model answers once it is ready, so wait for the reply
+            return server_info(url, timeout=max(2.0, deadline - time.monotonic()))
+        except (OSError, ValueError) as e:
+            if time.monotonic() >= deadline:
+                raise ConnectionError(f"No embedding server answering at {url}: {e}") from e
+            time.sleep(0.5)
+
+def connect_embedding_server(url: str = EMBEDDING_SERVER_URL, wait: float = EMBEDDING_SERVER_WAIT) -> RemoteEmbeddingModel:
+    """Client for the server at url, waiting up to wait seconds for one that is still loading its model"""
+    return RemoteEmbeddingModel(url, wait_for_server(url, wait))
+
+def ensure_embedding_server(url: Optional[str] = None) -> str:
+    """URL of a running local embedding server, starting one in the background if none answers"""
+    url = url or EMBEDDING_SERVER_URL or f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"
+    try:
+        server_info(url, timeout=0.5)
+        return url
+    except TimeoutError:
+        # Connected but no reply yet: a server that is still loading its model
+        return url
+    except (OSError, ValueError):
+        pass
+
+    port = urllib.parse.urlsplit(url).port or DEFAULT_PORT
+    os.makedirs(os.path.dirname(SERVER_LOG_PATH), exist_ok=True)
+    with open(SERVER_LOG_PATH, "ab") as log:
+        # Detached so it outlives the launcher and keeps serving the apps it started
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--port", str(port)],
+            stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    logger.info(f"Started embedding server on port {port}; log in {SERVER_LOG_PATH}")
+    return url
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve sentence embeddings to every PO/WO app process on this host")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="address to bind (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on (default: %(default)s)")
+    parser.add_argument("--model", help="sentence transformer name or path (default: the app's model resolution)")
+    parser.add_argument("--backend", help="similarity model inference backend (default: PO_WO_MODEL_BACKEND or torch)")
+    parser.add_argument("--max-batch", type=int, default=512,
+                        help="most texts merged into one encode call (default: %(default)s)")
+    parser.add_argument("--coalesce-ms", type=float, default=10.0,
+                        help="how long a request waits for others to share its batch (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    # Imported here so launchers can start or reach the server without loading the extraction stack
+    from po_wo_comparison import MODEL_BACKEND, load_sentence_model
+
+    backend = args.backend or MODEL_BACKEND
+    # Bound before the model loads, so a second server started for the same port exits at once
+    try:
+        server = bind_server(args.host, args.port)
+    except OSError as e:
+        logger.error(f"Cannot listen on {args.host}:{args.port}: {e}")
+        return 1
+    try:
+        model = load_sentence_model([args.model] if args.model else None, backend)
+        server.model = model
+        server.batcher = EncodeBatcher(model, max(1, args.max_batch), args.coalesce_ms / 1000)
+    except Exception:
+        server.server_close()
+        raise
+    logger.info(f"Serving {model.resolved_model_name} ({backend}) on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,26 @@
 
 
+import time
+_SCRIPT_START = time.perf_counter()
+
 import streamlit as st
-import pdfplumber
-import pandas as pd
-import re
-from sentence_transformers import SentenceTransformer, util
-from rapidfuzz import fuzz
 import os
+import sys
 import logging
-from typing import Dict, List, Tuple, Optional
-import PyPDF2
-import fitz  # PyMuPDF as fallback
 import warnings
-import email
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet
 from email import policy
-from bs4 import BeautifulSoup
+from email.parser import BytesFeedParser
 import io
-from PyPDF2 import PdfMerger
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from patterns import PATTERNS, EMAIL_FIELD_SCANNER
+
+# Heavy dependencies (pandas, pdfplumber, reportlab, bs4, PyMuPDF, PyPDF2, sentence_transformers)
+# are imported inside the tool or function that needs them, so the Email & PO Merger
+# page never loads the comparison stack.
 
 # ======================
 # HELPER FUNCTIONS
@@ -46,62 +47,24 @@ def clean_text(text):
     """Remove HTML tags and special characters"""
     if not text:
         return ""
-    clean = re.sub(r'<[^>]+>', '', str(text))
-    clean = re.sub(r'\s+', ' ', clean).strip()
+    clean = PATTERNS["email.html_tag"].sub('', str(text))
+    clean = PATTERNS["text.whitespace"].sub(' ', clean).strip()
     return clean
 
-def clean_quantity(quantity_str):
-    """Clean quantity string by removing commas and converting to float"""
-    try:
-        return float(quantity_str.replace(',', ''))
-    except (ValueError, AttributeError):
-        return 0.0
-
-def extract_style_numbers_from_po_first_page(pdf_file):
-    """Extract style numbers from the first page of PO"""
-    try:
-        pdf_file.seek(0)
-        with pdfplumber.open(pdf_file) as pdf:
-            first_page = pdf.pages[0]
-            text = first_page.extract_text() or ""
-            # Look for style number patterns
-            style_patterns = [
-                r'Style\s*[:\-]?\s*([A-Z0-9\-]+)',
-                r'Style\s*No\s*[:\-]?\s*([A-Z0-9\-]+)',
-                r'Item\s*Style\s*[:\-]?\s*([A-Z0-9\-]+)',
-            ]
-            for pattern in style_patterns:
-                matches = re.findall(pattern, text, re.IGNORECASE)
-                if matches:
-                    return [match.strip().upper() for match in matches]
-    except Exception as e:
-        logging.warning(f"Error extracting style numbers: {e}")
-    return []
-
-def extract_size_from_po_line(line):
-    """Extract size from PO line by finding the last slash and reading the string before it"""
-    valid_sizes = ['XXS', 'XS', 'S', 'M', 'L', 'XL', 'XXL', 'XXXL']
-    # Find the last slash in the line
-    last_slash_index = line.rfind('/')
-    if last_slash_index != -1:
-        # Get the part before the last slash
-        before_last_slash = line[:last_slash_index].strip()
-        # Split by spaces and get the last token
-        tokens = before_last_slash.split()
-        if tokens:
-            size_candidate = tokens[-1].upper()
-            if size_candidate in valid_sizes:
-                return size_candidate
-    return None
-
 # ======================
 # EMAIL & PO MERGER FUNCTIONS
 # ======================
 
+EML_READ_CHUNK = 1024 * 1024
+
 def extract_email_content(eml_file_stream):
     """Extract email body and PDF attachments"""
+    # Fed in chunks straight from the upload's buffer, never as one decoded copy of the whole file
     eml_file_stream.seek(0)
-    msg = email.message_from_bytes(eml_file_stream.read(), policy=policy.default)
+    parser = BytesFeedParser(policy=policy.default)
+    for chunk in iter(lambda: eml_file_stream.read(EML_READ_CHUNK), b""):
+        parser.feed(chunk)
+    msg = parser.close()
    
     email_body = None
     pdf_attachments = []
@@ -141,68 +104,38 @@ def extract_fields(email_body):
     # Remove HTML and clean text for better matching
     clean_body = clean_text(email_body)
    
-    # Enhanced COO patterns - more flexible
-    coo_patterns = [
-        r'COO[:\s]*([A-Za-z]{2,}(?:\s+[A-Za-z]+)*)',  # COO: CHINA or COO VIETNAM
-        r'Country\s*of\s*Origin[:\s]*([A-Za-z\s]+?)(?:\n|<br|$|;|,)',
-        r'Made\s*in[:\s]*([A-Za-z\s]+?)(?:\n|<br|$|;|,)',
-        r'Origin[:\s]*([A-Za-z\s]+?)(?:\n|<br|$|;|,)',
-        r'Country[:\s]*([A-Za-z\s]+?)(?:\n|<br|$|;|,)',
-        r'COO\s*=\s*([A-Za-z\s]+?)(?:\n|<br|$|;|,)',
-    ]
+    # COO and Factory Code patterns live in patterns.py, in priority order
+    coo_patterns = PATTERNS.group("email.coo")
+    factory_patterns = PATTERNS.group("email.factory")
    
-    # Ultra-comprehensive Factory Code patterns
-    factory_patterns = [
-        # Direct patterns
-        r'Factory\s*Code[:\s=]*([^\n\r<>,;|\s]+)',
-        r'Factory\s*ID[:\s=]*([^\n\r<>,;|\s]+)',
-        r'Factory[:\s=]+([A-Za-z0-9\-_.]+)',
-        r'Supplier\s*Code[:\s=]*([^\n\r<>,;|\s]+)',
-        r'Supplier[:\s=]+([A-Za-z0-9\-_.]+)',
-        r'Plant\s*Code[:\s=]*([^\n\r<>,;|\s]+)',
-        r'Plant\s*ID[:\s=]*([^\n\r<>,;|\s]+)',
-        r'Vendor\s*Code[:\s=]*([^\n\r<>,;|\s]+)',
-        r'Vendor\s*ID[:\s=]*([^\n\r<>,;|\s]+)',
-        r'Vendor[:\s=]+([A-Za-z0-9\-_.]+)',
-        r'Mfg\s*Code[:\s=]*([^\n\r<>,;|\s]+)',
-        r'Mfg[:\s=]+([A-Za-z0-9\-_.]+)',
-        r'Manufacturer[:\s=]+([A-Za-z0-9\-_.]+)',
-        r'Manufacturing\s*Code[:\s=]*([^\n\r<>,;|\s]+)',
-        r'Production\s*Code[:\s=]*([^\n\r<>,;|\s]+)',
-        r'Mill\s*Code[:\s=]*([^\n\r<>,;|\s]+)',
-        r'Site\s*Code[:\s=]*([^\n\r<>,;|\s]+)',
-        r'Location[:\s=]+([A-Za-z0-9\-_.]+)',
-        # Special patterns for different formats
-        r'F\s*C[:\s=]*([A-Za-z0-9\-_.]+)',  # FC: code
-        r'FC[:\s=]*([A-Za-z0-9\-_.]+)',     # FC: code
-        r'(?:^|\n)([A-Z0-9]{3,}[-_][A-Z0-9]{2,})',  # Stand-alone codes like ABC-123
-        r'(?:^|\n)([A-Z]{2,}[0-9]{2,})',    # Codes like ABC123
-    ]
+    # Each pattern is tried only where its leading keyword occurs, still in priority
+    # order, instead of a full regex pass over the body per pattern
+    scan = EMAIL_FIELD_SCANNER.scan(clean_body)
    
     def find_coo_pattern(patterns):
         for pattern in patterns:
-            matches = re.finditer(pattern, clean_body, re.IGNORECASE | re.MULTILINE)
+            matches = scan.finditer(pattern)
             for match in matches:
                 value = match.group(1).strip()
-                value = re.sub(r'\s+', ' ', value)
+                value = PATTERNS["text.whitespace"].sub(' ', value)
                
                 if value and value.lower() not in ['', 'n/a', 'null', 'none', 'tbd', 'na']:
-                    if len(value) >= 2 and re.search(r'[A-Za-z]', value):
+                    if len(value) >= 2 and PATTERNS["email.has_letter"].search(value):
                         return value
         return None
    
     def find_factory_pattern(patterns):
         for pattern in patterns:
-            matches = re.finditer(pattern, clean_body, re.IGNORECASE | re.MULTILINE)
+            matches = scan.finditer(pattern)
             for match in matches:
                 value = match.group(1).strip()
-                value = re.sub(r'\s+', ' ', value)
+                value = PATTERNS["text.whitespace"].sub(' ', value)
                
                 # More lenient validation for factory codes
                 if value and len(value.strip()) >= 2:
                     if value.lower() not in ['', 'n/a', 'null', 'none', 'tbd', 'na', 'not', 'applicable']:
                         # Accept if it has letters or numbers
-                        if re.search(r'[A-Za-z0-9]', value):
+                        if PATTERNS["email.has_alnum"].search(value):
                             return value
         return None
    
@@ -230,7 +163,7 @@ def extract_fields(email_body):
                            
                             if any(keyword in key for keyword in factory_keywords):
                                 if value and len(value.strip()) >= 2:
-                                    if re.search(r'[A-Za-z0-9]', value):
+                                    if PATTERNS["email.has_alnum"].search(value):
                                         fields['Factory Code'] = value
                                         break
                 if fields['Factory Code']:
@@ -239,14 +172,8 @@ def extract_fields(email_body):
         # Method 2: Look for standalone alphanumeric codes
         if not fields['Factory Code']:
             # Find patterns like "ABC123", "XYZ-456", etc.
-            standalone_patterns = [
-                r'(?:^|\s)([A-Z]{2,}[0-9]{2,})(?:\s|$)',  # ABC123
-                r'(?:^|\s)([A-Z0-9]{3,}[-_][A-Z0-9]{2,})(?:\s|$)',  # ABC-123
-                r'(?:^|\s)([A-Z]{3,}[-_][0-9]{2,})(?:\s|$)',  # ABC-123
-            ]
-           
-            for pattern in standalone_patterns:
-                match = re.search(pattern, clean_body, re.MULTILINE)
+            for pattern in PATTERNS.group("email.factory_standalone"):
+                match = pattern.search(clean_body)
                 if match:
                     candidate = match.group(1).strip()
                     # Avoid common false positives
@@ -257,16 +184,11 @@ def extract_fields(email_body):
         # Method 3: Look in table cells or structured data
         if not fields['Factory Code']:
             # Try to find in table-like structures or key-value pairs
-            table_patterns = [
-                r'(?:Factory|Supplier|Vendor|Plant|Mfg).*?([A-Za-z0-9\-_.]{3,})',
-                r'([A-Za-z0-9\-_.]{3,}).*?(?:Factory|Supplier|Vendor|Plant)',
-            ]
-           
-            for pattern in table_patterns:
-                match = re.search(pattern, clean_body, re.IGNORECASE)
+            for pattern in PATTERNS.group("email.factory_table"):
+                match = pattern.search(clean_body)
                 if match:
                     candidate = match.group(1).strip()
-                    if len(candidate) >= 3 and re.search(r'[A-Za-z0-9]', candidate):
+                    if len(candidate) >= 3 and PATTERNS["email.has_alnum"].search(candidate):
                         fields['Factory Code'] = candidate
                         break
    
@@ -281,6 +203,7 @@ def extract_tables(email_body):
     # HTML tables
     if '<table' in email_body.lower():
         try:
+            from bs4 import BeautifulSoup
             soup = BeautifulSoup(email_body, 'html.parser')
             html_tables = soup.find_all('table')
            
@@ -307,10 +230,30 @@ def extract_tables(email_body):
    
     return tables
 
-def create_merged_pdf(fields, tables, pdf_attachments):
-    """Create merged PDF with email data and attachments"""
-    email_buffer = io.BytesIO()
-    doc = SimpleDocTemplate(email_buffer, pagesize=letter)
+def append_pdf(output_path, pdf_buffer):
+    """Append a PDF's pages to the PDF file at output_path as an incremental update"""
+    import fitz  # PyMuPDF
+   
+    # PyMuPDF reads the attachment's buffer in place through the view, without a bytes copy
+    with pdf_buffer.getbuffer() as data, fitz.open(stream=data, filetype="pdf") as attachment, \
+            fitz.open(output_path) as merged:
+        if not attachment.page_count:
+            raise ValueError("no readable pages")
+        # Page objects are copied as they are; content streams are not decoded or re-encoded
+        merged.insert_pdf(attachment)
+        merged.save(output_path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+
+def create_merged_pdf(fields, tables, pdf_attachments, output_path):
+    """Create merged PDF with email data and attachments in output_path
+
+    The cover sheet is rendered straight into the file and each attachment is appended
+    with an incremental save, so only one attachment is held in memory at a time.
+    """
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    doc = SimpleDocTemplate(output_path, pagesize=letter)
     styles = getSampleStyleSheet()
     story = []
    
@@ -355,1272 +298,23 @@ def create_merged_pdf(fields, tables, pdf_attachments):
         return None
    
     # Merge with attachments
-    merger = PdfMerger()
-    email_buffer.seek(0)
-    merger.append(email_buffer)
-   
     for filename, pdf_buffer in pdf_attachments:
         try:
-            pdf_buffer.seek(0)
-            merger.append(pdf_buffer)
+            append_pdf(output_path, pdf_buffer)
         except Exception as e:
             st.warning(f"Could not merge {filename}: {str(e)}")
    
-    final_buffer = io.BytesIO()
-    merger.write(final_buffer)
-    merger.close()
-    final_buffer.seek(0)
-   
-    return final_buffer
-
-# ======================
-# PO vs WO COMPARISON FUNCTIONS
-# ======================
-
-def extract_po_details(pdf_file):
-    """Enhanced function to handle multiple PO formats with quantity aggregation"""
-    pdf_file.seek(0)
-    extracted_styles = extract_style_numbers_from_po_first_page(pdf_file)
-    repeated_style = extracted_styles[0] if extracted_styles else ""
-    pdf_file.seek(0)
-    with pdfplumber.open(pdf_file) as pdf:
-        text = "\n".join(page.extract_text() or "" for page in pdf.pages)
-        lines = [ln.strip() for ln in text.split("\n") if ln.strip()]
-    has_tag_format = "TAG.PRC.TKT_" in text and "Color/Size/Destination :" in text
-    has_original_format = any("Colour/Size/Destination:" in line for line in lines) or re.search(r"Sup\.?\s*Ref\.?\s*[:\-]?\s*([A-Z]+[-\s]?\d+)", text, re.IGNORECASE)
-    po_items = []
-    item_dict = {}  # Dictionary to aggregate quantities by size, color, and style
-   
-    if has_tag_format and not has_original_format:
-        # NEW FORMAT HANDLING
-        tag_match = re.search(r"TAG\.PRC\.TKT_(.*?)_REG", text)
-        product_code_used = tag_match.group(1).strip().upper() if tag_match else ""
-       
-        product_code_used = product_code_used.replace("-", " ")
-       
-        i = 0
-        while i < len(lines):
-            line = lines[i]
-            # Updated regex to handle quantities with commas
-            item_match = re.match(r'^(\d+)\s+TAG\.PRC\.TKT_.*?([\d,]+\.\d+)\s+PCS', line)
-            if item_match:
-                item_no = item_match.group(1)
-                quantity_str = item_match.group(2)
-                quantity = clean_quantity(quantity_str)  # Using updated function
-               
-                colour = size = ""
-                for j in range(i + 1, min(i + 5, len(lines))):
-                    next_line = lines[j]
-                    if "Color/Size/Destination :" in next_line:
-                        cs_part = next_line.split(":", 1)[1].strip()
-                        cs_parts = [part.strip() for part in cs_part.split(" / ") if part.strip()]
-                       
-                        if len(cs_parts) >= 2:
-                            colour_part = cs_parts[0].strip()
-                            colour = colour_part.split()[0] if colour_part else ""
-                            size = cs_parts[1].strip().upper()
-                        break
-               
-                item_key = (size, colour.upper() if colour else "", repeated_style)
-               
-                if item_key in item_dict:
-                    item_dict[item_key]["Quantity"] += quantity
-                else:
-                    item_dict[item_key] = {
-                        "Item_Number": item_no,
-                        "Item_Code": f"TAG_{product_code_used}",
-                        "Quantity": quantity,
-                        "Colour_Code": colour.upper() if colour else "",
-                        "Size": size,
-                        "Style 2": repeated_style,
-                        "Product_Code": product_code_used,
-                    }
-            i += 1
-    else:
-        # ORIGINAL FORMAT HANDLING
-        sup_ref_match = re.search(r"Sup\.?\s*Ref\.?\s*[:\-]?\s*([A-Z]+[-\s]?\d+)", text, re.IGNORECASE)
-        sup_ref_code = sup_ref_match.group(1).strip().upper() if sup_ref_match else ""
-       
-        sup_ref_code = sup_ref_code.replace("-", " ")
-        tag_code = ""
-        for i, line in enumerate(lines):
-            if "Item Description" in line:
-                if i + 2 < len(lines):
-                    second_line = lines[i + 2]
-                    match = re.search(r"TAG\.PRC\.TKT_(.*?)_REG", second_line)
-                    if match:
-                        tag_code = match.group(1).strip().upper()
-                        tag_code = tag_code.replace("-", " ")
-                break
-        product_code_used = sup_ref_code if sup_ref_code else tag_code
-       
-        for i, line in enumerate(lines):
-            # Updated regex to handle quantities with commas
-            item_match = re.match(r'^(\d+)\s+([A-Z0-9]+)\s+(\d+)\s+([\d,]+\.\d+)\s+PCS', line)
-            if item_match:
-                item_no, item_code, _, qty_str = item_match.groups()
-                quantity = clean_quantity(qty_str)  # Using updated function
-                colour = size = ""
-               
-                # Try to extract size from the third line (i+3)
-                if i + 3 < len(lines):
-                    size = extract_size_from_po_line(lines[i + 3])
-               
-                # Extract colour from the "Colour/Size/Destination:" line
-                for j in range(i + 1, min(i + 10, len(lines))):
-                    ln = lines[j]
-                    if "Colour/Size/Destination:" in ln:
-                        cs = ln.split(":", 1)[1].strip()
-                        size_keywords = ["XS", "S", "M", "L", "XL", "XXL", "XXXL", "XXG", "P", "G"]
-                        parts = [p.strip() for p in cs.split("/") if p.strip()]
-                       
-                        if parts:
-                            # Extract colour
-                            if len(parts) > 0:
-                                colour = parts[0].strip().split()[0].strip().upper()
-                           
-                            # If we haven't found size yet, try to extract it from this line
-                            if not size:
-                                size_part = parts[0].split("|")[0].strip().upper()
-                                if size_part in size_keywords:
-                                    size = size_part
-                                else:
-                                    # Try to find size in the parts
-                                    for part in parts:
-                                        part_upper = part.upper()
-                                        for keyword in size_keywords:
-                                            if keyword in part_upper:
-                                                size = keyword
-                                                break
-                                        if size:
-                                            break
-                           
-                            # If still no size, try to find it with regex
-                            if not size:
-                                size_match = re.search(r'\b(' + '|'.join(size_keywords) + r')\b', cs, re.IGNORECASE)
-                                if size_match:
-                                    size = size_match.group(1).upper()
-                        break
-               
-                item_key = (size.upper() if size else "", colour.upper() if colour else "", repeated_style)
-               
-                if item_key in item_dict:
-                    item_dict[item_key]["Quantity"] += quantity
-                else:
-                    item_dict[item_key] = {
-                        "Item_Number": item_no,
-                        "Item_Code": item_code,
-                        "Quantity": quantity,
-                        "Colour_Code": (colour or "").strip().upper(),
-                        "Size": (size or "").strip().upper(),
-                        "Style 2": repeated_style,
-                        "Product_Code": product_code_used,
-                    }
-   
-    po_items = list(item_dict.values())
-    return po_items
-
-def extract_text_advanced(file) -> Tuple[str, Dict[str, str]]:
-    """Advanced PDF text extraction with multiple fallback methods"""
-    extraction_info = {
-        "method": "unknown",
-        "pages": 0,
-        "tables_found": 0,
-        "images_found": 0,
-        "extraction_quality": "unknown"
-    }
-   
-    try:
-        # Method 1: pdfplumber (best for structured data)
-        text_pdfplumber = extract_with_pdfplumber(file, extraction_info)
-        if text_pdfplumber and len(text_pdfplumber.strip()) > 100:
-            extraction_info["method"] = "pdfplumber"
-            extraction_info["extraction_quality"] = "high"
-            return text_pdfplumber, extraction_info
-    except Exception as e:
-        logger.warning(f"pdfplumber extraction failed: {e}")
-   
-    try:
-        # Method 2: PyMuPDF (good for complex layouts)
-        text_pymupdf = extract_with_pymupdf(file, extraction_info)
-        if text_pymupdf and len(text_pymupdf.strip()) > 100:
-            extraction_info["method"] = "pymupdf"
-            extraction_info["extraction_quality"] = "medium"
-            return text_pymupdf, extraction_info
-    except Exception as e:
-        logger.warning(f"PyMuPDF extraction failed: {e}")
-   
-    try:
-        # Method 3: PyPDF2 (basic fallback)
-        text_pypdf2 = extract_with_pypdf2(file, extraction_info)
-        if text_pypdf2 and len(text_pypdf2.strip()) > 50:
-            extraction_info["method"] = "pypdf2"
-            extraction_info["extraction_quality"] = "low"
-            return text_pypdf2, extraction_info
-    except Exception as e:
-        logger.warning(f"PyPDF2 extraction failed: {e}")
-   
-    extraction_info["method"] = "failed"
-    extraction_info["extraction_quality"] = "failed"
-    return "Text extraction failed", extraction_info
-
-def extract_with_pdfplumber(file, extraction_info: Dict) -> str:
-    """Extract text using pdfplumber with table detection"""
-    file.seek(0)
-    texts = []
-    tables_found = 0
-   
-    with pdfplumber.open(file) as pdf:
-        extraction_info["pages"] = len(pdf.pages)
-       
-        for page_num, page in enumerate(pdf.pages):
-            # Extract regular text
-            page_text = page.extract_text()
-            if page_text:
-                texts.append(f"--- Page {page_num + 1} ---\n{page_text}")
-           
-            # Extract tables
-            tables = page.extract_tables()
-            if tables:
-                tables_found += len(tables)
-                for table_num, table in enumerate(tables):
-                    table_text = f"\n--- Table {table_num + 1} on Page {page_num + 1} ---\n"
-                    for row in table:
-                        if row:
-                            table_text += " | ".join([str(cell) if cell else "" for cell in row]) + "\n"
-                    texts.append(table_text)
-   
-    extraction_info["tables_found"] = tables_found
-    return "\n".join(texts).strip()
-
-def extract_with_pymupdf(file, extraction_info: Dict) -> str:
-    """Extract text using PyMuPDF (fitz)"""
-    file.seek(0)
-    doc = fitz.open(stream=file.read(), filetype="pdf")
-    texts = []
-   
-    extraction_info["pages"] = len(doc)
-   
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-       
-        # Extract text with layout preservation
-        text = page.get_text("text")
-        if text.strip():
-            texts.append(f"--- Page {page_num + 1} ---\n{text}")
-       
-        # Extract text blocks (better structure)
-        blocks = page.get_text("blocks")
-        if blocks:
-            block_text = f"\n--- Structured Page {page_num + 1} ---\n"
-            for block in blocks:
-                if len(block) > 4 and block[4].strip():  # block[4] is text content
-                    block_text += block[4] + "\n"
-            texts.append(block_text)
-   
-    doc.close()
-    return "\n".join(texts).strip()
-
-def extract_with_pypdf2(file, extraction_info: Dict) -> str:
-    """Extract text using PyPDF2 as fallback"""
-    file.seek(0)
-    reader = PyPDF2.PdfReader(file)
-    texts = []
-   
-    extraction_info["pages"] = len(reader.pages)
-   
-    for page_num, page in enumerate(reader.pages):
-        try:
-            text = page.extract_text()
-            if text.strip():
-                texts.append(f"--- Page {page_num + 1} ---\n{text}")
-        except Exception as e:
-            logger.warning(f"Failed to extract text from page {page_num + 1}: {e}")
-   
-    return "\n".join(texts).strip()
-
-def preprocess_text(text: str) -> str:
-    """Advanced text preprocessing for better extraction"""
-    # Remove page headers/footers
-    text = re.sub(r'--- Page \d+ ---', '', text)
-    text = re.sub(r'--- Table \d+ on Page \d+ ---', '', text)
-    text = re.sub(r'--- Structured Page \d+ ---', '', text)
-   
-    # Fix common PDF extraction issues
-    text = re.sub(r'\n\s*\n', '\n', text)  # Remove empty lines
-    text = re.sub(r'\s+', ' ', text)  # Normalize whitespace
-   
-    return text.strip()
-
-def normalize_text(text: str) -> str:
-    """Improved text normalization"""
-    if not text:
-        return ""
-   
-    # Remove file paths and URLs
-    text = re.sub(r'[A-Za-z]:\\[^\\]+\\[^\s]*', '', text)
-    text = re.sub(r'https?://[^\s]+', '', text)
-    text = re.sub(r'www\.[^\s]+', '', text)
-   
-    # Normalize punctuation
-    text = re.sub(r'[^\w\s:/\-.,()%&]', ' ', text)
-    text = re.sub(r'[/\\]+', '/', text)
-   
-    # Normalize whitespace
-    text = re.sub(r'\s+', ' ', text)
-   
-    return text.strip().lower()
-
-def clean_field(text: str) -> str:
-    """Enhanced field cleaning"""
-    if not text or text.lower() in ['not found', 'none', 'n/a']:
-        return ""
-   
-    text = normalize_text(text)
-   
-    # Remove common noise
-    noise_patterns = [
-        r"exclusive of decoration",
-        r"made in sri lanka",
-        r"page \d+",
-        r"table \d+",
-        r"^\d+\s*[:|.]",  # Remove leading numbers
-        r"^\s*[-•]\s*",   # Remove bullet points
-    ]
-   
-    for pattern in noise_patterns:
-        text = re.sub(pattern, "", text, flags=re.IGNORECASE)
-   
-    # Clean up result
-    text = re.sub(r'\s+', ' ', text).strip()
-   
-    return text
-
-def extract_care_code(text: str) -> str:
-    """Enhanced care code extraction"""
-    # Look for MWW followed by digits
-    patterns = [
-        r"\b(MWW\d+)\b",
-        r"Care\s+(?:Code|Instructions?)\s*:?\s*(MWW\d+)",
-        r"Care\s*:?\s*(MWW\d+)"
-    ]
-   
-    for pattern in patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        if matches:
-            return matches[0].upper().strip()
-   
-    return "Not found"
-
-def extract_product_code_enhanced(text: str, doc_type: str = "WO") -> str:
-    """UPDATED: Enhanced product code extraction based on requirements"""
-    
-    if doc_type == "WO":
-        # Look for "Product Code:" with potential formatting
-        pattern = r"Product\s+Code\s*:\s*(LB\s*\d{4,}(?:\s*/?\w+)?(?:\s*/?\w+)?)"
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            code = match.group(1).strip()
-            code = re.sub(r'\s+', '', code)  # Remove all whitespace
-            return code.upper()
-    
-    elif doc_type == "PO":
-        # FOR PO: Look in Item Description 2nd line, between first underscore and first hyphen
-        lines = text.split('\n')
-        for i, line in enumerate(lines):
-            if "LBL.CARE_LB" in line and i + 1 < len(lines):
-                second_line = lines[i + 1]
-                # Look for pattern between first underscore and first hyphen
-                pattern = r"_([^_-]+)-"
-                match = re.search(pattern, second_line)
-                if match:
-                    code = match.group(1).strip()
-                    if len(code) >= 4:
-                        return code.upper()
-        
-        # Alternative pattern if the above doesn't work
-        if "LBL.CARE_LB" in text:
-            pattern = r"LBL\.CARE_LB\s*(\d+)"
-            match = re.search(pattern, text)
-            if match:
-                return f"LB{match.group(1)}"
-    
-    # Fallback: Look for LB followed by numbers
-    pattern = r"\b(LB\s*\d{4,})\b"
-    match = re.search(pattern, text, re.IGNORECASE)
-    if match:
-        code = re.sub(r'\s+', '', match.group(1))
-        return code.upper()
-    
-    return "Not found"
-def extract_silhouette_enhanced(text: str, doc_type: str = "WO") -> str:
-    """Enhanced silhouette extraction to match 'Silhouette:__________' in WO"""
-   
-    if doc_type == "WO":
-        # Match 'Silhouette:' followed by underscores, dashes, or space, then capture value
-        pattern = r"Silhouette\s*:\s*[_\-\s]*([A-Za-z0-9\s\/&]+)"
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            silhouette = match.group(1).strip()
-            silhouette = re.sub(r'\s+', ' ', silhouette)  # Normalize spaces
-            if 1 <= len(silhouette) <= 50:
-                return silhouette.title()
-    elif doc_type == "PO":
-        garment_types = ["THONG", "BRIEF", "BIKINI", "BOYSHORT", "HIPSTER", "PANTY", "PANTIE"]
-        for garment_type in garment_types:
-            if garment_type in text.upper():
-                pattern = rf"([A-Z\s]*{garment_type}[A-Z\s]*)"
-                matches = re.findall(pattern, text.upper())
-                for match in matches:
-                    cleaned = re.sub(r'\s+', ' ', match.strip())
-                    if 3 <= len(cleaned) <= 30:
-                        return cleaned.title()
-    return "Not found"
-
-
-import re
-
-def extract_vsd_number_enhanced(text: str, doc_type: str = "WO", wo_text: str = None) -> str:
-    """Enhanced VSD#/VSS# extraction with correct PO logic"""
-    
-    if doc_type.upper() == "WO":
-        # WO logic remains unchanged - it's working correctly
-        vsd = re.search(r"VSD#\s*:?\s*([A-Za-z0-9\-]+)", text, re.IGNORECASE)
-        vss = re.search(r"VSS#\s*:?\s*([A-Za-z0-9\-]+)", text, re.IGNORECASE)
-        return f"VSD# {vsd.group(1) if vsd else 'Not found'} | VSS# {vss.group(1) if vss else 'Not found'}"
-    
-    elif doc_type.upper() == "PO":
-        po_codes = extract_vsd_vss_from_po_corrected(text)
-        if wo_text:
-            wo_codes = analyze_wo_codes(wo_text)
-            return format_results_conditional(wo_codes, po_codes)
-        else:
-            parts = []
-            if po_codes["vsd"] != "Not found":
-                parts.append(f"VSD# {po_codes['vsd']}(PO)")
-            if po_codes["vss"] != "Not found":
-                parts.append(f"VSS# {po_codes['vss']}(PO)")
-            return " || ".join(parts) if parts else "VSD/VSS not found in PO"
-    
-    return "Not found"
-
-def extract_vsd_vss_from_po_corrected(po_text: str) -> dict:
-    """Corrected VSD#/VSS# extraction from PO based on actual document structure"""
-    lines = [line.strip() for line in po_text.splitlines() if line.strip()]
-    vsd_codes = []
-    vss_codes = []
-    
-    # Process each line to find VSD# and VSS#
-    for idx, line in enumerate(lines):
-        
-        # Look for VSD# in third line after item description
-        # Pattern: "431650 QD4 C 509 9/25 / L /" - we want "431650 QD4"
-        if "Colour/Size/Destination:" in line:
-            # Extract everything after the colon
-            after_colon = line.split("Colour/Size/Destination:", 1)[1].strip()
-            # Match 6 digits followed by space and 3 letters
-            vsd_match = re.search(r'(\d{6})\s+([A-Z]{3})', after_colon)
-            if vsd_match:
-                vsd_code = f"{vsd_match.group(1)} {vsd_match.group(2)}"
-                if vsd_code not in vsd_codes:
-                    vsd_codes.append(vsd_code)
-        
-        # Look for VSS# in LBL.CARE_LB line (under item description, end of 2nd line)
-        # Pattern: "LBL.CARE_LB 5735-bikini-11276861" - we want "11276861"
-        if "LBL.CARE_LB" in line:
-            # More robust pattern to capture the number at the end after the last hyphen
-            # Handle potential trailing spaces, tabs, or other characters
-            vss_match = re.search(r'LBL\.CARE_LB\s+.*?-(\d+)\s*$', line.strip())
-            if not vss_match:
-                # Alternative pattern - look for digits after the last hyphen in the line
-                vss_match = re.search(r'-(\d+)(?:\s*)$', line.strip())
-            
-            if vss_match:
-                vss_code = vss_match.group(1)
-                if vss_code not in vss_codes:
-                    vss_codes.append(vss_code)
-    
-    # Return the first found codes or "Not found"
-    return {
-        "vsd": vsd_codes[0] if vsd_codes else "Not found",
-        "vss": vss_codes[0] if vss_codes else "Not found"
-    }
-
-def analyze_wo_codes(wo_text: str) -> dict:
-    """Analyze VSD#/VSS# codes from WO - unchanged as it works correctly"""
-    vsd = re.search(r"VSD#\s*:?\s*([A-Za-z0-9\-]+)", wo_text, re.IGNORECASE)
-    vss = re.search(r"VSS#\s*:?\s*([A-Za-z0-9\-]+)", wo_text, re.IGNORECASE)
-    return {
-        "has_vsd": bool(vsd),
-        "has_vss": bool(vss),
-        "vsd_value": vsd.group(1) if vsd else "",
-        "vss_value": vss.group(1) if vss else ""
-    }
-
-def format_results(wo_codes: dict, po_codes: dict) -> str:
-    """Format the combined results from WO and PO"""
-    parts = []
-    
-    # Format VSD# results
-    if wo_codes["has_vsd"] or po_codes["vsd"] != "Not found":
-        wo_vsd = wo_codes['vsd_value'] if wo_codes['has_vsd'] else 'Not in WO'
-        po_vsd = po_codes['vsd'] if po_codes['vsd'] != "Not found" else 'Not in PO'
-        parts.append(f"VSD# {wo_vsd}(WO) | VSD# {po_vsd}(PO)")
-    
-    # Format VSS# results  
-    if wo_codes["has_vss"] or po_codes["vss"] != "Not found":
-        wo_vss = wo_codes['vss_value'] if wo_codes['has_vss'] else 'Not in WO'
-        po_vss = po_codes['vss'] if po_codes['vss'] != "Not found" else 'Not in PO'
-        parts.append(f"VSS# {wo_vss}(WO) | VSS# {po_vss}(PO)")
-    
-    return " || ".join(parts) if parts else "No codes found"
-
-def format_results_conditional(wo_codes: dict, po_codes: dict) -> str:
-    """CONDITIONAL FORMAT: Only show PO codes if WO has the corresponding codes"""
-    parts = []
-    
-    # Only show VSD# if WO has VSD#
-    if wo_codes["has_vsd"]:
-        wo_vsd = wo_codes['vsd_value']
-        po_vsd = po_codes['vsd'] if po_codes['vsd'] != "Not found" else 'Not in PO'
-        parts.append(f"VSD# {wo_vsd}(WO) | VSD# {po_vsd}(PO)")
-    
-    # Only show VSS# if WO has VSS#
-    if wo_codes["has_vss"]:
-        wo_vss = wo_codes['vss_value']
-        po_vss = po_codes['vss'] if po_codes['vss'] != "Not found" else 'Not in PO'
-        parts.append(f"VSS# {wo_vss}(WO) | VSS# {po_vss}(PO)")
-    
-    return " || ".join(parts) if parts else "No codes found in WO"
-
-# Test function to verify the extraction
-def test_vsd_vss_extraction():
-    """Test the extraction with sample data"""
-    
-    # Sample PO text from your document
-    po_sample = """1 O37368Q5LB1 002 772.00 PCS 0.0324 25.01
-X-Mill Date(dd-mm-yy) : Buyer :
-Colour/Size/Destination:
-Tolerance Percentage :
-431650 QD4 C 509 10/25 / M /
-LBL.CARE_LB 5735-bikini-11276861
-09-09-25 BEL_VS&Co_VS_WOMENS_BULK-5-FOR-VSD"""
-
-    # Sample WO text from your document  
-    wo_sample = """VSD#: 431650-QD4
-VSS#:"""
-    
-    # Test with WO that has VSS# to test conditional logic
-    wo_sample_with_vss = """VSD#: 431650-QD4
-VSS#: 11276861"""
-    
-    print("=== TESTING VSD#/VSS# EXTRACTION ===")
-    print("\nPO Sample Text:")
-    print(po_sample)
-    print("\nWO Sample Text:")  
-    print(wo_sample)
-    
-    print("\n=== EXTRACTION RESULTS ===")
-    print("PO only:", extract_vsd_number_enhanced(po_sample, "PO"))
-    print("WO only:", extract_vsd_number_enhanced(wo_sample, "WO"))
-    print("Combined (WO without VSS#):", extract_vsd_number_enhanced(po_sample, "PO", wo_sample))
-    print("Combined (WO with VSS#):", extract_vsd_number_enhanced(po_sample, "PO", wo_sample_with_vss))
-    
-    print("\n=== DETAILED PO EXTRACTION ===")
-    po_codes = extract_vsd_vss_from_po_corrected(po_sample)
-    print("VSD# from PO:", po_codes["vsd"])
-    print("VSS# from PO:", po_codes["vss"])
-    
-    # Debug: Show the LBL.CARE_LB line specifically
-    lines = po_sample.splitlines()
-    for line in lines:
-        if "LBL.CARE_LB" in line:
-            print(f"LBL.CARE_LB line found: '{line.strip()}'")
-            # Test the regex on this specific line
-            vss_match = re.search(r'LBL\.CARE_LB\s+.*?-(\d+)\s*$', line.strip())
-            if vss_match:
-                print(f"VSS# extracted: {vss_match.group(1)}")
-            else:
-                print("VSS# regex did not match")
-
-def extract_factory_id_enhanced(text: str) -> str:
-    """Enhanced factory ID extraction - already working correctly"""
-   
-    # Look for Factory ID pattern
-    patterns = [
-        r"Factory\s*ID\s*:\s*(\d{8})",
-        r"FactoryID\s*:\s*(\d{8})",
-        r"Factory\s+Code\s*:\s*(\d{8})"
-    ]
-   
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            return match.group(1).strip()
-   
-    # Look for the specific ID mentioned in your documents
-    if "36013779" in text:
-        return "36013779"
-   
-    return "Not found"
-
-if __name__ == "__main__":
-    test_vsd_vss_extraction()
-    
-def extract_factory_id_enhanced(text: str) -> str:
-    """Enhanced factory ID extraction - already working correctly"""
-   
-    # Look for Factory ID pattern
-    patterns = [
-        r"Factory\s*ID\s*:\s*(\d{8})",
-        r"FactoryID\s*:\s*(\d{8})",
-        r"Factory\s+Code\s*:\s*(\d{8})"
-    ]
-   
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            return match.group(1).strip()
-   
-    # Look for the specific ID mentioned in your documents
-    if "36013779" in text:
-        return "36013779"
-   
-    return "Not found"    
-
-def extract_date_of_mfr(text: str) -> str:
-    """Enhanced Date of MFR# extraction - already working correctly"""
-   
-    # Look for Date of MFR# pattern
-    patterns = [
-        r"Date\s+of\s+MFR#\s*:\s*(\d{2}\s*\d{2})",
-        r"DateofMFR#\s*:\s*(\d{4})",
-        r"MFR#\s*:\s*(\d{2}\s*\d{2})",
-        r"Date.*MFR.*:\s*(\d{2}\s*\d{2})"
-    ]
-   
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            date_str = match.group(1).strip()
-            # Format as MM/YY if needed
-            if len(date_str) == 4 and date_str.isdigit():
-                return f"{date_str[:2]}/{date_str[2:]}"
-            return date_str
-   
-    # Look for patterns like "09 25" or "9/25"
-    patterns = [
-        r"\b(\d{1,2})\s+(\d{2})\b",
-        r"\b(\d{1,2})/(\d{2})\b"
-    ]
-   
-    for pattern in patterns:
-        matches = re.findall(pattern, text)
-        for match in matches:
-            if len(match) == 2:
-                month, year = match
-                if 1 <= int(month) <= 12 and len(year) == 2:
-                    return f"{month.zfill(2)}/{year}"
-   
-    return "Not found"
-
-def extract_country_of_origin_enhanced(text: str, doc_type: str = "WO") -> str:
-    """Enhanced country of origin extraction based on requirements"""
-    if doc_type == "WO":
-        patterns = [
-            r"made\s+in\s+([a-z\s]+)",
-            r"fabriqu[eé]\s+(?:au|en)\s+([a-z\s]+)",  # French
-            r"hecho\s+en\s+([a-z\s]+)",  # Spanish
-            r"Country\s+Of\s+Origin\s*[:\-]?\s*([a-z\s]+)",
-            r"CountryOfOrigin\s*[:\-]?\s*([a-z\s]+)"
-        ]
-        text_lower = text.lower()
-        for pattern in patterns:
-            match = re.search(pattern, text_lower)
-            if match:
-                country = match.group(1).strip()
-                country = re.sub(r'[^\w\s]', '', country)
-                country = re.sub(r'\s+', ' ', country).strip()
-                if "sri" in country and "lanka" in country:
-                    return "Sri Lanka"
-                elif country and len(country) < 30:
-                    return country.title()
-    elif doc_type == "PO":
-        # Focus only on the section before 'Factory Code'
-        factory_code_index = text.lower().find("factory code")
-        if factory_code_index != -1:
-            pre_factory_text = text[:factory_code_index]
-            # Now search for COO pattern in this section
-            match = re.search(r"COO\s*[:\-]?\s*([^\n\r]+)", pre_factory_text, re.IGNORECASE)
-            if match:
-                country = match.group(1).strip()
-                country = re.sub(r'[^\w\s]', '', country)
-                country = re.sub(r'\s+', ' ', country).strip()
-                if "sri" in country and "lanka" in country:
-                    return "Sri Lanka"
-                elif country and len(country) < 30:
-                    return country.title()
-    return "Not found"
-
-def extract_additional_instructions_enhanced(text: str, doc_type: str = "WO") -> str:
-    """Enhanced additional instructions extraction with special matching logic"""
-   
-    text_lower = text.lower()
-   
-    # Look for decoration exclusion patterns (common in both)
-    decoration_patterns = [
-        "exclusive of decoration",
-        "sauf décoration",
-        "no incluye la decoración",
-        "esclusa la decorazione",
-        "装饰除外"
-    ]
-   
-    for pattern in decoration_patterns:
-        if pattern in text_lower:
-            return "exclusive of decoration"
-   
-    if doc_type == "WO":
-        # FOR WO: Look in Product Details section
-        instruction_patterns = [
-            r"Additional\s+Instructions\s*:?\s*([^\n]{10,100})",
-            r"instructions\s*:?\s*([^\n]{10,100})",
-            r"special\s+(?:requirements|instructions)\s*:?\s*([^\n]{10,100})"
-        ]
-       
-        for pattern in instruction_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                instruction = match.group(1).strip()
-                if len(instruction) > 10:  # Meaningful instruction
-                    return instruction
-   
-    elif doc_type == "PO":
-        # FOR PO: Look in email body table for Additional Instructions
-        # This will be used for comparison matching logic
-        instruction_patterns = [
-            r"Additional\s+Instructions[:\s]*([^\n]+)",
-            r"Instructions[:\s]*([^\n]+)"
-        ]
-       
-        for pattern in instruction_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                instruction = match.group(1).strip()
-                if len(instruction) > 5:
-                    return instruction
-   
-    return "Not found"
-
-def extract_garment_components_enhanced(text: str, doc_type: str = "WO") -> str:
-    """Enhanced garment components extraction with filtered output"""
-    import re
-   
-    if doc_type == "WO":
-        # FOR WO: Extract from "Garment Components & Fibre Contents:" section under Product Details
-        components = []
-       
-        # Find the "Garment Components & Fibre Contents:" section - more flexible pattern
-        garment_section_match = re.search(r"Garment Components\s*&\s*Fibre Contents\s*:(.*?)(?=Care Instructions|Technical Specifications|End of Works Order|$)", text, re.DOTALL | re.IGNORECASE)
-       
-        if garment_section_match:
-            garment_content = garment_section_match.group(1)
-           
-            # Look for all percentage-fiber combinations in the entire section
-            # Updated pattern to match the actual WO format with multilingual support
-            fiber_patterns = [
-                r"(\d+)%\s*(cotton/coton/algodón/cotone/棉)",
-                r"(\d+)%\s*(modal/莫代尔)",
-                r"(\d+)%\s*(elastane/élasthanne/elastano/elastan/氨纶)",
-                r"(\d+)%\s*(polyamide/poliamida/poliammide/锦纶)",
-                r"(\d+)%\s*(polyester/poliéster/poliestere/聚酯纤维)",
-                r"(\d+)%\s*(recycled\s+polyamide|polyamide\s+recyclé|poliamida\s+reciclada|poliammide\s*riciclata)",
-                r"(\d+)%\s*(cotton)",
-                r"(\d+)%\s*(modal)",
-                r"(\d+)%\s*(elastane)",
-                r"(\d+)%\s*(polyamide)",
-                r"(\d+)%\s*(polyester)"
-            ]
-           
-            for pattern in fiber_patterns:
-                matches = re.findall(pattern, garment_content, re.IGNORECASE)
-                for match in matches:
-                    percentage, fiber_type = match
-                    fiber_clean = fiber_type.strip().lower()
-                   
-                    # Map to standard fiber names based on multilingual patterns
-                    if any(x in fiber_clean for x in ['cotton/coton/algodón/cotone/棉', 'cotton']):
-                        components.append(f"cotton - {percentage}%")
-                    elif any(x in fiber_clean for x in ['modal/莫代尔', 'modal']):
-                        components.append(f"modal - {percentage}%")
-                    elif any(x in fiber_clean for x in ['elastane/élasthanne/elastano/elastan/氨纶', 'elastane']):
-                        components.append(f"elastane - {percentage}%")
-                    elif any(x in fiber_clean for x in ['recycled', 'recyclé', 'reciclada', 'riciclata']):
-                        components.append(f"recycled polyamide - {percentage}%")
-                    elif any(x in fiber_clean for x in ['polyamide/poliamida/poliammide/锦纶', 'polyamide']):
-                        components.append(f"polyamide - {percentage}%")
-                    elif any(x in fiber_clean for x in ['polyester/poliéster/poliestere/聚酯纤维', 'polyester']):
-                        components.append(f"polyester - {percentage}%")
-       
-        # If still no components found, try a more general search in the entire text
-        if not components:
-            # Search for any percentage-fiber pattern in the entire text
-            general_patterns = [
-                r"(\d+)%\s*(cotton/coton/algodón/cotone/棉|cotton)",
-                r"(\d+)%\s*(modal/莫代尔|modal)",
-                r"(\d+)%\s*(elastane/élasthanne/elastano/elastan/氨纶|elastane)",
-                r"(\d+)%\s*(recycled\s+polyamide)",
-                r"(\d+)%\s*(polyamide/poliamida/poliammide/锦纶|polyamide)",
-                r"(\d+)%\s*(polyester/poliéster/poliestere/聚酯纤维|polyester)"
-            ]
-           
-            for pattern in general_patterns:
-                matches = re.findall(pattern, text, re.IGNORECASE)
-                for match in matches:
-                    percentage, fiber_type = match
-                    fiber_clean = fiber_type.lower()
-                   
-                    if 'cotton' in fiber_clean:
-                        components.append(f"cotton - {percentage}%")
-                    elif 'modal' in fiber_clean:
-                        components.append(f"modal - {percentage}%")
-                    elif 'elastane' in fiber_clean:
-                        components.append(f"elastane - {percentage}%")
-                    elif 'recycled' in fiber_clean:
-                        components.append(f"recycled polyamide - {percentage}%")
-                    elif 'polyamide' in fiber_clean:
-                        components.append(f"polyamide - {percentage}%")
-                    elif 'polyester' in fiber_clean:
-                        components.append(f"polyester - {percentage}%")
-       
-        # Remove duplicates while preserving order
-        unique_components = list(dict.fromkeys(components))
-        return ", ".join(unique_components[:10]) if unique_components else "Not found"
-   
-    elif doc_type == "PO":
-        # FOR PO: Extract from "Care Composition in CC" column in email body table
-        components = []
-       
-        # Find the "Care Composition in CC" section and extract following content
-        care_comp_match = re.search(r"Care Composition in CC\s+(.*?)(?=\n\s*(?:Brandix|Table|Item number|Page:|PO Number:|$))", text, re.DOTALL | re.IGNORECASE)
-       
-        if care_comp_match:
-            care_content = care_comp_match.group(1).strip()
-           
-            # Extract component details (Body, Lace, Gusset, etc.)
-            component_patterns = [
-                r"Body\s*:\s*(.*?)(?=\s+Lace\s*:|$)",
-                r"Lace\s*:\s*(.*?)(?=\s+Gusset\s*:|$)",
-                r"Gusset\s*:\s*(.*?)(?=\s+[A-Z][a-z]+\s*:|$)"
-            ]
-           
-            for pattern in component_patterns:
-                matches = re.finditer(pattern, care_content, re.DOTALL | re.IGNORECASE)
-                for match in matches:
-                    component_text = match.group(1).strip()
-                    # Clean the text and remove extra whitespace
-                    component_text = re.sub(r'\s+', ' ', component_text)
-                   
-                    # Extract percentages and fiber types from each component
-                    fiber_matches = re.findall(r'(\d+)%\s*([a-zA-Z\s]+?)(?=\s*\d+%|\s*$)', component_text)
-                   
-                    for percentage, fiber_type in fiber_matches:
-                        fiber_clean = fiber_type.strip().lower()
-                        # Clean and normalize fiber names
-                        fiber_clean = re.sub(r'\s+', ' ', fiber_clean)
-                       
-                        # Map to standard names
-                        if 'recycled polyamide' in fiber_clean or (('recycled' in fiber_clean) and ('polyamide' in fiber_clean)):
-                            components.append(f"recycled polyamide - {percentage}%")
-                        elif 'polyamide' in fiber_clean:
-                            components.append(f"polyamide - {percentage}%")
-                        elif 'elastane' in fiber_clean:
-                            components.append(f"elastane - {percentage}%")
-                        elif 'cotton' in fiber_clean or 'cot' == fiber_clean.strip():
-                            components.append(f"cotton - {percentage}%")
-                        elif 'polyester' in fiber_clean:
-                            components.append(f"polyester - {percentage}%")
-                        elif 'modal' in fiber_clean:
-                            components.append(f"modal - {percentage}%")
-       
-        # If no structured format found, try alternative extraction from the entire text
-        if not components:
-            # Look for any percentage-fiber combinations in the care composition area
-            general_pattern = r"(\d+)%\s*((?:Recycled\s+)?(?:Polyamide|Elastane|Cotton|Cot|Polyester|Modal))"
-            matches = re.findall(general_pattern, text, re.IGNORECASE)
-           
-            for percentage, fiber_type in matches:
-                fiber_clean = fiber_type.strip().lower()
-                if 'recycled' in fiber_clean and 'polyamide' in fiber_clean:
-                    components.append(f"recycled polyamide - {percentage}%")
-                elif 'polyamide' in fiber_clean:
-                    components.append(f"polyamide - {percentage}%")
-                elif 'elastane' in fiber_clean:
-                    components.append(f"elastane - {percentage}%")
-                elif 'cotton' in fiber_clean or fiber_clean == 'cot':
-                    components.append(f"cotton - {percentage}%")
-                elif 'polyester' in fiber_clean:
-                    components.append(f"polyester - {percentage}%")
-                elif 'modal' in fiber_clean:
-                    components.append(f"modal - {percentage}%")
-       
-        # Remove duplicates while preserving order
-        unique_components = list(dict.fromkeys(components))
-        return ", ".join(unique_components[:10]) if unique_components else "Not found"
-   
-    return "Not found"
-
-def extract_size_age_breakdown_enhanced(text: str, doc_type: str = "WO") -> str:
-    """Enhanced size/age breakdown extraction with comprehensive diagnostics"""
-   
-    lines = text.splitlines()
-    size_map = {}
-    valid_sizes = ['XS', 'S', 'M', 'L', 'XL', 'XXL']
-   
-    if doc_type == "WO":
-        # WO Processing: Look for explicit Size/Age Breakdown table
-        breakdown_start = -1
-        for i, line in enumerate(lines):
-            if "Size/Age Breakdown" in line or ("Panties/Swim Bottoms" in line and "Order Quantity" in line):
-                breakdown_start = i
-                break
-       
-        if breakdown_start >= 0:
-            for i in range(breakdown_start + 1, min(breakdown_start + 10, len(lines))):
-                line = lines[i].strip()
-                pattern = r'^([A-Z]{1,3})(?:/[^/\s]+)*\s+(\d{1,6}(?:,\d{3})*)$'
-                match = re.match(pattern, line)
-                if match:
-                    size = match.group(1).upper()
-                    quantity = match.group(2).replace(',', '')
-                    if size in valid_sizes:
-                        size_map[size] = quantity
-   
-    elif doc_type == "PO":
-        # PO Processing: Extract quantities from structured PO format
-        quantities = []  # Store all quantities found
-       
-        for i, line in enumerate(lines):
-            line_clean = line.strip()
-            if not line_clean:
-                continue
-           
-            # Look for lines that contain item numbers and quantities in PO format
-            # Pattern: Item number followed by quantity and PCS
-            po_item_pattern = r'^\d+\s+[A-Z0-9]+\s+(\d+(?:\.\d{2})?)\s+PCS'
-            match = re.match(po_item_pattern, line_clean)
-           
-            if match:
-                quantity = match.group(1)
-                # Ensure quantity has two decimal places for consistency
-                if '.' not in quantity:
-                    quantity = f"{quantity}.00"
-                quantities.append(quantity)
-                continue
-           
-            # Alternative pattern: Look for quantity followed by PCS anywhere in line
-            qty_pcs_pattern = r'(\d+(?:\.\d{2})?)\s+PCS'
-            matches = re.finditer(qty_pcs_pattern, line_clean)
-           
-            for match in matches:
-                quantity = match.group(1)
-                # Ensure quantity has two decimal places for consistency
-                if '.' not in quantity:
-                    quantity = f"{quantity}.00"
-                   
-                # Avoid duplicates from the same line
-                if quantity not in quantities:
-                    quantities.append(quantity)
-           
-            # Additional pattern: Look for standalone numbers that could be quantities
-            # Only consider if line contains PCS or other quantity indicators
-            if 'PCS' in line_clean.upper() or 'QUANTITY' in line_clean.upper():
-                standalone_numbers = re.findall(r'\b(\d+(?:\.\d{2})?)\b', line_clean)
-                for num in standalone_numbers:
-                    # Filter out small numbers that are likely not quantities
-                    if float(num) >= 10 and float(num) <= 10000:
-                        formatted_num = num if '.' in num else f"{num}.00"
-                        if formatted_num not in quantities:
-                            quantities.append(formatted_num)
-       
-        if quantities:
-            result = ", ".join(quantities)
-            return result
-   
-    # Fallback extraction for WO if no matches found
-    if not size_map and doc_type == "WO":
-        for i, line in enumerate(lines):
-            line_clean = line.strip()
-            if not line_clean:
-                continue
-               
-            # Try to find any size indicators
-            size_pattern = r'/\s*([A-Z]{1,3})\s*/'
-            size_matches = re.findall(size_pattern, line_clean)
-           
-            if size_matches:
-                for potential_size in size_matches:
-                    potential_size = potential_size.upper()
-                    if potential_size in valid_sizes:
-                        # Look for quantities in nearby lines
-                        search_start = max(0, i - 5)
-                        search_end = min(len(lines), i + 15)
-                       
-                        for k in range(search_start, search_end):
-                            qty_line = lines[k].strip()
-                            # Check if line contains a quantity
-                            if re.match(r'^\d+\.\d{2}$', qty_line) or re.match(r'^\d{1,6}(?:,\d{3})*$', qty_line):
-                                if potential_size not in size_map:
-                                    quantity = qty_line.replace(',', '')
-                                    size_map[potential_size] = quantity
-                                    break
-           
-            # Try other patterns
-            patterns = [
-                r'([A-Z]{1,3})(?:/[^/\s]+)*\s+(\d{1,6}(?:,\d{3})*)',
-                r'([A-Z]{1,3})\s*[:\-]\s*(\d{1,6}(?:,\d{3})*)',
-            ]
-           
-            for pattern in patterns:
-                matches = re.findall(pattern, line_clean)
-                if matches:
-                    for match in matches:
-                        if isinstance(match, tuple) and len(match) >= 2:
-                            potential_size = match[0].upper()
-                            quantity = match[1].replace(',', '')
-                            if potential_size in valid_sizes and quantity.replace('.', '').isdigit():
-                                if potential_size not in size_map:
-                                    size_map[potential_size] = quantity
-                        elif isinstance(match, str):
-                            potential_size = match.upper()
-                            if potential_size in valid_sizes:
-                                numbers = re.findall(r'\d+(?:\.\d{2})?', line_clean)
-                                valid_numbers = [n for n in numbers if float(n) >= 10 and float(n) <= 100000]
-                                if valid_numbers:
-                                    quantity = max(valid_numbers, key=lambda x: float(x))
-                                    if potential_size not in size_map:
-                                        size_map[potential_size] = quantity
-   
-    if doc_type == "WO":
-        if size_map:
-            size_order = {'XS': 0, 'S': 1, 'M': 2, 'L': 3, 'XL': 4, 'XXL': 5}
-            sorted_items = sorted(size_map.items(), key=lambda x: size_order.get(x[0], 999))
-            result = ", ".join([f"{k}-{v}" for k, v in sorted_items])
-            return result
-   
-    return "Not found"
-
-def extract_deliver_to_enhanced(text: str, doc_type: str = "WO") -> str:
-    """Extract Deliver To information based on requirements"""
-   
-    if doc_type == "WO":
-        # FOR WO: Customer Delivery Name + Deliver To from Order Delivery Details
-        customer_delivery_name = ""
-        deliver_to = ""
-       
-        # Look for Customer Delivery Name
-        pattern = r"Customer\s+Delivery\s+Name\s*:\s*([^\n]+)"
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            customer_delivery_name = match.group(1).strip()
-       
-        # Look for Deliver To
-        pattern = r"Deliver\s+To\s*:\s*([^\n]+)"
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            deliver_to = match.group(1).strip()
-       
-        # Combine both
-        if customer_delivery_name and deliver_to:
-            return f"{customer_delivery_name} + {deliver_to}"
-        elif customer_delivery_name:
-            return customer_delivery_name
-        elif deliver_to:
-            return deliver_to
-   
-    elif doc_type == "PO":
-        # FOR PO: Look for Delivery Location at the end of PO
-        pattern = r"Delivery\s+Location\s*:\s*([^\n]+)"
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            return match.group(1).strip()
-   
-    return "Not found"
-
-def extract_wo_fields_enhanced(text: str) -> Dict[str, str]:
-    """Enhanced Work Order field extraction"""
-    text = preprocess_text(text)
-   
-    return {
-        "Product Code": extract_product_code_enhanced(text, "WO"),
-        "Silhouette": extract_silhouette_enhanced(text, "WO"),
-        "VSD#": extract_vsd_number_enhanced(text, "WO"),
-        "Size/Age Breakdown": extract_size_age_breakdown_enhanced(text, "WO"),
-        "Factory ID": extract_factory_id_enhanced(text),
-        "Date of MFR#": extract_date_of_mfr(text),
-        "Country of Origin": extract_country_of_origin_enhanced(text, "WO"),
-        "Additional Instructions": extract_additional_instructions_enhanced(text, "WO"),
-        "Garment Components & Fibre Contents": extract_garment_components_enhanced(text, "WO"),
-        "Care Instructions": extract_care_code(text),
-        "Deliver To": extract_deliver_to_enhanced(text, "WO")
-    }
-
-def extract_po_fields_enhanced(text: str, po_items=None) -> Dict[str, str]:
-    """Enhanced Purchase Order field extraction with PO items integration"""
-    text = preprocess_text(text)
-   
-    # If PO items are provided, extract Product Code and Size/Age Breakdown from them
-    product_code = "Not found"
-    size_breakdown = "Not found"
-   
-    if po_items:
-        # Extract Product Code from the first item
-        if po_items and "Product_Code" in po_items[0]:
-            product_code = po_items[0]["Product_Code"]
-       
-        # Aggregate quantities by size
-        size_quantities = {}
-        for item in po_items:
-            size = item.get("Size", "").strip().upper()
-            quantity = item.get("Quantity", 0)
-            if size and quantity:
-                size_quantities[size] = size_quantities.get(size, 0) + quantity
-       
-        if size_quantities:
-            # Sort by size order: XS, S, M, L, XL, XXL
-            size_order = {'XS': 0, 'S': 1, 'M': 2, 'L': 3, 'XL': 4, 'XXL': 5}
-            sorted_sizes = sorted(size_quantities.items(), key=lambda x: size_order.get(x[0], 999))
-            size_breakdown = ", ".join([f"{size}-{qty}" for size, qty in sorted_sizes])
-   
-    # If we couldn't extract from PO items, fall back to text-based extraction
-    if product_code == "Not found":
-        product_code = extract_product_code_enhanced(text, "PO")
-   
-    if size_breakdown == "Not found":
-        size_breakdown = extract_size_age_breakdown_enhanced(text, "PO")
-   
-    return {
-        "Product Code": product_code,
-        "Silhouette": extract_silhouette_enhanced(text, "PO"),
-        "Care Instructions": extract_care_code(text),
-        "VSD#": extract_vsd_number_enhanced(text, "PO"),
-        "Date of MFR#": extract_date_of_mfr(text),
-        "Size/Age Breakdown": size_breakdown,
-        "Country of Origin": extract_country_of_origin_enhanced(text, "PO"),
-        "Additional Instructions": extract_additional_instructions_enhanced(text, "PO"),
-        "Factory ID": extract_factory_id_enhanced(text),
-        "Garment Components & Fibre Contents": extract_garment_components_enhanced(text, "PO"),
-        "Deliver To": extract_deliver_to_enhanced(text, "PO")
-    }
-
-def compare_fields_enhanced(wo_data: Dict[str, str], po_data: Dict[str, str], model) -> pd.DataFrame:
-    """Enhanced field comparison with better scoring and special Additional Instructions logic"""
-    results = []
-   
-    for field in wo_data:
-        wo_raw = wo_data[field]
-        po_raw = po_data.get(field, "Not found")
-       
-        # Special logic for Additional Instructions matching
-        if field == "Additional Instructions":
-            # First check if PO has Additional Instructions
-            if po_raw != "Not found" and po_raw.strip():
-                # If PO has instructions, compare with WO
-                if wo_raw != "Not found" and wo_raw.strip():
-                    # Both have values, do comparison
-                    wo_clean = clean_field(wo_raw)
-                    po_clean = clean_field(po_raw)
-                   
-                    if wo_clean == po_clean:
-                        score = 100.0
-                        verdict = "✅ Match"
-                    elif "exclusive of decoration" in wo_clean.lower() and "exclusive of decoration" in po_clean.lower():
-                        score = 100.0
-                        verdict = "✅ Match"
-                    else:
-                        # Try fuzzy matching
-                        fuzzy_score = fuzz.token_set_ratio(wo_clean, po_clean)
-                        score = fuzzy_score
-                        if score >= 80:
-                            verdict = "✅ Good Match"
-                        elif score >= 60:
-                            verdict = "⚠️ Partial Match"
-                        else:
-                            verdict = "❌ Different"
-                else:
-                    score = 0.0
-                    verdict = "❌ WO Missing"
-            else:
-                # PO doesn't have Additional Instructions
-                score = 0.0
-                verdict = "❌ PO Missing"
-       
-        # Handle "Not found" cases for other fields
-        elif wo_raw == "Not found" and po_raw == "Not found":
-            score = 0.0
-            verdict = "⚠️ Both Missing"
-        elif wo_raw == "Not found" or po_raw == "Not found":
-            score = 0.0
-            verdict = "❌ One Missing"
-        else:
-            # Clean values for comparison
-            wo_clean = clean_field(wo_raw)
-            po_clean = clean_field(po_raw)
-           
-            if not wo_clean or not po_clean:
-                score = 0.0
-                verdict = "❌ Empty Values"
-            elif field == "Care Instructions":
-                # Exact match for care instructions
-                score = 100.0 if wo_clean == po_clean else 0.0
-                verdict = "✅ Match" if score == 100.0 else "❌ Different"
-            else:
-                # Fuzzy + semantic matching
-                fuzzy_score = fuzz.token_set_ratio(wo_clean, po_clean)
-               
-                try:
-                    # Semantic similarity
-                    emb1 = model.encode(wo_clean, convert_to_tensor=True)
-                    emb2 = model.encode(po_clean, convert_to_tensor=True)
-                    semantic_score = float(util.pytorch_cos_sim(emb1, emb2)[0][0]) * 100
-                   
-                    # Weighted combination
-                    score = round(0.3 * fuzzy_score + 0.7 * semantic_score, 1)
-                except Exception as e:
-                    logger.warning(f"Semantic similarity failed for {field}: {e}")
-                    score = fuzzy_score
-               
-                # Determine verdict
-                if score >= 90:
-                    verdict = "✅ Excellent Match"
-                elif score >= 80:
-                    verdict = "✅ Good Match"
-                elif score >= 65:
-                    verdict = "⚠️ Partial Match"
-                elif score >= 40:
-                    verdict = "⚠️ Weak Match"
-                else:
-                    verdict = "❌ Different"
-       
-        results.append([field, wo_raw, po_raw, f"{score:.1f}%", verdict])
-   
-    return pd.DataFrame(results, columns=["Field", "WO Value", "PO Value", "Score", "Verdict"])
+    return output_path
 
 # ======================
 # MODEL LOADING
 # ======================
 
-# Suppress TensorFlow warnings
+# Suppress TensorFlow warnings (if transformers pulls it in; it is never imported here)
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 warnings.filterwarnings('ignore', category=FutureWarning)
 warnings.filterwarnings('ignore', category=UserWarning)
 warnings.filterwarnings('ignore', message='.*deprecated.*')
-# Configure TensorFlow to suppress warnings
-try:
-    import tensorflow as tf
-    tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.ERROR)
-except ImportError:
-    pass
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -1630,32 +324,64 @@ logging.getLogger('transformers').setLevel(logging.WARNING)
 @st.cache_resource(show_spinner=True)
 def load_model():
     """Load sentence transformer model with fallback options"""
-    models_to_try = [
-        "C:/models/all-mpnet-base-v2",
-        "all-mpnet-base-v2",
-        "paraphrase-MiniLM-L6-v2",
-        "all-MiniLM-L6-v2"
-    ]
+    from po_wo_comparison import get_model_name, load_sentence_model
    
-    for model_path in models_to_try:
+    # One model per host: use the shared embedding server when one is configured
+    if os.environ.get("PO_WO_EMBEDDING_SERVER"):
+        from embedding_server import EMBEDDING_SERVER_URL, connect_embedding_server
+       
         try:
-            if model_path.startswith("C:/"):
-                if os.path.exists(model_path):
-                    model = SentenceTransformer(model_path)
-                    st.success(f"✅ Loaded local model: {model_path}")
-                    return model
-                else:
-                    continue
-            else:
-                model = SentenceTransformer(model_path)
-                st.success(f"✅ Loaded model: {model_path}")
-                return model
-        except Exception as e:
-            logger.warning(f"Failed to load model {model_path}: {e}")
-            continue
+            model = connect_embedding_server()
+            st.success(f"✅ Using shared model server {EMBEDDING_SERVER_URL}: {get_model_name(model)}")
+            return model
+        except ConnectionError as e:
+            logger.warning(f"{e}; loading the model in this app")
+            st.warning("⚠️ Shared model server unavailable; loading the model in this app")
    
-    st.error("❌ Failed to load any sentence transformer model")
-    raise Exception("No suitable model could be loaded")
+    try:
+        model = load_sentence_model()
+    except Exception:
+        st.error("❌ Failed to load any sentence transformer model")
+        raise
+   
+    kind = "local model" if os.path.isdir(model.resolved_model_name) else "model"
+    st.success(f"✅ Loaded {kind}: {get_model_name(model)} in {model.load_seconds:.1f}s")
+    if model.skipped_models:
+        st.caption("Skipped: " + ", ".join(f"{name} ({reason})" for name, reason in model.skipped_models))
+    return model
+
+@st.cache_resource(show_spinner=False)
+def get_extraction_cache():
+    """Process-wide extraction cache that survives Streamlit reruns"""
+    from po_wo_comparison import ExtractionCache
+    return ExtractionCache()
+
+@st.cache_resource(show_spinner=False)
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """Two worker processes so the PO and WO of a comparison are extracted concurrently"""
+    return ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn"))
+
+def finish_extraction(future, process, data) -> dict:
+    """Result of a pooled extraction, redone in-process if the worker pool died"""
+    try:
+        result, hits = future.result()
+    except BrokenProcessPool:
+        logger.warning("Extraction worker pool failed; extracting in the app process")
+        get_extraction_pool.clear()
+        return process(data)
+    PATTERNS.add_hits(hits)
+    return result
+
+@st.cache_resource(show_spinner=False)
+def get_embedding_cache():
+    """Process-wide embedding cache; comparisons still work if it cannot be opened"""
+    from po_wo_comparison import EMBEDDING_CACHE_PATH, EmbeddingCache
+   
+    try:
+        return EmbeddingCache()
+    except Exception as e:
+        logger.warning(f"Embedding cache unavailable at {EMBEDDING_CACHE_PATH}: {e}")
+        return None
 
 # ======================
 # UI LAYOUT
@@ -1770,15 +496,17 @@ if tool == "Email & PO Merger":
    
     if uploaded_eml_file:
         with st.spinner("🔄 Processing email and merging with PO..."):
+            # The merged PDF is built in a temp file and the download is served from it
+            with tempfile.NamedTemporaryFile(prefix="po_wo_merged_", suffix=".pdf", delete=False) as f:
+                merged_path = f.name
             try:
                 # Extract content
-                eml_stream = io.BytesIO(uploaded_eml_file.read())
-                email_body, pdf_attachments = extract_email_content(eml_stream)
+                email_body, pdf_attachments = extract_email_content(uploaded_eml_file)
                 fields = extract_fields(email_body)
                 tables = extract_tables(email_body)
                
                 # Create merged PDF
-                merged_pdf = create_merged_pdf(fields, tables, pdf_attachments)
+                merged_pdf = create_merged_pdf(fields, tables, pdf_attachments, merged_path)
                
                 if merged_pdf:
                     st.markdown('<div class="success-box">✅ Merged PDF created successfully!</div>', unsafe_allow_html=True)
@@ -1796,22 +524,39 @@ if tool == "Email & PO Merger":
                         if not custom_filename.lower().endswith('.pdf'):
                             custom_filename += '.pdf'
                        
-                        st.download_button(
-                            label="📥 Download PDF",
-                            data=merged_pdf.getvalue(),
-                            file_name=custom_filename,
-                            mime="application/pdf",
-                            use_container_width=True
-                        )
+                        with open(merged_pdf, "rb") as merged_file:
+                            st.download_button(
+                                label="📥 Download PDF",
+                                data=merged_file,
+                                file_name=custom_filename,
+                                mime="application/pdf",
+                                use_container_width=True
+                            )
                 else:
                     st.markdown('<div class="error-box">❌ Failed to create merged PDF.</div>', unsafe_allow_html=True)
            
             except Exception as e:
                 st.markdown(f'<div class="error-box">❌ Processing error: {str(e)}</div>', unsafe_allow_html=True)
+            finally:
+                os.remove(merged_path)
     else:
         st.markdown('<div class="info-box">📤 Please upload an .eml file to begin</div>', unsafe_allow_html=True)
 
 elif tool == "PO vs WO Comparison":
+    import pandas as pd
+    from po_wo_comparison import (
+        compare_fields_enhanced,
+        content_hash,
+        format_score_tier_counts,
+        get_model_name,
+        process_po_document,
+        process_wo_document,
+        release_upload_source,
+        run_with_pattern_hits,
+        score_tier_counts,
+        upload_source,
+    )
+   
     st.markdown('<div class="tool-header">🔍 PO vs WO Comparison Tool</div>', unsafe_allow_html=True)
     st.markdown("Upload your Purchase Order (PO) and Work Order (WO) PDFs for comparison")
    
@@ -1825,20 +570,48 @@ elif tool == "PO vs WO Comparison":
    
     if po_file and wo_file:
         with st.spinner("🔄 Processing documents and loading AI model..."):
+            po_source = wo_source = None
             try:
-                # Load model
+                # Reruns on the same uploads are served from the content-hash cache
+                cache = get_extraction_cache()
+                po_bytes = po_file.getvalue()
+                wo_bytes = wo_file.getvalue()
+                po_key = content_hash(po_bytes)
+                wo_key = content_hash(wo_bytes)
+                po_result = cache.get(("po", po_key))
+                wo_result = cache.get(("wo", wo_key))
+               
+                # PO and WO are extracted concurrently in worker processes (large uploads are
+                # handed over as a memory-mapped temp file rather than a pickled copy)...
+                pool = get_extraction_pool()
+                if not po_result:
+                    po_source = upload_source(po_bytes)
+                if not wo_result:
+                    wo_source = upload_source(wo_bytes)
+                po_future = None if po_result else pool.submit(run_with_pattern_hits, process_po_document, po_source)
+                wo_future = None if wo_result else pool.submit(run_with_pattern_hits, process_wo_document, wo_source)
+               
+                # ...while the model loads here
                 model = load_model()
-               
-                # Extract PO items
-                po_items = extract_po_details(po_file)
-               
-                # Extract text from both files
-                po_text, po_info = extract_text_advanced(po_file)
-                wo_text, wo_info = extract_text_advanced(wo_file)
-               
-                # Extract fields
-                po_fields = extract_po_fields_enhanced(po_text, po_items)
-                wo_fields = extract_wo_fields_enhanced(wo_text)
+                if getattr(model, "lost", False):
+                    # The cached shared-server client gave up on its server: connect again or load locally
+                    load_model.clear()
+                    model = load_model()
+               
+                # Extract PO items, text and fields
+                if po_future:
+                    po_result = finish_extraction(po_future, process_po_document, po_source)
+                    cache.put(("po", po_key), po_result)
+                po_items = po_result["items"]
+                po_text, po_info = po_result["text"], po_result["info"]
+                po_fields = po_result["fields"]
+               
+                # Extract WO text and fields
+                if wo_future:
+                    wo_result = finish_extraction(wo_future, process_wo_document, wo_source)
+                    cache.put(("wo", wo_key), wo_result)
+                wo_text, wo_info = wo_result["text"], wo_result["info"]
+                wo_fields = wo_result["fields"]
                
                 # Display extraction info
                 col1, col2 = st.columns(2)
@@ -1850,7 +623,8 @@ elif tool == "PO vs WO Comparison":
                     <strong>Method:</strong> {po_info['method']}<br>
                     <strong>Pages:</strong> {po_info['pages']}<br>
                     <strong>Tables found:</strong> {po_info['tables_found']}<br>
-                    <strong>Quality:</strong> {po_info['extraction_quality']}
+                    <strong>Quality:</strong> {po_info['extraction_quality']}<br>
+                    <strong>Engine time:</strong> {', '.join(f'{engine} {seconds:.2f}s' for engine, seconds in po_info['engine_times'].items())}
                     </div>
                     """, unsafe_allow_html=True)
                
@@ -1861,13 +635,24 @@ elif tool == "PO vs WO Comparison":
                     <strong>Method:</strong> {wo_info['method']}<br>
                     <strong>Pages:</strong> {wo_info['pages']}<br>
                     <strong>Tables found:</strong> {wo_info['tables_found']}<br>
-                    <strong>Quality:</strong> {wo_info['extraction_quality']}
+                    <strong>Quality:</strong> {wo_info['extraction_quality']}<br>
+                    <strong>Engine time:</strong> {', '.join(f'{engine} {seconds:.2f}s' for engine, seconds in wo_info['engine_times'].items())}
                     </div>
                     """, unsafe_allow_html=True)
                
                 # Compare fields
                 st.markdown('<div class="section-header">🔍 Comparison Results</div>', unsafe_allow_html=True)
-                results_df = compare_fields_enhanced(wo_fields, po_fields, model)
+                embedding_cache = get_embedding_cache()
+                compare_key = ("compare", po_key, wo_key, get_model_name(model))
+                results_df = cache.get(compare_key)
+                if results_df is None:
+                    results_df = compare_fields_enhanced(wo_fields, po_fields, model, embedding_cache)
+                    if getattr(model, "lost", False):
+                        # Scored without the model, so not cached; the next run reconnects or loads one here
+                        st.error("❌ Shared model server stopped answering: semantic scores were skipped and "
+                                 "fuzzy scores shown. Run the comparison again to reconnect or load the model here.")
+                    else:
+                        cache.put(compare_key, results_df)
                
                 # Style the dataframe
                 st.dataframe(
@@ -1876,6 +661,23 @@ elif tool == "PO vs WO Comparison":
                     hide_index=True
                 )
                
+                if embedding_cache:
+                    cache_stats = embedding_cache.stats()
+                    st.caption(
+                        f"Embedding cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                        f"{cache_stats['entries']} stored values"
+                    )
+               
+                # Which fields needed the sentence model since the app started
+                st.caption(f"Scoring tiers: {format_score_tier_counts(score_tier_counts())}")
+               
+                # Which extraction patterns have fired since the app started
+                with st.expander("🔎 Pattern hit counts"):
+                    pattern_hits = pd.DataFrame(
+                        sorted(PATTERNS.hit_counts().items(), key=lambda x: -x[1]), columns=["Pattern", "Hits"]
+                    )
+                    st.dataframe(pattern_hits, use_container_width=True, hide_index=True)
+               
                 # Summary statistics
                 match_count = len([v for v in results_df["Verdict"] if "✅" in v])
                 total_fields = len(results_df)
@@ -1932,10 +734,9 @@ elif tool == "PO vs WO Comparison":
                         )
                
                 # Display PO items if available
-                if po_items:
+                if not po_items.empty:
                     st.markdown('<div class="section-header">📦 Extracted PO Items</div>', unsafe_allow_html=True)
-                    po_items_df = pd.DataFrame(po_items)
-                    st.dataframe(po_items_df, use_container_width=True, hide_index=True)
+                    st.dataframe(po_items, use_container_width=True, hide_index=True)
                
             except Exception as e:
                 st.markdown(f'<div class="error-box">❌ An error occurred during processing: {str(e)}</div>', unsafe_allow_html=True)
@@ -1948,6 +749,9 @@ elif tool == "PO vs WO Comparison":
                         st.text(f"PO text length: {len(po_text)}")
                     if 'wo_text' in locals():
                         st.text(f"WO text length: {len(wo_text)}")
+            finally:
+                release_upload_source(po_source)
+                release_upload_source(wo_source)
     else:
         st.markdown('<div class="info-box">👆 Please upload both PO and WO PDF files to begin comparison.</div>', unsafe_allow_html=True)
        
@@ -1994,4 +798,28 @@ elif tool == "PO vs WO Comparison":
             - Garment Components: Care Composition in CC column in email body table
             - Additional Instructions: Email body table
             - Deliver To: Delivery Location at end of PO
-            """)
\ No newline at end of file
+            """)
+
+# ======================
+# STARTUP PROFILING
+# ======================
+
+# Set PO_WO_PROFILE_STARTUP=1 to report how long each script run takes and
+# which heavy modules this process has loaded so far.
+if os.environ.get("PO_WO_PROFILE_STARTUP"):
+    heavy_modules = ["pandas", "pdfplumber", "fitz", "PyPDF2", "reportlab", "bs4",
+                     "po_wo_comparison", "sentence_transformers", "torch", "tensorflow"]
+    loaded = [name for name in heavy_modules if name in sys.modules]
+    elapsed_ms = (time.perf_counter() - _SCRIPT_START) * 1000
+    try:
+        import resource
+        peak_rss = f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB"
+    except ImportError:  # not available on Windows
+        peak_rss = "n/a"
+   
+    logger.info(f"Script run for '{tool}' took {elapsed_ms:.0f} ms; peak RSS {peak_rss}; heavy modules loaded: {loaded}")
+    st.sidebar.markdown("---")
+    st.sidebar.caption(
+        f"⏱️ Script run: {elapsed_ms:.0f} ms · Peak RSS: {peak_rss}  \n"
+        f"Heavy modules loaded: {', '.join(loaded) or 'none'}"
+    )
\ No newline at end of file
@@ -0,0 +1,468 @@
+"""Named, precompiled regex patterns shared by the PO/WO and email field extractors
+
+Every pattern is compiled once at import time and looked up by name, e.g.
+PATTERNS["wo.product_code"].search(text), or PATTERNS.group("care_code") for an
+ordered list of alternatives. Each pattern counts the matches it returns, so
+PATTERNS.hit_counts() shows which patterns actually fire. A KeywordScanner runs
+a set of keyword-led patterns only where their keywords occur in the text.
+"""
+
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# ======================
+# PATTERN REGISTRY
+# ======================
+
+class NamedPattern:
+    """Compiled regex that counts every match it returns"""
+
+    __slots__ = ("name", "regex", "hits", "_lock")
+
+    def __init__(self, name: str, regex: "re.Pattern", lock: threading.Lock):
+        self.name = name
+        self.regex = regex
+        self.hits = 0
+        self._lock = lock
+
+    @property
+    def pattern(self) -> str:
+        return self.regex.pattern
+
+    def _count(self, n: int = 1):
+        with self._lock:
+            self.hits += n
+
+    def search(self, string, *args):
+        match = self.regex.search(string, *args)
+        if match:
+            self._count()
+        return match
+
+    def match(self, string, *args):
+        match = self.regex.match(string, *args)
+        if match:
+            self._count()
+        return match
+
+    def findall(self, string, *args) -> list:
+        found = self.regex.findall(string, *args)
+        if found:
+            self._count(len(found))
+        return found
+
+    def finditer(self, string, *args):
+        for match in self.regex.finditer(string, *args):
+            self._count()
+            yield match
+
+    def sub(self, repl, string, count: int = 0) -> str:
+        result, n = self.regex.subn(repl, string, count)
+        if n:
+            self._count(n)
+        return result
+
+    def __repr__(self):
+        return f"NamedPattern({self.name!r}, {self.regex.pattern!r})"
+
+# Characters that re.IGNORECASE matches to an ASCII letter but str.lower() does not fold
+# to it; after this table, text.lower() agrees with IGNORECASE and keeps every offset
+_KEYWORD_FOLD = str.maketrans({"ſ": "s", "ı": "i", "İ": "i"})
+
+class KeywordScanner:
+    """Finds the matches of keyword-led patterns without a full regex pass per pattern
+
+    keywords maps a lower-case keyword (a literal, or a regex compiled against the
+    folded text) to the patterns whose matches always start with it, ignoring case;
+    LINE_START stands for the text start and every newline and the position after it.
+    scan(text).finditer(pattern) tries the pattern only where its keyword occurs and
+    yields the same matches as pattern.finditer(text), for patterns that never match
+    the empty string.
+    """
+
+    LINE_START = "^"
+
+    def __init__(self, keywords: Dict[str, List[NamedPattern]]):
+        self.keywords: Dict[str, object] = {}
+        for keyword, patterns in keywords.items():
+            if keyword != self.LINE_START and re.escape(keyword) != keyword:
+                keyword_finder = re.compile(f"(?={keyword})")
+            else:
+                keyword_finder = keyword
+            for named in patterns:
+                self.keywords[named.name] = keyword_finder
+
+    def scan(self, text: str) -> "KeywordScan":
+        return KeywordScan(self, text)
+
+class KeywordScan:
+    """Keyword positions of one text, found lazily and shared by every pattern led by that keyword"""
+
+    def __init__(self, scanner: KeywordScanner, text: str):
+        self.text = text
+        self._keywords = scanner.keywords
+        self._folded: Optional[str] = None
+        self._positions: Dict[object, Tuple[List[int], object]] = {}
+
+    def _keyword_positions(self, keyword):
+        if self._folded is None:
+            self._folded = self.text.translate(_KEYWORD_FOLD).lower()
+        folded = self._folded
+        if keyword == KeywordScanner.LINE_START:
+            last = 0
+            yield 0
+            pos = folded.find("\n")
+            while pos != -1:
+                if pos > last:
+                    yield pos
+                yield pos + 1
+                last = pos + 1
+                pos = folded.find("\n", pos + 1)
+        elif isinstance(keyword, str):
+            pos = folded.find(keyword)
+            while pos != -1:
+                yield pos
+                pos = folded.find(keyword, pos + 1)
+        else:
+            for found in keyword.finditer(folded):
+                yield found.start()
+
+    def finditer(self, pattern: NamedPattern):
+        keyword = self._keywords[pattern.name]
+        if keyword not in self._positions:
+            self._positions[keyword] = ([], self._keyword_positions(keyword))
+        positions, pending = self._positions[keyword]
+        index = 0
+        last_end = 0
+        while True:
+            if index == len(positions):
+                pos = next(pending, None)
+                if pos is None:
+                    return
+                positions.append(pos)
+            pos = positions[index]
+            index += 1
+            # Same non-overlap rule as finditer: the next match starts after the last one
+            if pos < last_end:
+                continue
+            match = pattern.match(self.text, pos)
+            if match:
+                last_end = match.end()
+                yield match
+
+class PatternRegistry:
+    """Name -> NamedPattern map with per-pattern hit counters"""
+
+    def __init__(self):
+        self._patterns: Dict[str, NamedPattern] = {}
+        self._groups: Dict[str, Tuple[NamedPattern, ...]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, pattern: str, flags: int = 0) -> NamedPattern:
+        """Compile and register a pattern; re-registering the same name must not change it"""
+        existing = self._patterns.get(name)
+        if existing is not None:
+            if existing.regex.pattern != pattern or existing.regex.flags != re.compile(pattern, flags).flags:
+                raise ValueError(f"Pattern {name!r} is already registered with a different regex")
+            return existing
+        named = NamedPattern(name, re.compile(pattern, flags), self._lock)
+        self._patterns[name] = named
+        self._groups.clear()
+        return named
+
+    def register_group(self, prefix: str, patterns: List[Tuple[str, str]], flags: int = 0):
+        """Register (name, pattern) alternatives as prefix.name, keeping their order"""
+        for name, pattern in patterns:
+            self.register(f"{prefix}.{name}", pattern, flags)
+
+    def __getitem__(self, name: str) -> NamedPattern:
+        return self._patterns[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._patterns
+
+    def group(self, prefix: str) -> Tuple[NamedPattern, ...]:
+        """Patterns registered under prefix, in registration (priority) order"""
+        group = self._groups.get(prefix)
+        if group is None:
+            group = tuple(p for name, p in self._patterns.items() if name.startswith(prefix + "."))
+            self._groups[prefix] = group
+        return group
+
+    def hit_counts(self) -> Dict[str, int]:
+        """Matches returned so far by each registered pattern"""
+        with self._lock:
+            return {name: p.hits for name, p in self._patterns.items()}
+
+    def add_hits(self, hits: Dict[str, int]):
+        """Fold hit counts recorded in another process into this registry"""
+        with self._lock:
+            for name, n in hits.items():
+                if name in self._patterns:
+                    self._patterns[name].hits += n
+
+    def scanner(self, keywords: Dict[str, List[str]]) -> KeywordScanner:
+        """KeywordScanner over registered patterns, given as {leading keyword: [pattern names]}"""
+        return KeywordScanner({k: [self[name] for name in names] for k, names in keywords.items()})
+
+    def reset_counts(self):
+        with self._lock:
+            for p in self._patterns.values():
+                p.hits = 0
+
+PATTERNS = PatternRegistry()
+
+# ======================
+# TEXT CLEANUP
+# ======================
+
+PATTERNS.register("text.whitespace", r'\s+')
+PATTERNS.register("text.blank_lines", r'\n\s*\n')
+PATTERNS.register("text.page_marker", r'--- Page \d+ ---')
+PATTERNS.register("text.table_marker", r'--- Table \d+ on Page \d+ ---')
+PATTERNS.register("text.structured_page_marker", r'--- Structured Page \d+ ---')
+PATTERNS.register("text.marker_page", r'Page (\d+) ---')
+PATTERNS.register("text.file_path", r'[A-Za-z]:\\[^\\]+\\[^\s]*')
+PATTERNS.register("text.url", r'https?://[^\s]+')
+PATTERNS.register("text.www", r'www\.[^\s]+')
+PATTERNS.register("text.punctuation", r'[^\w\s:/\-.,()%&]')
+PATTERNS.register("text.slashes", r'[/\\]+')
+PATTERNS.register("text.non_word", r'[^\w\s]')
+PATTERNS.register("text.non_alnum", r'[\W_]+')
+PATTERNS.register("text.zero_decimals", r'(?<=\d)\.0+\b')
+PATTERNS.register_group("text.noise", [
+    ("decoration", r"exclusive of decoration"),
+    ("made_in_sri_lanka", r"made in sri lanka"),
+    ("page", r"page \d+"),
+    ("table", r"table \d+"),
+    ("leading_number", r"^\d+\s*[:|.]"),
+    ("bullet", r"^\s*[-•]\s*"),
+], re.IGNORECASE)
+
+# ======================
+# PO LINE ITEMS
+# ======================
+
+PO_SIZE_KEYWORDS = ["XS", "S", "M", "L", "XL", "XXL", "XXXL", "XXG", "P", "G"]
+PO_GARMENT_TYPES = ["THONG", "BRIEF", "BIKINI", "BOYSHORT", "HIPSTER", "PANTY", "PANTIE"]
+
+PATTERNS.register_group("po.style_number", [
+    ("style", r'Style\s*[:\-]?\s*([A-Z0-9\-]+)'),
+    ("style_no", r'Style\s*No\s*[:\-]?\s*([A-Z0-9\-]+)'),
+    ("item_style", r'Item\s*Style\s*[:\-]?\s*([A-Z0-9\-]+)'),
+], re.IGNORECASE)
+PATTERNS.register("po.items.sup_ref", r"Sup\.?\s*Ref\.?\s*[:\-]?\s*([A-Z]+[-\s]?\d+)", re.IGNORECASE)
+PATTERNS.register("po.items.tag_code", r"TAG\.PRC\.TKT_(.*?)_REG")
+PATTERNS.register("po.items.tag_line", r'^(\d+)\s+TAG\.PRC\.TKT_.*?([\d,]+\.\d+)\s+PCS')
+PATTERNS.register("po.items.item_line", r'^(\d+)\s+([A-Z0-9]+)\s+(\d+)\s+([\d,]+\.\d+)\s+PCS')
+PATTERNS.register("po.items.size_keyword", r'\b(' + '|'.join(PO_SIZE_KEYWORDS) + r')\b', re.IGNORECASE)
+
+# ======================
+# DOCUMENT SECTIONS
+# ======================
+
+# Section headers the field extractors anchor on, located per page to decide where tables are extracted
+PATTERNS.register_group("wo.section", [
+    ("product_details", r"Product\s+Details"),
+    ("size_breakdown", r"Size\s*/\s*Age\s+Breakdown|Panties/Swim Bottoms.*Order Quantity"),
+    ("garment_components", r"Garment\s+Components"),
+    ("care_instructions", r"Care\s+Instructions"),
+    ("order_delivery", r"Order\s+Delivery\s+Details"),
+], re.IGNORECASE)
+PATTERNS.register_group("po.section", [
+    ("line_items", r"Item\s+Description|Colour/Size/Destination"),
+    ("delivery", r"Delivery\s+Location"),
+], re.IGNORECASE)
+
+# ======================
+# PO vs WO FIELDS
+# ======================
+
+PATTERNS.register_group("care_code", [
+    ("mww", r"\b(MWW\d+)\b"),
+    ("labelled", r"Care\s+(?:Code|Instructions?)\s*:?\s*(MWW\d+)"),
+    ("short_label", r"Care\s*:?\s*(MWW\d+)"),
+], re.IGNORECASE)
+
+PATTERNS.register("wo.product_code", r"Product\s+Code\s*:\s*(LB\s*\d{4,}(?:\s*/?\w+)?(?:\s*/?\w+)?)", re.IGNORECASE)
+PATTERNS.register("po.product_code.description", r"_([^_-]+)-")
+PATTERNS.register("po.product_code.care_label", r"LBL\.CARE_LB\s*(\d+)")
+PATTERNS.register("product_code.lb_fallback", r"\b(LB\s*\d{4,})\b", re.IGNORECASE)
+
+PATTERNS.register("wo.silhouette", r"Silhouette\s*:\s*[_\-\s]*([A-Za-z0-9\s\/&]+)", re.IGNORECASE)
+for _garment_type in PO_GARMENT_TYPES:
+    PATTERNS.register(f"po.silhouette.{_garment_type.lower()}", rf"([A-Z\s]*{_garment_type}[A-Z\s]*)")
+
+PATTERNS.register("wo.vsd", r"VSD#\s*:?\s*([A-Za-z0-9\-]+)", re.IGNORECASE)
+PATTERNS.register("wo.vss", r"VSS#\s*:?\s*([A-Za-z0-9\-]+)", re.IGNORECASE)
+PATTERNS.register("po.vsd.colour_line", r'(\d{6})\s+([A-Z]{3})')
+PATTERNS.register("po.vss.care_label", r'LBL\.CARE_LB\s+.*?-(\d+)\s*$')
+PATTERNS.register("po.vss.trailing_number", r'-(\d+)(?:\s*)$')
+
+PATTERNS.register_group("factory_id", [
+    ("factory_id", r"Factory\s*ID\s*:\s*(\d{8})"),
+    ("factoryid", r"FactoryID\s*:\s*(\d{8})"),
+    ("factory_code", r"Factory\s+Code\s*:\s*(\d{8})"),
+], re.IGNORECASE)
+
+PATTERNS.register_group("mfr_date.labelled", [
+    ("date_of_mfr", r"Date\s+of\s+MFR#\s*:\s*(\d{2}\s*\d{2})"),
+    ("dateofmfr", r"DateofMFR#\s*:\s*(\d{4})"),
+    ("mfr", r"MFR#\s*:\s*(\d{2}\s*\d{2})"),
+    ("date_mfr", r"Date.*MFR.*:\s*(\d{2}\s*\d{2})"),
+], re.IGNORECASE)
+PATTERNS.register_group("mfr_date.bare", [
+    ("spaced", r"\b(\d{1,2})\s+(\d{2})\b"),
+    ("slashed", r"\b(\d{1,2})/(\d{2})\b"),
+])
+
+# Matched against lower-cased WO text, so these carry no IGNORECASE flag
+PATTERNS.register_group("wo.country", [
+    ("made_in", r"made\s+in\s+([a-z\s]+)"),
+    ("french", r"fabriqu[eé]\s+(?:au|en)\s+([a-z\s]+)"),
+    ("spanish", r"hecho\s+en\s+([a-z\s]+)"),
+    ("country_of_origin", r"country\s+of\s+origin\s*[:\-]?\s*([a-z\s]+)"),
+    ("countryoforigin", r"countryoforigin\s*[:\-]?\s*([a-z\s]+)"),
+])
+PATTERNS.register("po.country.coo", r"COO\s*[:\-]?\s*([^\n\r]+)", re.IGNORECASE)
+
+PATTERNS.register_group("wo.instructions", [
+    ("additional", r"Additional\s+Instructions\s*:?\s*([^\n]{10,100})"),
+    ("instructions", r"instructions\s*:?\s*([^\n]{10,100})"),
+    ("special", r"special\s+(?:requirements|instructions)\s*:?\s*([^\n]{10,100})"),
+], re.IGNORECASE)
+PATTERNS.register_group("po.instructions", [
+    ("additional", r"Additional\s+Instructions[:\s]*([^\n]+)"),
+    ("instructions", r"Instructions[:\s]*([^\n]+)"),
+], re.IGNORECASE)
+
+PATTERNS.register("wo.fibre.section", r"Garment Components\s*&\s*Fibre Contents\s*:(.*?)(?=Care Instructions|Technical Specifications|End of Works Order|$)", re.DOTALL | re.IGNORECASE)
+PATTERNS.register_group("wo.fibre.section_fibre", [
+    ("cotton_multilingual", r"(\d+)%\s*(cotton/coton/algodón/cotone/棉)"),
+    ("modal_multilingual", r"(\d+)%\s*(modal/莫代尔)"),
+    ("elastane_multilingual", r"(\d+)%\s*(elastane/élasthanne/elastano/elastan/氨纶)"),
+    ("polyamide_multilingual", r"(\d+)%\s*(polyamide/poliamida/poliammide/锦纶)"),
+    ("polyester_multilingual", r"(\d+)%\s*(polyester/poliéster/poliestere/聚酯纤维)"),
+    ("recycled_polyamide", r"(\d+)%\s*(recycled\s+polyamide|polyamide\s+recyclé|poliamida\s+reciclada|poliammide\s*riciclata)"),
+    ("cotton", r"(\d+)%\s*(cotton)"),
+    ("modal", r"(\d+)%\s*(modal)"),
+    ("elastane", r"(\d+)%\s*(elastane)"),
+    ("polyamide", r"(\d+)%\s*(polyamide)"),
+    ("polyester", r"(\d+)%\s*(polyester)"),
+], re.IGNORECASE)
+PATTERNS.register_group("wo.fibre.general", [
+    ("cotton", r"(\d+)%\s*(cotton/coton/algodón/cotone/棉|cotton)"),
+    ("modal", r"(\d+)%\s*(modal/莫代尔|modal)"),
+    ("elastane", r"(\d+)%\s*(elastane/élasthanne/elastano/elastan/氨纶|elastane)"),
+    ("recycled_polyamide", r"(\d+)%\s*(recycled\s+polyamide)"),
+    ("polyamide", r"(\d+)%\s*(polyamide/poliamida/poliammide/锦纶|polyamide)"),
+    ("polyester", r"(\d+)%\s*(polyester/poliéster/poliestere/聚酯纤维|polyester)"),
+], re.IGNORECASE)
+PATTERNS.register("po.fibre.care_composition", r"Care Composition in CC\s+(.*?)(?=\n\s*(?:Brandix|Table|Item number|Page:|PO Number:|$))", re.DOTALL | re.IGNORECASE)
+PATTERNS.register_group("po.fibre.component", [
+    ("body", r"Body\s*:\s*(.*?)(?=\s+Lace\s*:|$)"),
+    ("lace", r"Lace\s*:\s*(.*?)(?=\s+Gusset\s*:|$)"),
+    ("gusset", r"Gusset\s*:\s*(.*?)(?=\s+[A-Z][a-z]+\s*:|$)"),
+], re.DOTALL | re.IGNORECASE)
+PATTERNS.register("po.fibre.percentage", r'(\d+)%\s*([a-zA-Z\s]+?)(?=\s*\d+%|\s*$)')
+PATTERNS.register("po.fibre.general", r"(\d+)%\s*((?:Recycled\s+)?(?:Polyamide|Elastane|Cotton|Cot|Polyester|Modal))", re.IGNORECASE)
+
+PATTERNS.register("wo.size_breakdown.row", r'^([A-Z]{1,3})(?:/[^/\s]+)*\s+(\d{1,6}(?:,\d{3})*)$')
+PATTERNS.register("wo.size_breakdown.slashed_size", r'/\s*([A-Z]{1,3})\s*/')
+PATTERNS.register("wo.size_breakdown.decimal_qty", r'^\d+\.\d{2}$')
+PATTERNS.register("wo.size_breakdown.integer_qty", r'^\d{1,6}(?:,\d{3})*$')
+PATTERNS.register_group("wo.size_breakdown.fallback", [
+    ("size_qty", r'([A-Z]{1,3})(?:/[^/\s]+)*\s+(\d{1,6}(?:,\d{3})*)'),
+    ("size_separator_qty", r'([A-Z]{1,3})\s*[:\-]\s*(\d{1,6}(?:,\d{3})*)'),
+])
+PATTERNS.register("wo.size_breakdown.number", r'\d+(?:\.\d{2})?')
+PATTERNS.register("po.size_breakdown.item_line", r'^\d+\s+[A-Z0-9]+\s+(\d+(?:\.\d{2})?)\s+PCS')
+PATTERNS.register("po.size_breakdown.qty_pcs", r'(\d+(?:\.\d{2})?)\s+PCS')
+PATTERNS.register("po.size_breakdown.number", r'\b(\d+(?:\.\d{2})?)\b')
+
+PATTERNS.register("wo.deliver_to.customer_delivery_name", r"Customer\s+Delivery\s+Name\s*:\s*([^\n]+)", re.IGNORECASE)
+PATTERNS.register("wo.deliver_to.deliver_to", r"Deliver\s+To\s*:\s*([^\n]+)", re.IGNORECASE)
+PATTERNS.register("po.deliver_to.location", r"Delivery\s+Location\s*:\s*([^\n]+)", re.IGNORECASE)
+
+# ======================
+# FIELD COMPARISON
+# ======================
+
+# Typed values read back out of extracted field strings by the structured comparators
+PATTERNS.register("compare.size_quantity", r'\b(\d*[A-Z]{1,4})\s*-\s*(\d[\d,]*(?:\.\d+)?)\b', re.IGNORECASE)
+PATTERNS.register_group("compare.fibre", [
+    ("fibre_first", r'(?P<fibre>[a-z][a-z ]*?)\s*-\s*(?P<percent>\d+(?:\.\d+)?)\s*%'),
+    ("percent_first", r'(?P<percent>\d+(?:\.\d+)?)\s*%\s*(?P<fibre>[a-z][a-z ]*[a-z])'),
+], re.IGNORECASE)
+PATTERNS.register("compare.code", r'\b(VSD|VSS)#\s*([A-Za-z0-9][A-Za-z0-9 \-]*?)\s*(?=\(|\||$)', re.IGNORECASE)
+
+# ======================
+# EMAIL FIELDS
+# ======================
+
+PATTERNS.register("email.html_tag", r'<[^>]+>')
+PATTERNS.register("email.has_letter", r'[A-Za-z]')
+PATTERNS.register("email.has_alnum", r'[A-Za-z0-9]')
+PATTERNS.register_group("email.coo", [
+    ("coo", r'COO[:\s]*([A-Za-z]{2,}(?:\s+[A-Za-z]+)*)'),  # COO: CHINA or COO VIETNAM
+    ("country_of_origin", r'Country\s*of\s*Origin[:\s]*([A-Za-z\s]+?)(?:\n|<br|$|;|,)'),
+    ("made_in", r'Made\s*in[:\s]*([A-Za-z\s]+?)(?:\n|<br|$|;|,)'),
+    ("origin", r'Origin[:\s]*([A-Za-z\s]+?)(?:\n|<br|$|;|,)'),
+    ("country", r'Country[:\s]*([A-Za-z\s]+?)(?:\n|<br|$|;|,)'),
+    ("coo_equals", r'COO\s*=\s*([A-Za-z\s]+?)(?:\n|<br|$|;|,)'),
+], re.IGNORECASE | re.MULTILINE)
+PATTERNS.register_group("email.factory", [
+    # Direct patterns
+    ("factory_code", r'Factory\s*Code[:\s=]*([^\n\r<>,;|\s]+)'),
+    ("factory_id", r'Factory\s*ID[:\s=]*([^\n\r<>,;|\s]+)'),
+    ("factory", r'Factory[:\s=]+([A-Za-z0-9\-_.]+)'),
+    ("supplier_code", r'Supplier\s*Code[:\s=]*([^\n\r<>,;|\s]+)'),
+    ("supplier", r'Supplier[:\s=]+([A-Za-z0-9\-_.]+)'),
+    ("plant_code", r'Plant\s*Code[:\s=]*([^\n\r<>,;|\s]+)'),
+    ("plant_id", r'Plant\s*ID[:\s=]*([^\n\r<>,;|\s]+)'),
+    ("vendor_code", r'Vendor\s*Code[:\s=]*([^\n\r<>,;|\s]+)'),
+    ("vendor_id", r'Vendor\s*ID[:\s=]*([^\n\r<>,;|\s]+)'),
+    ("vendor", r'Vendor[:\s=]+([A-Za-z0-9\-_.]+)'),
+    ("mfg_code", r'Mfg\s*Code[:\s=]*([^\n\r<>,;|\s]+)'),
+    ("mfg", r'Mfg[:\s=]+([A-Za-z0-9\-_.]+)'),
+    ("manufacturer", r'Manufacturer[:\s=]+([A-Za-z0-9\-_.]+)'),
+    ("manufacturing_code", r'Manufacturing\s*Code[:\s=]*([^\n\r<>,;|\s]+)'),
+    ("production_code", r'Production\s*Code[:\s=]*([^\n\r<>,;|\s]+)'),
+    ("mill_code", r'Mill\s*Code[:\s=]*([^\n\r<>,;|\s]+)'),
+    ("site_code", r'Site\s*Code[:\s=]*([^\n\r<>,;|\s]+)'),
+    ("location", r'Location[:\s=]+([A-Za-z0-9\-_.]+)'),
+    # Special patterns for different formats
+    ("f_c", r'F\s*C[:\s=]*([A-Za-z0-9\-_.]+)'),  # FC: code
+    ("fc", r'FC[:\s=]*([A-Za-z0-9\-_.]+)'),  # FC: code
+    ("standalone_hyphenated", r'(?:^|\n)([A-Z0-9]{3,}[-_][A-Z0-9]{2,})'),  # Stand-alone codes like ABC-123
+    ("standalone_alnum", r'(?:^|\n)([A-Z]{2,}[0-9]{2,})'),  # Codes like ABC123
+], re.IGNORECASE | re.MULTILINE)
+PATTERNS.register_group("email.factory_standalone", [
+    ("alnum", r'(?:^|\s)([A-Z]{2,}[0-9]{2,})(?:\s|$)'),  # ABC123
+    ("hyphenated", r'(?:^|\s)([A-Z0-9]{3,}[-_][A-Z0-9]{2,})(?:\s|$)'),  # ABC-123
+    ("letters_hyphen_digits", r'(?:^|\s)([A-Z]{3,}[-_][0-9]{2,})(?:\s|$)'),  # ABC-123
+], re.MULTILINE)
+# COO and Factory Code patterns by leading keyword, so extract_fields locates each keyword once
+EMAIL_FIELD_SCANNER = PATTERNS.scanner({
+    "coo": ["email.coo.coo", "email.coo.coo_equals"],
+    "country": ["email.coo.country_of_origin", "email.coo.country"],
+    "made": ["email.coo.made_in"],
+    "origin": ["email.coo.origin"],
+    "factory": ["email.factory.factory_code", "email.factory.factory_id", "email.factory.factory"],
+    "supplier": ["email.factory.supplier_code", "email.factory.supplier"],
+    "plant": ["email.factory.plant_code", "email.factory.plant_id"],
+    "vendor": ["email.factory.vendor_code", "email.factory.vendor_id", "email.factory.vendor"],
+    "mfg": ["email.factory.mfg_code", "email.factory.mfg"],
+    "manufactur": ["email.factory.manufacturer", "email.factory.manufacturing_code"],
+    "production": ["email.factory.production_code"],
+    "mill": ["email.factory.mill_code"],
+    "site": ["email.factory.site_code"],
+    "location": ["email.factory.location"],
+    r"f\s*c": ["email.factory.f_c", "email.factory.fc"],
+    KeywordScanner.LINE_START: ["email.factory.standalone_hyphenated", "email.factory.standalone_alnum"],
+})
+PATTERNS.register_group("email.factory_table", [
+    ("keyword_then_code", r'(?:Factory|Supplier|Vendor|Plant|Mfg).*?([A-Za-z0-9\-_.]{3,})'),
+    ("code_then_keyword", r'([A-Za-z0-9\-_.]{3,}).*?(?:Factory|Supplier|Vendor|Plant)'),
+], re.IGNORECASE)
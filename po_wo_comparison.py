@@ -0,0 +1,2371 @@
+"""PO vs WO extraction and comparison logic shared by the Streamlit app and the batch CLI"""
+
+import pdfplumber
+import pandas as pd
+from rapidfuzz import fuzz
+import os
+import io
+import logging
+import mmap
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional
+import hashlib
+import threading
+import sqlite3
+import time
+import warnings
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import multiprocessing
+
+from patterns import PATTERNS, PO_SIZE_KEYWORDS, PO_GARMENT_TYPES
+
+logger = logging.getLogger(__name__)
+
+# ======================
+# HELPER FUNCTIONS
+# ======================
+
+def clean_quantity(quantity_str):
+    """Clean quantity string by removing commas and converting to float"""
+    try:
+        return float(quantity_str.replace(',', ''))
+    except (ValueError, AttributeError):
+        return 0.0
+
+# Uploads larger than this go to the extraction workers as a temp file they memory-map
+UPLOAD_SPILL_BYTES = int(float(os.environ.get("PO_WO_UPLOAD_SPILL_MB", "8")) * 1024 * 1024)
+
+def upload_source(data: bytes):
+    """What to hand process_*_document for an upload: the bytes, or for large ones the path of a temp copy"""
+    if len(data) <= UPLOAD_SPILL_BYTES:
+        return data
+    with tempfile.NamedTemporaryFile(prefix="po_wo_", suffix=".pdf", delete=False) as f:
+        f.write(data)
+    return f.name
+
+def release_upload_source(source):
+    """Remove the temp copy made by upload_source, if there is one"""
+    if isinstance(source, str):
+        try:
+            os.remove(source)
+        except OSError as e:
+            logger.warning(f"Could not remove spilled upload {source}: {e}")
+
+def map_file(path: str) -> mmap.mmap:
+    """Read-only memory map of a whole file"""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+class ParsedPDF:
+    """PDF parsed once with pdfplumber (on first use) and shared by all PO/WO extractors
+
+    Built from a file object, or from the path of a spilled upload, which is memory-mapped
+    rather than read so every engine works from the same pages without copying them.
+    """
+
+    def __init__(self, pdf_file):
+        self.path: Optional[str] = None
+        self._map: Optional[mmap.mmap] = None
+        self._streams: List[mmap.mmap] = []
+        if isinstance(pdf_file, str):
+            self.path = pdf_file
+            self._map = map_file(pdf_file)
+            self.data = memoryview(self._map)
+        else:
+            pdf_file.seek(0)
+            self.data = pdf_file.read()
+        self.parse_seconds = 0.0
+        self._parsed = False
+        self._digest: Optional[str] = None
+        self._page_texts: List[str] = []
+        self._error: Optional[Exception] = None
+        self._text: Optional[str] = None
+        self._lines: Optional[List[str]] = None
+        self._pdfplumber = None
+        self._open_page = None
+        self._pymupdf = None
+        self._pypdf2 = None
+
+    def parse(self):
+        """Run the pdfplumber text pass over every page unless it already ran"""
+        for _ in self.iter_page_texts():
+            pass
+
+    def iter_page_texts(self) -> Iterator[str]:
+        """Yield each page's text, running the pdfplumber text pass only as far as it is consumed
+
+        The page just read keeps its parsed layout until the next one is read, so its
+        tables can be extracted without parsing it again; earlier pages' layouts are released,
+        while their text is kept for the life of the document.
+        """
+        page_num = 0
+        while True:
+            if page_num < len(self._page_texts):
+                yield self._page_texts[page_num]
+                page_num += 1
+            elif self._parsed:
+                return
+            else:
+                self._read_next_page()
+
+    def _read_next_page(self):
+        """Add the next page's pdfplumber text, or mark the text pass done after the last page"""
+        start = time.perf_counter()
+        try:
+            if self._pdfplumber is None:
+                # Kept open so tables can be extracted later, only from the pages that need them
+                self._pdfplumber = pdfplumber.open(self.open_stream())
+            self._close_open_page()
+            pages = self._pdfplumber.pages
+            if len(self._page_texts) < len(pages):
+                self._open_page = pages[len(self._page_texts)]
+                self._page_texts.append(self._open_page.extract_text() or "")
+            else:
+                self._parsed = True
+        except Exception as e:
+            logger.warning(f"pdfplumber parsing failed: {e}")
+            self._error = e
+            self._parsed = True
+        self.parse_seconds += time.perf_counter() - start
+
+    def _close_open_page(self):
+        """Release the parsed layout of the page the text pass read last"""
+        if self._open_page is not None:
+            self._open_page.close()
+            self._open_page = None
+
+    def iter_page_lines(self) -> Iterator[List[str]]:
+        """Yield the stripped, non-empty text lines of each page"""
+        for page_text in self.iter_page_texts():
+            yield [ln.strip() for ln in page_text.split("\n") if ln.strip()]
+
+    @property
+    def page_texts(self) -> List[str]:
+        self.parse()
+        return self._page_texts
+
+    @property
+    def digest(self) -> str:
+        if self._digest is None:
+            self._digest = content_hash(self.data)
+        return self._digest
+
+    def page_tables(self, page_num: int) -> List:
+        """pdfplumber tables of one page, extracted on first request and cached by (content hash, page)"""
+        def extract():
+            if self._pdfplumber is None:
+                self.parse()
+            page = self._pdfplumber.pages[page_num]
+            tables = page.extract_tables() or []
+            if page is not self._open_page:
+                page.close()
+            return tables
+        return TABLE_CACHE.get_or_compute((self.digest, page_num), extract)
+
+    @property
+    def error(self) -> Optional[Exception]:
+        self.parse()
+        return self._error
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "\n".join(self.page_texts)
+        return self._text
+
+    @property
+    def lines(self) -> List[str]:
+        if self._lines is None:
+            self._lines = [line for page_lines in self.iter_page_lines() for line in page_lines]
+        return self._lines
+
+    @property
+    def page_count(self) -> int:
+        return len(self.page_texts)
+
+    def pymupdf(self):
+        """PyMuPDF document over the same bytes, opened on first use"""
+        if self._pymupdf is None:
+            import fitz  # PyMuPDF, only needed when it probes or stands in for pdfplumber
+            if self.path:
+                self._pymupdf = fitz.open(self.path, filetype="pdf")
+            else:
+                self._pymupdf = fitz.open(stream=self.data, filetype="pdf")
+        return self._pymupdf
+
+    def pypdf2(self):
+        """PyPDF2 reader over the same bytes, opened on first use"""
+        if self._pypdf2 is None:
+            import PyPDF2
+            self._pypdf2 = PyPDF2.PdfReader(self.open_stream())
+        return self._pypdf2
+
+    def open_stream(self):
+        """Binary stream of the PDF for one engine, sharing the bytes (or the file's pages) instead of copying them"""
+        if self.path is None:
+            return io.BytesIO(self.data)
+        # Engines read lazily and seek independently, so each gets its own map
+        stream = map_file(self.path)
+        self._streams.append(stream)
+        return stream
+
+    def close(self):
+        """Close the engines and any file mappings; the extracted text stays available"""
+        self._close_open_page()
+        for engine in (self._pdfplumber, self._pymupdf):
+            if engine is not None:
+                engine.close()
+        for stream in self._streams:
+            stream.close()
+        if self._map is not None:
+            self.data.release()
+            self._map.close()
+
+def parse_pdf(pdf_file) -> ParsedPDF:
+    """Return pdf_file as a ParsedPDF, parsing it only if it is not one already"""
+    if isinstance(pdf_file, ParsedPDF):
+        return pdf_file
+    return ParsedPDF(pdf_file)
+
+def read_pdf_bytes(pdf_file) -> bytes:
+    """Raw bytes of a ParsedPDF or an uploaded PDF file"""
+    if isinstance(pdf_file, ParsedPDF):
+        return pdf_file.data
+    pdf_file.seek(0)
+    return pdf_file.read()
+
+def extract_style_numbers_from_po_first_page(pdf_file):
+    """Extract style numbers from the first page of PO"""
+    try:
+        doc = parse_pdf(pdf_file)
+        if doc.page_texts:
+            text = doc.page_texts[0]
+            # Look for style number patterns
+            for pattern in PATTERNS.group("po.style_number"):
+                matches = pattern.findall(text)
+                if matches:
+                    return [match.strip().upper() for match in matches]
+    except Exception as e:
+        logging.warning(f"Error extracting style numbers: {e}")
+    return []
+
+def extract_size_from_po_line(line):
+    """Extract size from PO line by finding the last slash and reading the string before it"""
+    valid_sizes = ['XXS', 'XS', 'S', 'M', 'L', 'XL', 'XXL', 'XXXL']
+    # Find the last slash in the line
+    last_slash_index = line.rfind('/')
+    if last_slash_index != -1:
+        # Get the part before the last slash
+        before_last_slash = line[:last_slash_index].strip()
+        # Split by spaces and get the last token
+        tokens = before_last_slash.split()
+        if tokens:
+            size_candidate = tokens[-1].upper()
+            if size_candidate in valid_sizes:
+                return size_candidate
+    return None
+
+# ======================
+# PO vs WO COMPARISON FUNCTIONS
+# ======================
+
+# Lookahead windows of the two PO layouts: colour/size marker, lines searched for it, and
+# the line below the item that carries its size (original layout only)
+PO_ITEM_LAYOUTS = {
+    "tag": ("po.items.tag_line", "Color/Size/Destination :", 4, None),
+    "original": ("po.items.item_line", "Colour/Size/Destination:", 9, 3),
+}
+
+def scan_po_item_lines(lines: List[str], layout: str, stop: Optional[int] = None) -> List[list]:
+    """One pass over the PO lines giving [item match, size line, colour/size line] per item line
+
+    Every item sees exactly what a lookahead from its line would: the first colour/size
+    line within its window (even one below a later item) and the line at its size offset.
+    Only item lines before index stop (default: all) are reported.
+    """
+    pattern_name, marker, window, size_offset = PO_ITEM_LAYOUTS[layout]
+    item_line = PATTERNS[pattern_name]
+    stop = len(lines) if stop is None else stop
+    # Both item patterns start with the item number; isdigit() accepts every \d character
+    candidates = [i for i, line in enumerate(lines[:stop]) if line[:1].isdigit()]
+    marker_lines = [i for i, line in enumerate(lines) if marker in line]
+   
+    records = []
+    for i in candidates:
+        item_match = item_line.match(lines[i])
+        if not item_match:
+            continue
+        size_line = None
+        if size_offset is not None and i + size_offset < len(lines):
+            size_line = lines[i + size_offset]
+        cs_line = None
+        k = bisect_right(marker_lines, i)
+        if k < len(marker_lines) and marker_lines[k] <= i + window:
+            cs_line = lines[marker_lines[k]]
+        records.append([item_match, size_line, cs_line])
+    return records
+
+def iter_po_item_lines(pages: Iterable[List[str]], layout: str) -> Iterator[list]:
+    """Stream scan_po_item_lines over the PO page by page
+
+    Item lines within a lookahead window of the page end wait for the next page, so
+    only those few lines are carried over and items see the same lines as in one pass.
+    """
+    window = PO_ITEM_LAYOUTS[layout][2]
+    carry: List[str] = []
+    for page_lines in pages:
+        lines = carry + page_lines
+        ready = max(len(lines) - window, 0)
+        yield from scan_po_item_lines(lines, layout, stop=ready)
+        carry = lines[ready:]
+    yield from scan_po_item_lines(carry, layout)
+
+PO_ITEM_COLUMNS = ["Item_Number", "Item_Code", "Quantity", "Colour_Code", "Size", "Style 2", "Product_Code"]
+PO_SIZE_ORDER = ["XS", "S", "M", "L", "XL", "XXL"]
+
+def aggregate_po_items(rows: List[tuple]) -> pd.DataFrame:
+    """PO items frame with quantities summed per (size, colour, style) key, keeping the first item's details
+
+    rows are (size key, colour key) + PO_ITEM_COLUMNS values, one per item line.
+    """
+    frame = pd.DataFrame.from_records(rows, columns=["size_key", "colour_key"] + PO_ITEM_COLUMNS)
+    if frame.empty:
+        return frame[PO_ITEM_COLUMNS]
+    # Groups are numbered in order of first appearance; each keeps its first row
+    group = frame.groupby(["size_key", "colour_key", "Style 2"], sort=False).ngroup().to_numpy()
+    items = frame.loc[~pd.Series(group).duplicated().to_numpy(), PO_ITEM_COLUMNS].reset_index(drop=True)
+    items["Quantity"] = frame["Quantity"].groupby(group).sum().to_numpy()
+    return items
+
+def as_item_frame(po_items) -> pd.DataFrame:
+    """Return PO items as a DataFrame, converting a list of item dicts if needed"""
+    if isinstance(po_items, pd.DataFrame):
+        return po_items
+    return pd.DataFrame(list(po_items or []), columns=PO_ITEM_COLUMNS)
+
+def po_size_breakdown(po_items) -> str:
+    """"S-772.0, M-1228.0" quantity totals per size of the PO items, in garment size order"""
+    po_items = as_item_frame(po_items)
+    sizes = po_items["Size"].fillna("").str.strip().str.upper()
+    counted = (sizes != "") & (po_items["Quantity"].fillna(0) != 0)
+    totals = po_items["Quantity"][counted].groupby(sizes[counted], sort=False).sum()
+    if totals.empty:
+        return "Not found"
+   
+    # Known sizes in garment order, anything else after them in order of appearance
+    order = [size for size in PO_SIZE_ORDER if size in totals.index]
+    order += [size for size in totals.index if size not in PO_SIZE_ORDER]
+    totals.index = pd.CategoricalIndex(totals.index, categories=order, ordered=True)
+    return ", ".join(f"{size}-{qty}" for size, qty in totals.sort_index().items())
+
+def extract_po_details(pdf_file) -> pd.DataFrame:
+    """Enhanced function to handle multiple PO formats with quantity aggregation"""
+    return aggregate_po_items(list(iter_po_items(pdf_file)))
+
+def iter_po_items(pdf_file) -> Iterator[tuple]:
+    """Yield one aggregate_po_items row per PO item line
+
+    The layout is decided from markers anywhere in the PO, so the whole pdfplumber text
+    pass runs before the first item is yielded. Only the parsed page layouts are released
+    along the way; the page texts stay in memory, as the extracted text is built from them.
+    """
+    doc = parse_pdf(pdf_file)
+    extracted_styles = extract_style_numbers_from_po_first_page(doc)
+    repeated_style = extracted_styles[0] if extracted_styles else ""
+   
+    def anywhere(marker: str) -> bool:
+        return any(marker in page_text for page_text in doc.iter_page_texts())
+   
+    def first_match(pattern_name: str):
+        matches = (PATTERNS[pattern_name].search(page_text) for page_text in doc.iter_page_texts())
+        return next((match for match in matches if match), None)
+   
+    has_tag_format = anywhere("TAG.PRC.TKT_") and anywhere("Color/Size/Destination :")
+    has_original_format = anywhere("Colour/Size/Destination:") or first_match("po.items.sup_ref")
+   
+    if has_tag_format and not has_original_format:
+        # NEW FORMAT HANDLING
+        tag_match = first_match("po.items.tag_code")
+        product_code_used = tag_match.group(1).strip().upper() if tag_match else ""
+       
+        product_code_used = product_code_used.replace("-", " ")
+       
+        for item_match, _, cs_line in iter_po_item_lines(doc.iter_page_lines(), "tag"):
+            item_no = item_match.group(1)
+            quantity_str = item_match.group(2)
+            quantity = clean_quantity(quantity_str)  # Using updated function
+           
+            colour = size = ""
+            if cs_line is not None:
+                cs_part = cs_line.split(":", 1)[1].strip()
+                cs_parts = [part.strip() for part in cs_part.split(" / ") if part.strip()]
+               
+                if len(cs_parts) >= 2:
+                    colour_part = cs_parts[0].strip()
+                    colour = colour_part.split()[0] if colour_part else ""
+                    size = cs_parts[1].strip().upper()
+           
+            yield (
+                size, colour.upper() if colour else "",
+                item_no, f"TAG_{product_code_used}", quantity,
+                colour.upper() if colour else "", size, repeated_style, product_code_used,
+            )
+    else:
+        # ORIGINAL FORMAT HANDLING
+        sup_ref_match = first_match("po.items.sup_ref")
+        sup_ref_code = sup_ref_match.group(1).strip().upper() if sup_ref_match else ""
+       
+        sup_ref_code = sup_ref_code.replace("-", " ")
+        tag_code = ""
+        lines = (line for page_lines in doc.iter_page_lines() for line in page_lines)
+        for line in lines:
+            if "Item Description" in line:
+                second_line = next(islice(lines, 1, None), None)
+                if second_line is not None:
+                    match = PATTERNS["po.items.tag_code"].search(second_line)
+                    if match:
+                        tag_code = match.group(1).strip().upper()
+                        tag_code = tag_code.replace("-", " ")
+                break
+        product_code_used = sup_ref_code if sup_ref_code else tag_code
+       
+        for item_match, size_line, cs_line in iter_po_item_lines(doc.iter_page_lines(), "original"):
+            item_no, item_code, _, qty_str = item_match.groups()
+            quantity = clean_quantity(qty_str)  # Using updated function
+            colour = size = ""
+           
+            # Try to extract size from the third line (i+3)
+            if size_line is not None:
+                size = extract_size_from_po_line(size_line)
+           
+            # Extract colour from the "Colour/Size/Destination:" line
+            if cs_line is not None:
+                cs = cs_line.split(":", 1)[1].strip()
+                parts = [p.strip() for p in cs.split("/") if p.strip()]
+               
+                if parts:
+                    # Extract colour
+                    colour = parts[0].strip().split()[0].strip().upper()
+                   
+                    # If we haven't found size yet, try to extract it from this line
+                    if not size:
+                        size_part = parts[0].split("|")[0].strip().upper()
+                        if size_part in PO_SIZE_KEYWORDS:
+                            size = size_part
+                        else:
+                            # Try to find size in the parts
+                            size = next((keyword for part in parts for keyword in PO_SIZE_KEYWORDS
+                                         if keyword in part.upper()), "")
+                   
+                    # If still no size, try to find it with regex
+                    if not size:
+                        size_match = PATTERNS["po.items.size_keyword"].search(cs)
+                        if size_match:
+                            size = size_match.group(1).upper()
+           
+            yield (
+                size.upper() if size else "", colour.upper() if colour else "",
+                item_no, item_code, quantity,
+                (colour or "").strip().upper(), (size or "").strip().upper(), repeated_style, product_code_used,
+            )
+
+# Engines tried for each page, in order, by text-layer classification of the document
+ENGINE_ORDER = {
+    "text": ["pdfplumber", "pymupdf", "pypdf2"],
+    "no_text_layer": ["pymupdf", "pypdf2"],
+    "pymupdf_unreadable": ["pdfplumber", "pypdf2"],
+}
+ENGINE_QUALITY = {"pdfplumber": "high", "pymupdf": "medium", "pypdf2": "low"}
+TEXT_PROBE_PAGES = 2
+MIN_PAGE_TEXT_CHARS = 20
+
+def classify_pdf(file) -> str:
+    """Cheap PyMuPDF probe of the first pages' text layer, used to pick the engine order"""
+    doc = parse_pdf(file)
+    try:
+        fitz_doc = doc.pymupdf()
+        probe_pages = range(min(TEXT_PROBE_PAGES, len(fitz_doc)))
+        probe_chars = sum(len(fitz_doc[page_num].get_text("text").strip()) for page_num in probe_pages)
+    except Exception as e:
+        logger.warning(f"PyMuPDF probe failed: {e}")
+        return "pymupdf_unreadable"
+    # Scanned/image-only documents skip pdfplumber's text and table pass entirely
+    return "text" if probe_chars else "no_text_layer"
+
+def iter_section_pages(file, sections: str) -> Iterator[Tuple[int, List[str]]]:
+    """(0-based page, headers of a section pattern group on it) for each page, as the text pass reads it"""
+    doc = parse_pdf(file)
+    patterns = PATTERNS.group(sections)
+    for page_num, text in enumerate(doc.iter_page_texts()):
+        yield page_num, [pattern.name.rsplit(".", 1)[-1] for pattern in patterns if pattern.search(text)]
+
+def locate_sections(file, sections: str) -> Dict[str, List[int]]:
+    """Pages (0-based) holding each header of a section pattern group, from a scan of the page text"""
+    found = {pattern.name.rsplit(".", 1)[-1]: [] for pattern in PATTERNS.group(sections)}
+    for page_num, names in iter_section_pages(file, sections):
+        for name in names:
+            found[name].append(page_num)
+    return {name: pages for name, pages in found.items() if pages}
+
+def field_table_pages(file, doc_type: str, fields: Optional[List[str]] = None) -> List[int]:
+    """Pages whose tables are needed by the given fields of a PO/WO (default: every field in TABLE_FIELDS)
+
+    Their tables are extracted (into TABLE_CACHE) as the text pass reaches each page,
+    while its layout is still loaded, so a long document is never parsed twice.
+    """
+    doc = parse_pdf(file)
+    requested = TABLE_FIELDS[doc_type]
+    sections = {requested[field] for field in (requested if fields is None else fields) if field in requested}
+    if not sections:
+        return []
+   
+    pages = []
+    header_above = False
+    for page_num, names in iter_section_pages(doc, f"{doc_type.lower()}.section"):
+        has_header = bool(sections.intersection(names))
+        # A section's table can run onto the next page
+        if has_header or header_above:
+            pages.append(page_num)
+            doc.page_tables(page_num)
+        header_above = has_header
+    return pages
+
+def extract_text_advanced(file, table_pages: Optional[List[int]] = None,
+                          table_doc_type: Optional[str] = None) -> Tuple[str, Dict[str, str]]:
+    """Advanced PDF text extraction: engine picked per document, fallback per page
+
+    pdfplumber tables are appended for the 0-based table_pages only (every page when None).
+    With table_doc_type ("PO"/"WO") they are the pages field_table_pages finds for that
+    document's TABLE_FIELDS, located during the pdfplumber pass only if the probe chose it.
+    """
+    extraction_info = {
+        "method": "unknown",
+        "pages": 0,
+        "tables_found": 0,
+        "images_found": 0,
+        "extraction_quality": "unknown",
+        "engine_times": {},
+    }
+    engine_times = extraction_info["engine_times"]
+   
+    doc = parse_pdf(file)
+    start = time.perf_counter()
+    classification = classify_pdf(doc)
+    engine_times["probe"] = time.perf_counter() - start
+    extraction_info["classification"] = classification
+    engines = ENGINE_ORDER[classification]
+   
+    # Engines are opened when a page first needs them; one that cannot read the document is skipped
+    page_counts = {}
+    def open_engine(engine: str) -> bool:
+        nonlocal table_pages
+        if engine not in page_counts:
+            start = time.perf_counter()
+            parsed_before = doc.parse_seconds
+            try:
+                if engine == "pdfplumber" and table_doc_type:
+                    # Located as the text pass reads each page, so tables come from pages still loaded
+                    table_pages = field_table_pages(doc, table_doc_type)
+                page_counts[engine] = engine_page_count(doc, engine)
+            except Exception as e:
+                logger.warning(f"{engine} extraction failed: {e}")
+                page_counts[engine] = None
+            elapsed = time.perf_counter() - start
+            # pdfplumber pages read before this call (e.g. for style numbers) count towards it too
+            engine_times[engine] = parsed_before + elapsed if engine == "pdfplumber" else elapsed
+        return page_counts[engine] is not None
+   
+    primary = next((engine for engine in engines if open_engine(engine)), None)
+    extraction_info["pages"] = page_counts[primary] if primary else 0
+    if page_counts.get("pdfplumber") is None:
+        table_pages = set()
+    elif table_pages is None:
+        table_pages = set(range(page_counts["pdfplumber"]))
+    else:
+        table_pages = set(table_pages)
+   
+    texts = []
+    used = []
+    tables_found = 0
+    for page_num in range(extraction_info["pages"]):
+        best = None
+        for engine in engines:
+            if not open_engine(engine) or page_num >= page_counts[engine]:
+                continue
+            start = time.perf_counter()
+            try:
+                if engine == "pdfplumber":
+                    chunk, text_chars, tables = pdfplumber_page_text(doc, page_num, page_num in table_pages)
+                else:
+                    chunk, text_chars, tables = PAGE_EXTRACTORS[engine](doc, page_num)
+            except Exception as e:
+                logger.warning(f"Failed to extract text from page {page_num + 1} with {engine}: {e}")
+                continue
+            finally:
+                engine_times[engine] += time.perf_counter() - start
+            if best is None or text_chars > best[2]:
+                best = (engine, chunk, text_chars, tables)
+            if text_chars >= MIN_PAGE_TEXT_CHARS:
+                break
+       
+        if best and best[1]:
+            engine, chunk, _, tables = best
+            texts.append(chunk)
+            tables_found += tables
+            if engine not in used:
+                used.append(engine)
+   
+    extraction_info["tables_found"] = tables_found
+    extraction_info["table_pages"] = [page_num + 1 for page_num in sorted(table_pages)]
+    extraction_info["engine_times"] = {engine: round(seconds, 4) for engine, seconds in engine_times.items()}
+    text = "\n".join(texts).strip()
+    if len(text) > 50:
+        extraction_info["method"] = "+".join(used)
+        extraction_info["extraction_quality"] = ENGINE_QUALITY[
+            max(used, key=lambda engine: list(ENGINE_QUALITY).index(engine))
+        ]
+        return text, extraction_info
+   
+    extraction_info["method"] = "failed"
+    extraction_info["extraction_quality"] = "failed"
+    return "Text extraction failed", extraction_info
+
+def engine_page_count(doc: ParsedPDF, engine: str) -> int:
+    """Open doc with one extraction engine and return its page count"""
+    if engine == "pdfplumber":
+        if doc.error:
+            raise doc.error
+        return doc.page_count
+    if engine == "pymupdf":
+        return len(doc.pymupdf())
+    return len(doc.pypdf2().pages)
+
+def pdfplumber_page_text(doc: ParsedPDF, page_num: int, with_tables: bool = True) -> Tuple[str, int, int]:
+    """(text block, text length, tables) for one page from the pdfplumber pass"""
+    page_text = doc.page_texts[page_num]
+    tables = doc.page_tables(page_num) if with_tables else []
+    texts = []
+   
+    # Regular text
+    if page_text:
+        texts.append(f"--- Page {page_num + 1} ---\n{page_text}")
+   
+    # Tables
+    for table_num, table in enumerate(tables):
+        table_text = f"\n--- Table {table_num + 1} on Page {page_num + 1} ---\n"
+        for row in table:
+            if row:
+                table_text += " | ".join([str(cell) if cell else "" for cell in row]) + "\n"
+        texts.append(table_text)
+    return "\n".join(texts), len(page_text.strip()), len(tables)
+
+def pymupdf_page_text(doc: ParsedPDF, page_num: int) -> Tuple[str, int, int]:
+    """(text block, text length, tables) for one page using PyMuPDF"""
+    page = doc.pymupdf()[page_num]
+    texts = []
+   
+    # Extract text with layout preservation
+    text = page.get_text("text")
+    if text.strip():
+        texts.append(f"--- Page {page_num + 1} ---\n{text}")
+   
+    # Extract text blocks (better structure)
+    blocks = page.get_text("blocks")
+    if blocks:
+        block_text = f"\n--- Structured Page {page_num + 1} ---\n"
+        for block in blocks:
+            if len(block) > 4 and block[4].strip():  # block[4] is text content
+                block_text += block[4] + "\n"
+        texts.append(block_text)
+    return "\n".join(texts), len(text.strip()), 0
+
+def pypdf2_page_text(doc: ParsedPDF, page_num: int) -> Tuple[str, int, int]:
+    """(text block, text length, tables) for one page using PyPDF2"""
+    text = doc.pypdf2().pages[page_num].extract_text()
+    chunk = f"--- Page {page_num + 1} ---\n{text}" if text.strip() else ""
+    return chunk, len(text.strip()), 0
+
+PAGE_EXTRACTORS = {
+    "pdfplumber": pdfplumber_page_text,
+    "pymupdf": pymupdf_page_text,
+    "pypdf2": pypdf2_page_text,
+}
+
+def extract_with_pdfplumber(file, extraction_info: Dict) -> str:
+    """Extract text using pdfplumber with table detection"""
+    doc = parse_pdf(file)
+    if doc.error:
+        raise doc.error
+    texts = []
+    tables_found = 0
+   
+    extraction_info["pages"] = doc.page_count
+   
+    for page_num in range(doc.page_count):
+        chunk, _, tables = pdfplumber_page_text(doc, page_num)
+        tables_found += tables
+        if chunk:
+            texts.append(chunk)
+   
+    extraction_info["tables_found"] = tables_found
+    return "\n".join(texts).strip()
+
+def extract_with_pymupdf(file, extraction_info: Dict) -> str:
+    """Extract text using PyMuPDF (fitz)"""
+    doc = parse_pdf(file)
+    extraction_info["pages"] = len(doc.pymupdf())
+    texts = [chunk for chunk, _, _ in (pymupdf_page_text(doc, n) for n in range(len(doc.pymupdf()))) if chunk]
+    return "\n".join(texts).strip()
+
+def extract_with_pypdf2(file, extraction_info: Dict) -> str:
+    """Extract text using PyPDF2 as fallback"""
+    doc = parse_pdf(file)
+    texts = []
+   
+    extraction_info["pages"] = len(doc.pypdf2().pages)
+   
+    for page_num in range(len(doc.pypdf2().pages)):
+        try:
+            chunk, _, _ = pypdf2_page_text(doc, page_num)
+            if chunk:
+                texts.append(chunk)
+        except Exception as e:
+            logger.warning(f"Failed to extract text from page {page_num + 1}: {e}")
+   
+    return "\n".join(texts).strip()
+
+def preprocess_text(text: str) -> str:
+    """Advanced text preprocessing for better extraction"""
+    # Remove page headers/footers
+    text = PATTERNS["text.page_marker"].sub('', text)
+    text = PATTERNS["text.table_marker"].sub('', text)
+    text = PATTERNS["text.structured_page_marker"].sub('', text)
+   
+    # Fix common PDF extraction issues
+    text = PATTERNS["text.blank_lines"].sub('\n', text)  # Remove empty lines
+    text = PATTERNS["text.whitespace"].sub(' ', text)  # Normalize whitespace
+   
+    return text.strip()
+
+class DocumentText:
+    """Extracted PDF text normalized once and handed to every field extractor
+
+    lines are the non-blank lines with page/table markers removed and whitespace
+    collapsed; pages and offsets give each line's page (0 before the first marker)
+    and where it starts in text and line_text. text joins the lines with spaces,
+    exactly like preprocess_text, and line_text joins them with newlines.
+    """
+
+    def __init__(self, raw: str):
+        self.lines: List[str] = []
+        self.pages: List[int] = []
+        self.offsets: List[int] = []
+        self._sections: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        self._section_docs: Dict[Tuple[str, str], Optional["DocumentText"]] = {}
+       
+        page = 0
+        offset = 0
+        for line in raw.split("\n"):
+            if "--- " in line:
+                marker = PATTERNS["text.marker_page"].search(line)
+                if marker:
+                    page = int(marker.group(1))
+                line = PATTERNS["text.page_marker"].sub('', line)
+                line = PATTERNS["text.table_marker"].sub('', line)
+                line = PATTERNS["text.structured_page_marker"].sub('', line)
+            line = " ".join(line.split())
+            if line:
+                self.lines.append(line)
+                self.pages.append(page)
+                self.offsets.append(offset)
+                offset += len(line) + 1
+       
+        self.text = " ".join(self.lines)
+        self.line_text = "\n".join(self.lines)
+
+    def line_at(self, offset: int) -> int:
+        """Index of the line holding a character offset of text/line_text"""
+        return bisect_right(self.offsets, offset) - 1
+
+    def find_line(self, needle: str, start: int = 0) -> int:
+        """Index of the first line from start that contains needle, or -1"""
+        if start >= len(self.lines):
+            return -1
+        pos = self.line_text.find(needle, self.offsets[start])
+        return self.line_at(pos) if pos != -1 else -1
+
+    def sections(self, group: str) -> Dict[str, Tuple[int, int]]:
+        """(start, end) line range of each header of a section pattern group, up to the next header
+
+        A header is taken at its first occurrence that starts a line (its first match when
+        none does), and only headers that start a line end the section before them.
+        """
+        if group not in self._sections:
+            starts = {}
+            bounds = {len(self.lines)}
+            for pattern in PATTERNS.group(group):
+                start = None
+                for match in pattern.finditer(self.line_text):
+                    line = self.line_at(match.start())
+                    if match.start() == self.offsets[line]:
+                        start = line
+                        bounds.add(line)
+                        break
+                    if start is None:
+                        start = line
+                if start is not None:
+                    starts[pattern.name.rsplit(".", 1)[-1]] = start
+            bounds = sorted(bounds)
+            self._sections[group] = {
+                name: (start, next(bound for bound in bounds if bound > start)) for name, start in starts.items()
+            }
+        return self._sections[group]
+
+    def section(self, group: str, name: str) -> Optional["DocumentText"]:
+        """Lines of one indexed section as their own DocumentText, or None when its header is absent"""
+        key = (group, name)
+        if key not in self._section_docs:
+            bounds = self.sections(group).get(name)
+            self._section_docs[key] = self.slice(*bounds) if bounds else None
+        return self._section_docs[key]
+
+    def slice(self, start: int, end: int) -> "DocumentText":
+        """DocumentText over lines[start:end], sharing this document's normalization"""
+        part = DocumentText("")
+        if start >= end:
+            return part
+        base = self.offsets[start]
+        stop = self.offsets[end - 1] + len(self.lines[end - 1])
+        part.lines = self.lines[start:end]
+        part.pages = self.pages[start:end]
+        part.offsets = [offset - base for offset in self.offsets[start:end]]
+        part.text = self.text[base:stop]
+        part.line_text = self.line_text[base:stop]
+        return part
+
+def as_document(text) -> DocumentText:
+    """Return text as a DocumentText, building it only if it is not one already"""
+    if isinstance(text, DocumentText):
+        return text
+    return DocumentText(text)
+
+def normalize_text(text: str) -> str:
+    """Improved text normalization"""
+    if not text:
+        return ""
+   
+    # Remove file paths and URLs
+    text = PATTERNS["text.file_path"].sub('', text)
+    text = PATTERNS["text.url"].sub('', text)
+    text = PATTERNS["text.www"].sub('', text)
+   
+    # Normalize punctuation
+    text = PATTERNS["text.punctuation"].sub(' ', text)
+    text = PATTERNS["text.slashes"].sub('/', text)
+   
+    # Normalize whitespace
+    text = PATTERNS["text.whitespace"].sub(' ', text)
+   
+    return text.strip().lower()
+
+def clean_field(text: str) -> str:
+    """Enhanced field cleaning"""
+    if not text or text.lower() in ['not found', 'none', 'n/a']:
+        return ""
+   
+    text = normalize_text(text)
+   
+    # Remove common noise (decoration note, page/table labels, leading numbers, bullets)
+    for pattern in PATTERNS.group("text.noise"):
+        text = pattern.sub("", text)
+   
+    # Clean up result
+    text = PATTERNS["text.whitespace"].sub(' ', text).strip()
+   
+    return text
+
+def extract_care_code(text: str, labelled_only: bool = False) -> str:
+    """Enhanced care code extraction (labelled_only: skip the bare MWW code match)"""
+    text = as_document(text).text
+    # Look for MWW followed by digits
+    for pattern in PATTERNS.group("care_code"):
+        if labelled_only and pattern.name == "care_code.mww":
+            continue
+        matches = pattern.findall(text)
+        if matches:
+            return matches[0].upper().strip()
+   
+    return "Not found"
+
+def extract_product_code_enhanced(text: str, doc_type: str = "WO", labelled_only: bool = False) -> str:
+    """UPDATED: Enhanced product code extraction based on requirements
+
+    labelled_only reads only the "Product Code:" label, without the bare LB number fallback.
+    """
+    doc = as_document(text)
+    text = doc.text
+    
+    if doc_type == "WO":
+        # Look for "Product Code:" with potential formatting
+        match = PATTERNS["wo.product_code"].search(text)
+        if match:
+            code = match.group(1).strip()
+            code = PATTERNS["text.whitespace"].sub('', code)  # Remove all whitespace
+            return code.upper()
+    
+    elif doc_type == "PO":
+        # FOR PO: Look in Item Description 2nd line (LBL.CARE_LB ...), between first underscore and first hyphen
+        i = doc.find_line("LBL.CARE_LB")
+        while i != -1:
+            match = PATTERNS["po.product_code.description"].search(doc.lines[i])
+            if match:
+                code = PATTERNS["text.whitespace"].sub('', match.group(1))
+                if len(code) >= 4:
+                    return code.upper()
+            i = doc.find_line("LBL.CARE_LB", i + 1)
+        
+        # Alternative pattern if the above doesn't work
+        if "LBL.CARE_LB" in text:
+            match = PATTERNS["po.product_code.care_label"].search(text)
+            if match:
+                return f"LB{match.group(1)}"
+    
+    if labelled_only:
+        return "Not found"
+    
+    # Fallback: Look for LB followed by numbers
+    match = PATTERNS["product_code.lb_fallback"].search(text)
+    if match:
+        code = PATTERNS["text.whitespace"].sub('', match.group(1))
+        return code.upper()
+    
+    return "Not found"
+def extract_silhouette_enhanced(text: str, doc_type: str = "WO", labelled_only: bool = False) -> str:
+    """Enhanced silhouette extraction to match 'Silhouette:__________' in WO (labelled only already)"""
+    text = as_document(text).text
+   
+    if doc_type == "WO":
+        # Match 'Silhouette:' followed by underscores, dashes, or space, then capture value
+        match = PATTERNS["wo.silhouette"].search(text)
+        if match:
+            silhouette = match.group(1).strip()
+            silhouette = PATTERNS["text.whitespace"].sub(' ', silhouette)  # Normalize spaces
+            if 1 <= len(silhouette) <= 50:
+                return silhouette.title()
+    elif doc_type == "PO":
+        for garment_type in PO_GARMENT_TYPES:
+            if garment_type in text.upper():
+                matches = PATTERNS[f"po.silhouette.{garment_type.lower()}"].findall(text.upper())
+                for match in matches:
+                    cleaned = PATTERNS["text.whitespace"].sub(' ', match.strip())
+                    if 3 <= len(cleaned) <= 30:
+                        return cleaned.title()
+    return "Not found"
+
+
+def extract_vsd_number_enhanced(text: str, doc_type: str = "WO", wo_text: str = None,
+                                labelled_only: bool = False) -> str:
+    """Enhanced VSD#/VSS# extraction with correct PO logic (WO codes are always labelled)"""
+    doc = as_document(text)
+    text = doc.text
+    
+    if doc_type.upper() == "WO":
+        # WO logic remains unchanged - it's working correctly
+        vsd = PATTERNS["wo.vsd"].search(text)
+        vss = PATTERNS["wo.vss"].search(text)
+        return f"VSD# {vsd.group(1) if vsd else 'Not found'} | VSS# {vss.group(1) if vss else 'Not found'}"
+    
+    elif doc_type.upper() == "PO":
+        po_codes = extract_vsd_vss_from_po_corrected(doc)
+        if wo_text:
+            wo_codes = analyze_wo_codes(wo_text)
+            return format_results_conditional(wo_codes, po_codes)
+        else:
+            parts = []
+            if po_codes["vsd"] != "Not found":
+                parts.append(f"VSD# {po_codes['vsd']}(PO)")
+            if po_codes["vss"] != "Not found":
+                parts.append(f"VSS# {po_codes['vss']}(PO)")
+            return " || ".join(parts) if parts else "VSD/VSS not found in PO"
+    
+    return "Not found"
+
+def extract_vsd_vss_from_po_corrected(po_text: str) -> dict:
+    """Corrected VSD#/VSS# extraction from PO based on actual document structure"""
+    lines = as_document(po_text).lines
+    vsd_codes = []
+    vss_codes = []
+    
+    # Process each line to find VSD# and VSS#
+    for idx, line in enumerate(lines):
+        
+        # Look for VSD# in third line after item description
+        # Pattern: "431650 QD4 C 509 9/25 / L /" - we want "431650 QD4"
+        if "Colour/Size/Destination:" in line:
+            # Extract everything after the colon
+            after_colon = line.split("Colour/Size/Destination:", 1)[1].strip()
+            # Match 6 digits followed by space and 3 letters
+            vsd_match = PATTERNS["po.vsd.colour_line"].search(after_colon)
+            if vsd_match:
+                vsd_code = f"{vsd_match.group(1)} {vsd_match.group(2)}"
+                if vsd_code not in vsd_codes:
+                    vsd_codes.append(vsd_code)
+        
+        # Look for VSS# in LBL.CARE_LB line (under item description, end of 2nd line)
+        # Pattern: "LBL.CARE_LB 5735-bikini-11276861" - we want "11276861"
+        if "LBL.CARE_LB" in line:
+            # More robust pattern to capture the number at the end after the last hyphen
+            # Handle potential trailing spaces, tabs, or other characters
+            vss_match = PATTERNS["po.vss.care_label"].search(line.strip())
+            if not vss_match:
+                # Alternative pattern - look for digits after the last hyphen in the line
+                vss_match = PATTERNS["po.vss.trailing_number"].search(line.strip())
+            
+            if vss_match:
+                vss_code = vss_match.group(1)
+                if vss_code not in vss_codes:
+                    vss_codes.append(vss_code)
+    
+    # Return the first found codes or "Not found"
+    return {
+        "vsd": vsd_codes[0] if vsd_codes else "Not found",
+        "vss": vss_codes[0] if vss_codes else "Not found"
+    }
+
+def analyze_wo_codes(wo_text: str) -> dict:
+    """Analyze VSD#/VSS# codes from WO - unchanged as it works correctly"""
+    wo_text = as_document(wo_text).text
+    vsd = PATTERNS["wo.vsd"].search(wo_text)
+    vss = PATTERNS["wo.vss"].search(wo_text)
+    return {
+        "has_vsd": bool(vsd),
+        "has_vss": bool(vss),
+        "vsd_value": vsd.group(1) if vsd else "",
+        "vss_value": vss.group(1) if vss else ""
+    }
+
+def format_results(wo_codes: dict, po_codes: dict) -> str:
+    """Format the combined results from WO and PO"""
+    parts = []
+    
+    # Format VSD# results
+    if wo_codes["has_vsd"] or po_codes["vsd"] != "Not found":
+        wo_vsd = wo_codes['vsd_value'] if wo_codes['has_vsd'] else 'Not in WO'
+        po_vsd = po_codes['vsd'] if po_codes['vsd'] != "Not found" else 'Not in PO'
+        parts.append(f"VSD# {wo_vsd}(WO) | VSD# {po_vsd}(PO)")
+    
+    # Format VSS# results  
+    if wo_codes["has_vss"] or po_codes["vss"] != "Not found":
+        wo_vss = wo_codes['vss_value'] if wo_codes['has_vss'] else 'Not in WO'
+        po_vss = po_codes['vss'] if po_codes['vss'] != "Not found" else 'Not in PO'
+        parts.append(f"VSS# {wo_vss}(WO) | VSS# {po_vss}(PO)")
+    
+    return " || ".join(parts) if parts else "No codes found"
+
+def format_results_conditional(wo_codes: dict, po_codes: dict) -> str:
+    """CONDITIONAL FORMAT: Only show PO codes if WO has the corresponding codes"""
+    parts = []
+    
+    # Only show VSD# if WO has VSD#
+    if wo_codes["has_vsd"]:
+        wo_vsd = wo_codes['vsd_value']
+        po_vsd = po_codes['vsd'] if po_codes['vsd'] != "Not found" else 'Not in PO'
+        parts.append(f"VSD# {wo_vsd}(WO) | VSD# {po_vsd}(PO)")
+    
+    # Only show VSS# if WO has VSS#
+    if wo_codes["has_vss"]:
+        wo_vss = wo_codes['vss_value']
+        po_vss = po_codes['vss'] if po_codes['vss'] != "Not found" else 'Not in PO'
+        parts.append(f"VSS# {wo_vss}(WO) | VSS# {po_vss}(PO)")
+    
+    return " || ".join(parts) if parts else "No codes found in WO"
+
+# Test function to verify the extraction
+def test_vsd_vss_extraction():
+    """Test the extraction with sample data"""
+    
+    # Sample PO text from your document
+    po_sample = """1 O37368Q5LB1 002 772.00 PCS 0.0324 25.01
+X-Mill Date(dd-mm-yy) : Buyer :
+Colour/Size/Destination:
+Tolerance Percentage :
+431650 QD4 C 509 10/25 / M /
+LBL.CARE_LB 5735-bikini-11276861
+09-09-25 BEL_VS&Co_VS_WOMENS_BULK-5-FOR-VSD"""
+
+    # Sample WO text from your document  
+    wo_sample = """VSD#: 431650-QD4
+VSS#:"""
+    
+    # Test with WO that has VSS# to test conditional logic
+    wo_sample_with_vss = """VSD#: 431650-QD4
+VSS#: 11276861"""
+    
+    print("=== TESTING VSD#/VSS# EXTRACTION ===")
+    print("\nPO Sample Text:")
+    print(po_sample)
+    print("\nWO Sample Text:")  
+    print(wo_sample)
+    
+    print("\n=== EXTRACTION RESULTS ===")
+    print("PO only:", extract_vsd_number_enhanced(po_sample, "PO"))
+    print("WO only:", extract_vsd_number_enhanced(wo_sample, "WO"))
+    print("Combined (WO without VSS#):", extract_vsd_number_enhanced(po_sample, "PO", wo_sample))
+    print("Combined (WO with VSS#):", extract_vsd_number_enhanced(po_sample, "PO", wo_sample_with_vss))
+    
+    print("\n=== DETAILED PO EXTRACTION ===")
+    po_codes = extract_vsd_vss_from_po_corrected(po_sample)
+    print("VSD# from PO:", po_codes["vsd"])
+    print("VSS# from PO:", po_codes["vss"])
+    
+    # Debug: Show the LBL.CARE_LB line specifically
+    lines = po_sample.splitlines()
+    for line in lines:
+        if "LBL.CARE_LB" in line:
+            print(f"LBL.CARE_LB line found: '{line.strip()}'")
+            # Test the regex on this specific line
+            vss_match = PATTERNS["po.vss.care_label"].search(line.strip())
+            if vss_match:
+                print(f"VSS# extracted: {vss_match.group(1)}")
+            else:
+                print("VSS# regex did not match")
+
+def extract_factory_id_enhanced(text: str, labelled_only: bool = False) -> str:
+    """Enhanced factory ID extraction - already working correctly (labelled_only: no known-ID fallback)"""
+    text = as_document(text).text
+   
+    # Look for Factory ID pattern
+    for pattern in PATTERNS.group("factory_id"):
+        match = pattern.search(text)
+        if match:
+            return match.group(1).strip()
+   
+    # Look for the specific ID mentioned in your documents
+    if not labelled_only and "36013779" in text:
+        return "36013779"
+   
+    return "Not found"
+
+if __name__ == "__main__":
+    test_vsd_vss_extraction()
+    
+def extract_factory_id_enhanced(text: str, labelled_only: bool = False) -> str:
+    """Enhanced factory ID extraction - already working correctly (labelled_only: no known-ID fallback)"""
+    text = as_document(text).text
+   
+    # Look for Factory ID pattern
+    for pattern in PATTERNS.group("factory_id"):
+        match = pattern.search(text)
+        if match:
+            return match.group(1).strip()
+   
+    # Look for the specific ID mentioned in your documents
+    if not labelled_only and "36013779" in text:
+        return "36013779"
+   
+    return "Not found"    
+
+def extract_date_of_mfr(text: str, labelled_only: bool = False) -> str:
+    """Enhanced Date of MFR# extraction - already working correctly (labelled_only: no bare dates)"""
+    text = as_document(text).text
+   
+    # Look for Date of MFR# pattern
+    for pattern in PATTERNS.group("mfr_date.labelled"):
+        match = pattern.search(text)
+        if match:
+            date_str = match.group(1).strip()
+            # Format as MM/YY if needed
+            if len(date_str) == 4 and date_str.isdigit():
+                return f"{date_str[:2]}/{date_str[2:]}"
+            return date_str
+   
+    if labelled_only:
+        return "Not found"
+   
+    # Look for patterns like "09 25" or "9/25"
+    for pattern in PATTERNS.group("mfr_date.bare"):
+        matches = pattern.findall(text)
+        for match in matches:
+            if len(match) == 2:
+                month, year = match
+                if 1 <= int(month) <= 12 and len(year) == 2:
+                    return f"{month.zfill(2)}/{year}"
+   
+    return "Not found"
+
+# wo.country patterns that read the field's own label rather than the care label text
+WO_COUNTRY_LABELS = {"wo.country.country_of_origin", "wo.country.countryoforigin"}
+
+def extract_country_of_origin_enhanced(text: str, doc_type: str = "WO", labelled_only: bool = False) -> str:
+    """Enhanced country of origin extraction based on requirements
+
+    labelled_only reads the WO "Country Of Origin" label only, not "made in" care label text.
+    """
+    text = as_document(text).text
+    if doc_type == "WO":
+        text_lower = text.lower()
+        for pattern in PATTERNS.group("wo.country"):
+            if labelled_only and pattern.name not in WO_COUNTRY_LABELS:
+                continue
+            match = pattern.search(text_lower)
+            if match:
+                country = match.group(1).strip()
+                country = PATTERNS["text.non_word"].sub('', country)
+                country = PATTERNS["text.whitespace"].sub(' ', country).strip()
+                if "sri" in country and "lanka" in country:
+                    return "Sri Lanka"
+                elif country and len(country) < 30:
+                    return country.title()
+    elif doc_type == "PO":
+        # Focus only on the section before 'Factory Code'
+        factory_code_index = text.lower().find("factory code")
+        if factory_code_index != -1:
+            pre_factory_text = text[:factory_code_index]
+            # Now search for COO pattern in this section
+            match = PATTERNS["po.country.coo"].search(pre_factory_text)
+            if match:
+                country = match.group(1).strip()
+                country = PATTERNS["text.non_word"].sub('', country)
+                country = PATTERNS["text.whitespace"].sub(' ', country).strip()
+                if "sri" in country and "lanka" in country:
+                    return "Sri Lanka"
+                elif country and len(country) < 30:
+                    return country.title()
+    return "Not found"
+
+def extract_additional_instructions_enhanced(text: str, doc_type: str = "WO", labelled_only: bool = False) -> str:
+    """Enhanced additional instructions extraction with special matching logic
+
+    labelled_only reads the WO "Additional Instructions"/"Special Instructions" labels only,
+    without the decoration note shortcut or the generic "instructions" match.
+    """
+    text = as_document(text).text
+   
+    text_lower = text.lower()
+   
+    # Look for decoration exclusion patterns (common in both)
+    decoration_patterns = [
+        "exclusive of decoration",
+        "sauf décoration",
+        "no incluye la decoración",
+        "esclusa la decorazione",
+        "装饰除外"
+    ]
+   
+    for pattern in decoration_patterns:
+        if not labelled_only and pattern in text_lower:
+            return "exclusive of decoration"
+   
+    if doc_type == "WO":
+        # FOR WO: Look in Product Details section
+        for pattern in PATTERNS.group("wo.instructions"):
+            if labelled_only and pattern.name == "wo.instructions.instructions":
+                continue
+            match = pattern.search(text)
+            if match:
+                instruction = match.group(1).strip()
+                if len(instruction) > 10:  # Meaningful instruction
+                    return instruction
+   
+    elif doc_type == "PO":
+        # FOR PO: Look in email body table for Additional Instructions
+        # This will be used for comparison matching logic
+        for pattern in PATTERNS.group("po.instructions"):
+            match = pattern.search(text)
+            if match:
+                instruction = match.group(1).strip()
+                if len(instruction) > 5:
+                    return instruction
+   
+    return "Not found"
+
+def extract_garment_components_enhanced(text: str, doc_type: str = "WO", labelled_only: bool = False) -> str:
+    """Enhanced garment components extraction with filtered output
+
+    labelled_only reads the WO "Garment Components & Fibre Contents:" block only, not
+    percentages found anywhere in the text.
+    """
+    text = as_document(text).text
+   
+    if doc_type == "WO":
+        # FOR WO: Extract from "Garment Components & Fibre Contents:" section under Product Details
+        components = []
+       
+        # Find the "Garment Components & Fibre Contents:" section - more flexible pattern
+        garment_section_match = PATTERNS["wo.fibre.section"].search(text)
+       
+        if garment_section_match:
+            garment_content = garment_section_match.group(1)
+           
+            # Look for all percentage-fiber combinations in the entire section
+            # Updated pattern to match the actual WO format with multilingual support
+            for pattern in PATTERNS.group("wo.fibre.section_fibre"):
+                matches = pattern.findall(garment_content)
+                for match in matches:
+                    percentage, fiber_type = match
+                    fiber_clean = fiber_type.strip().lower()
+                   
+                    # Map to standard fiber names based on multilingual patterns
+                    if any(x in fiber_clean for x in ['cotton/coton/algodón/cotone/棉', 'cotton']):
+                        components.append(f"cotton - {percentage}%")
+                    elif any(x in fiber_clean for x in ['modal/莫代尔', 'modal']):
+                        components.append(f"modal - {percentage}%")
+                    elif any(x in fiber_clean for x in ['elastane/élasthanne/elastano/elastan/氨纶', 'elastane']):
+                        components.append(f"elastane - {percentage}%")
+                    elif any(x in fiber_clean for x in ['recycled', 'recyclé', 'reciclada', 'riciclata']):
+                        components.append(f"recycled polyamide - {percentage}%")
+                    elif any(x in fiber_clean for x in ['polyamide/poliamida/poliammide/锦纶', 'polyamide']):
+                        components.append(f"polyamide - {percentage}%")
+                    elif any(x in fiber_clean for x in ['polyester/poliéster/poliestere/聚酯纤维', 'polyester']):
+                        components.append(f"polyester - {percentage}%")
+       
+        # If still no components found, try a more general search in the entire text
+        if not components and not labelled_only:
+            # Search for any percentage-fiber pattern in the entire text
+            for pattern in PATTERNS.group("wo.fibre.general"):
+                matches = pattern.findall(text)
+                for match in matches:
+                    percentage, fiber_type = match
+                    fiber_clean = fiber_type.lower()
+                   
+                    if 'cotton' in fiber_clean:
+                        components.append(f"cotton - {percentage}%")
+                    elif 'modal' in fiber_clean:
+                        components.append(f"modal - {percentage}%")
+                    elif 'elastane' in fiber_clean:
+                        components.append(f"elastane - {percentage}%")
+                    elif 'recycled' in fiber_clean:
+                        components.append(f"recycled polyamide - {percentage}%")
+                    elif 'polyamide' in fiber_clean:
+                        components.append(f"polyamide - {percentage}%")
+                    elif 'polyester' in fiber_clean:
+                        components.append(f"polyester - {percentage}%")
+       
+        # Remove duplicates while preserving order
+        unique_components = list(dict.fromkeys(components))
+        return ", ".join(unique_components[:10]) if unique_components else "Not found"
+   
+    elif doc_type == "PO":
+        # FOR PO: Extract from "Care Composition in CC" column in email body table
+        components = []
+       
+        # Find the "Care Composition in CC" section and extract following content
+        care_comp_match = PATTERNS["po.fibre.care_composition"].search(text)
+       
+        if care_comp_match:
+            care_content = care_comp_match.group(1).strip()
+           
+            # Extract component details (Body, Lace, Gusset, etc.)
+            for pattern in PATTERNS.group("po.fibre.component"):
+                matches = pattern.finditer(care_content)
+                for match in matches:
+                    component_text = match.group(1).strip()
+                    # Clean the text and remove extra whitespace
+                    component_text = PATTERNS["text.whitespace"].sub(' ', component_text)
+                   
+                    # Extract percentages and fiber types from each component
+                    fiber_matches = PATTERNS["po.fibre.percentage"].findall(component_text)
+                   
+                    for percentage, fiber_type in fiber_matches:
+                        fiber_clean = fiber_type.strip().lower()
+                        # Clean and normalize fiber names
+                        fiber_clean = PATTERNS["text.whitespace"].sub(' ', fiber_clean)
+                       
+                        # Map to standard names
+                        if 'recycled polyamide' in fiber_clean or (('recycled' in fiber_clean) and ('polyamide' in fiber_clean)):
+                            components.append(f"recycled polyamide - {percentage}%")
+                        elif 'polyamide' in fiber_clean:
+                            components.append(f"polyamide - {percentage}%")
+                        elif 'elastane' in fiber_clean:
+                            components.append(f"elastane - {percentage}%")
+                        elif 'cotton' in fiber_clean or 'cot' == fiber_clean.strip():
+                            components.append(f"cotton - {percentage}%")
+                        elif 'polyester' in fiber_clean:
+                            components.append(f"polyester - {percentage}%")
+                        elif 'modal' in fiber_clean:
+                            components.append(f"modal - {percentage}%")
+       
+        # If no structured format found, try alternative extraction from the entire text
+        if not components:
+            # Look for any percentage-fiber combinations in the care composition area
+            matches = PATTERNS["po.fibre.general"].findall(text)
+           
+            for percentage, fiber_type in matches:
+                fiber_clean = fiber_type.strip().lower()
+                if 'recycled' in fiber_clean and 'polyamide' in fiber_clean:
+                    components.append(f"recycled polyamide - {percentage}%")
+                elif 'polyamide' in fiber_clean:
+                    components.append(f"polyamide - {percentage}%")
+                elif 'elastane' in fiber_clean:
+                    components.append(f"elastane - {percentage}%")
+                elif 'cotton' in fiber_clean or fiber_clean == 'cot':
+                    components.append(f"cotton - {percentage}%")
+                elif 'polyester' in fiber_clean:
+                    components.append(f"polyester - {percentage}%")
+                elif 'modal' in fiber_clean:
+                    components.append(f"modal - {percentage}%")
+       
+        # Remove duplicates while preserving order
+        unique_components = list(dict.fromkeys(components))
+        return ", ".join(unique_components[:10]) if unique_components else "Not found"
+   
+    return "Not found"
+
+def extract_size_age_breakdown_enhanced(text: str, doc_type: str = "WO", labelled_only: bool = False) -> str:
+    """Enhanced size/age breakdown extraction with comprehensive diagnostics
+
+    labelled_only reads the WO rows under the breakdown header only, without the size hunt fallback.
+    """
+   
+    doc = as_document(text)
+    lines = doc.lines
+    size_map = {}
+    valid_sizes = ['XS', 'S', 'M', 'L', 'XL', 'XXL']
+   
+    if doc_type == "WO":
+        # WO Processing: Look for explicit Size/Age Breakdown table
+        breakdown_start = doc.find_line("Size/Age Breakdown")
+        swim_start = doc.find_line("Panties/Swim Bottoms")
+        while swim_start != -1 and (breakdown_start == -1 or swim_start < breakdown_start):
+            if "Order Quantity" in lines[swim_start]:
+                breakdown_start = swim_start
+                break
+            swim_start = doc.find_line("Panties/Swim Bottoms", swim_start + 1)
+       
+        if breakdown_start >= 0:
+            for i in range(breakdown_start + 1, min(breakdown_start + 10, len(lines))):
+                line = lines[i].strip()
+                match = PATTERNS["wo.size_breakdown.row"].match(line)
+                if match:
+                    size = match.group(1).upper()
+                    quantity = match.group(2).replace(',', '')
+                    if size in valid_sizes:
+                        size_map[size] = quantity
+   
+    elif doc_type == "PO":
+        # PO Processing: Extract quantities from structured PO format
+        quantities = []  # Store all quantities found
+       
+        for i, line in enumerate(lines):
+            line_clean = line.strip()
+            if not line_clean:
+                continue
+           
+            # Look for lines that contain item numbers and quantities in PO format
+            # Pattern: Item number followed by quantity and PCS
+            match = PATTERNS["po.size_breakdown.item_line"].match(line_clean)
+           
+            if match:
+                quantity = match.group(1)
+                # Ensure quantity has two decimal places for consistency
+                if '.' not in quantity:
+                    quantity = f"{quantity}.00"
+                quantities.append(quantity)
+                continue
+           
+            # Alternative pattern: Look for quantity followed by PCS anywhere in line
+            matches = PATTERNS["po.size_breakdown.qty_pcs"].finditer(line_clean)
+           
+            for match in matches:
+                quantity = match.group(1)
+                # Ensure quantity has two decimal places for consistency
+                if '.' not in quantity:
+                    quantity = f"{quantity}.00"
+                   
+                # Avoid duplicates from the same line
+                if quantity not in quantities:
+                    quantities.append(quantity)
+           
+            # Additional pattern: Look for standalone numbers that could be quantities
+            # Only consider if line contains PCS or other quantity indicators
+            if 'PCS' in line_clean.upper() or 'QUANTITY' in line_clean.upper():
+                standalone_numbers = PATTERNS["po.size_breakdown.number"].findall(line_clean)
+                for num in standalone_numbers:
+                    # Filter out small numbers that are likely not quantities
+                    if float(num) >= 10 and float(num) <= 10000:
+                        formatted_num = num if '.' in num else f"{num}.00"
+                        if formatted_num not in quantities:
+                            quantities.append(formatted_num)
+       
+        if quantities:
+            result = ", ".join(quantities)
+            return result
+   
+    # Fallback extraction for WO if no matches found
+    if not size_map and doc_type == "WO" and not labelled_only:
+        for i, line in enumerate(lines):
+            line_clean = line.strip()
+            if not line_clean:
+                continue
+               
+            # Try to find any size indicators
+            size_matches = PATTERNS["wo.size_breakdown.slashed_size"].findall(line_clean)
+           
+            if size_matches:
+                for potential_size in size_matches:
+                    potential_size = potential_size.upper()
+                    if potential_size in valid_sizes:
+                        # Look for quantities in nearby lines
+                        search_start = max(0, i - 5)
+                        search_end = min(len(lines), i + 15)
+                       
+                        for k in range(search_start, search_end):
+                            qty_line = lines[k].strip()
+                            # Check if line contains a quantity
+                            if PATTERNS["wo.size_breakdown.decimal_qty"].match(qty_line) or PATTERNS["wo.size_breakdown.integer_qty"].match(qty_line):
+                                if potential_size not in size_map:
+                                    quantity = qty_line.replace(',', '')
+                                    size_map[potential_size] = quantity
+                                    break
+           
+            # Try other patterns
+            for pattern in PATTERNS.group("wo.size_breakdown.fallback"):
+                matches = pattern.findall(line_clean)
+                if matches:
+                    for match in matches:
+                        if isinstance(match, tuple) and len(match) >= 2:
+                            potential_size = match[0].upper()
+                            quantity = match[1].replace(',', '')
+                            if potential_size in valid_sizes and quantity.replace('.', '').isdigit():
+                                if potential_size not in size_map:
+                                    size_map[potential_size] = quantity
+                        elif isinstance(match, str):
+                            potential_size = match.upper()
+                            if potential_size in valid_sizes:
+                                numbers = PATTERNS["wo.size_breakdown.number"].findall(line_clean)
+                                valid_numbers = [n for n in numbers if float(n) >= 10 and float(n) <= 100000]
+                                if valid_numbers:
+                                    quantity = max(valid_numbers, key=lambda x: float(x))
+                                    if potential_size not in size_map:
+                                        size_map[potential_size] = quantity
+   
+    if doc_type == "WO":
+        if size_map:
+            size_order = {'XS': 0, 'S': 1, 'M': 2, 'L': 3, 'XL': 4, 'XXL': 5}
+            sorted_items = sorted(size_map.items(), key=lambda x: size_order.get(x[0], 999))
+            result = ", ".join([f"{k}-{v}" for k, v in sorted_items])
+            return result
+   
+    return "Not found"
+
+def extract_deliver_to_enhanced(text: str, doc_type: str = "WO", labelled_only: bool = False) -> str:
+    """Extract Deliver To information based on requirements (labelled only already)"""
+    # The patterns read to the end of the line, so they run on the line-preserving text
+    text = as_document(text).line_text
+   
+    if doc_type == "WO":
+        # FOR WO: Customer Delivery Name + Deliver To from Order Delivery Details
+        customer_delivery_name = ""
+        deliver_to = ""
+       
+        # Look for Customer Delivery Name
+        match = PATTERNS["wo.deliver_to.customer_delivery_name"].search(text)
+        if match:
+            customer_delivery_name = match.group(1).strip()
+       
+        # Look for Deliver To
+        match = PATTERNS["wo.deliver_to.deliver_to"].search(text)
+        if match:
+            deliver_to = match.group(1).strip()
+       
+        # Combine both
+        if customer_delivery_name and deliver_to:
+            return f"{customer_delivery_name} + {deliver_to}"
+        elif customer_delivery_name:
+            return customer_delivery_name
+        elif deliver_to:
+            return deliver_to
+   
+    elif doc_type == "PO":
+        # FOR PO: Look for Delivery Location at the end of PO
+        match = PATTERNS["po.deliver_to.location"].search(text)
+        if match:
+            return match.group(1).strip()
+   
+    return "Not found"
+
+# Fields whose extractors read pdfplumber table blocks, with the section whose pages they need.
+# Every other field works on line text alone, so no tables are extracted for it.
+TABLE_FIELDS = {
+    "WO": {"Size/Age Breakdown": "size_breakdown", "Deliver To": "order_delivery"},
+    "PO": {"Size/Age Breakdown": "line_items", "Deliver To": "delivery"},
+}
+
+# WO section (wo.section header) each field's labelled patterns are read from; the whole
+# document, with every extractor fallback, is searched when the section has no labelled match
+WO_FIELD_SECTIONS = {
+    "Product Code": "product_details",
+    "Silhouette": "product_details",
+    "VSD#": "product_details",
+    "Size/Age Breakdown": "size_breakdown",
+    "Factory ID": "product_details",
+    "Date of MFR#": "product_details",
+    "Country of Origin": "product_details",
+    "Additional Instructions": "product_details",
+    "Garment Components & Fibre Contents": "garment_components",
+    "Care Instructions": "care_instructions",
+    "Deliver To": "order_delivery",
+}
+
+def extract_wo_fields_enhanced(text: str) -> Dict[str, str]:
+    """Enhanced Work Order field extraction"""
+    doc = as_document(text)
+   
+    def in_section(field: str, extract, *args) -> str:
+        # Labelled matches are read from the field's own section; the heuristic fallbacks
+        # only ever run on the whole document, so they never shadow a label found elsewhere
+        section = doc.section("wo.section", WO_FIELD_SECTIONS[field])
+        if section is not None:
+            value = extract(section, *args, labelled_only=True)
+            if "Not found" not in value:
+                return value
+        return extract(doc, *args)
+   
+    return {
+        "Product Code": in_section("Product Code", extract_product_code_enhanced, "WO"),
+        "Silhouette": in_section("Silhouette", extract_silhouette_enhanced, "WO"),
+        "VSD#": in_section("VSD#", extract_vsd_number_enhanced, "WO"),
+        "Size/Age Breakdown": in_section("Size/Age Breakdown", extract_size_age_breakdown_enhanced, "WO"),
+        "Factory ID": in_section("Factory ID", extract_factory_id_enhanced),
+        "Date of MFR#": in_section("Date of MFR#", extract_date_of_mfr),
+        "Country of Origin": in_section("Country of Origin", extract_country_of_origin_enhanced, "WO"),
+        "Additional Instructions": in_section("Additional Instructions", extract_additional_instructions_enhanced, "WO"),
+        "Garment Components & Fibre Contents": in_section("Garment Components & Fibre Contents",
+                                                          extract_garment_components_enhanced, "WO"),
+        "Care Instructions": in_section("Care Instructions", extract_care_code),
+        "Deliver To": in_section("Deliver To", extract_deliver_to_enhanced, "WO")
+    }
+
+def extract_po_fields_enhanced(text: str, po_items=None) -> Dict[str, str]:
+    """Enhanced Purchase Order field extraction with PO items integration"""
+    text = as_document(text)
+   
+    # If PO items are provided, extract Product Code and Size/Age Breakdown from them
+    product_code = "Not found"
+    size_breakdown = "Not found"
+   
+    po_items = as_item_frame(po_items)
+    if not po_items.empty:
+        # Extract Product Code from the first item
+        if pd.notna(po_items["Product_Code"].iloc[0]):
+            product_code = po_items["Product_Code"].iloc[0]
+       
+        # Total quantities by size, in size order
+        size_breakdown = po_size_breakdown(po_items)
+   
+    # If we couldn't extract from PO items, fall back to text-based extraction
+    if product_code == "Not found":
+        product_code = extract_product_code_enhanced(text, "PO")
+   
+    if size_breakdown == "Not found":
+        size_breakdown = extract_size_age_breakdown_enhanced(text, "PO")
+   
+    return {
+        "Product Code": product_code,
+        "Silhouette": extract_silhouette_enhanced(text, "PO"),
+        "Care Instructions": extract_care_code(text),
+        "VSD#": extract_vsd_number_enhanced(text, "PO"),
+        "Date of MFR#": extract_date_of_mfr(text),
+        "Size/Age Breakdown": size_breakdown,
+        "Country of Origin": extract_country_of_origin_enhanced(text, "PO"),
+        "Additional Instructions": extract_additional_instructions_enhanced(text, "PO"),
+        "Factory ID": extract_factory_id_enhanced(text),
+        "Garment Components & Fibre Contents": extract_garment_components_enhanced(text, "PO"),
+        "Deliver To": extract_deliver_to_enhanced(text, "PO")
+    }
+
+def open_document(source) -> ParsedPDF:
+    """ParsedPDF over raw PDF bytes or over the temp file path returned by upload_source"""
+    return ParsedPDF(source if isinstance(source, str) else io.BytesIO(source))
+
+def process_po_document(data) -> Dict:
+    """Run the full PO extraction pipeline on the raw PDF bytes (or upload_source path)"""
+    doc = open_document(data)
+    try:
+        # Text first: its pdfplumber pass finds the table pages (and extracts their tables)
+        po_text, po_info = extract_text_advanced(doc, table_doc_type="PO")
+        po_items = extract_po_details(doc)
+    finally:
+        doc.close()
+    return {
+        "items": po_items,
+        "text": po_text,
+        "info": po_info,
+        "fields": extract_po_fields_enhanced(po_text, po_items),
+    }
+
+def process_wo_document(data) -> Dict:
+    """Run the full WO extraction pipeline on the raw PDF bytes (or upload_source path)"""
+    doc = open_document(data)
+    try:
+        wo_text, wo_info = extract_text_advanced(doc, table_doc_type="WO")
+    finally:
+        doc.close()
+    return {
+        "text": wo_text,
+        "info": wo_info,
+        "fields": extract_wo_fields_enhanced(wo_text),
+    }
+
+def extract_pair(po_path: str, wo_path: str) -> Dict[str, Dict[str, str]]:
+    """Read and extract one PO/WO pair from disk, returning both field sets"""
+    with open(po_path, "rb") as f:
+        po_result = process_po_document(f.read())
+    with open(wo_path, "rb") as f:
+        wo_result = process_wo_document(f.read())
+    return {"po_fields": po_result["fields"], "wo_fields": wo_result["fields"]}
+
+def run_with_pattern_hits(func, *args):
+    """Call func and return (result, pattern hits it recorded) so pool workers can report their counts"""
+    before = PATTERNS.hit_counts()
+    result = func(*args)
+    after = PATTERNS.hit_counts()
+    return result, {name: hits - before[name] for name, hits in after.items() if hits != before[name]}
+
+def iter_extracted_pairs(pairs: List[Tuple[str, str, str]], workers: int = 1):
+    """Yield (pair, po_path, wo_path, fields, error) for each (pair, po_path, wo_path) as it finishes
+
+    With more than one worker, PDF parsing and field extraction run in a process
+    pool and pairs are yielded in completion order. Only the extracted fields are
+    sent back, so the embedding model stays in the calling process.
+    """
+    if workers <= 1:
+        for pair, po_path, wo_path in pairs:
+            try:
+                yield pair, po_path, wo_path, extract_pair(po_path, wo_path), None
+            except Exception as e:
+                yield pair, po_path, wo_path, None, e
+        return
+   
+    # Spawned (not forked) workers so they never inherit the parent's torch state
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = {
+            executor.submit(run_with_pattern_hits, extract_pair, po_path, wo_path): (pair, po_path, wo_path)
+            for pair, po_path, wo_path in pairs
+        }
+        for future in as_completed(futures):
+            pair, po_path, wo_path = futures[future]
+            try:
+                fields, hits = future.result()
+            except Exception as e:
+                yield pair, po_path, wo_path, None, e
+                continue
+            PATTERNS.add_hits(hits)
+            yield pair, po_path, wo_path, fields, None
+
+def semantic_similarity_batch(model, wo_texts: List[str], po_texts: List[str],
+                              embedding_cache: Optional["EmbeddingCache"] = None) -> List[float]:
+    """Cosine similarity (0-100) for each WO/PO text pair using a single batched encode"""
+    if not wo_texts:
+        return []
+   
+    # Encode every distinct text once, skipping those already in the embedding cache
+    unique_texts = list(dict.fromkeys(wo_texts + po_texts))
+    model_name = get_model_name(model)
+    vectors = embedding_cache.get_many(model_name, unique_texts) if embedding_cache else {}
+    missing = [text for text in unique_texts if text not in vectors]
+    if missing:
+        encoded = dict(zip(missing, model.encode(missing, convert_to_numpy=True)))
+        vectors.update(encoded)
+        if embedding_cache:
+            embedding_cache.put_many(model_name, encoded)
+   
+    # Score all pairs as one row-wise operation
+    wo_embeddings = np.stack([vectors[text] for text in wo_texts]).astype(np.float32)
+    po_embeddings = np.stack([vectors[text] for text in po_texts]).astype(np.float32)
+    wo_embeddings /= np.maximum(np.linalg.norm(wo_embeddings, axis=1, keepdims=True), 1e-12)
+    po_embeddings /= np.maximum(np.linalg.norm(po_embeddings, axis=1, keepdims=True), 1e-12)
+    similarities = np.einsum("ij,ij->i", wo_embeddings, po_embeddings)
+    return [float(similarity) * 100 for similarity in similarities]
+
+def combined_score(fuzzy_score: float, semantic_score: float) -> float:
+    """Weighted combination of the fuzzy and semantic scores of a field pair"""
+    return round(0.3 * fuzzy_score + 0.7 * semantic_score, 1)
+
+# Tiered scoring: STRUCTURED_FIELDS are parsed and diffed per key, equal or normalized-equal
+# values score 100, a full token match (token_sort_ratio) is a match and a token_set_ratio at
+# or below FUZZY_DECIDES_DIFFERENT is different; every other pair needs the model
+FUZZY_DECIDES_MATCH = 100
+FUZZY_DECIDES_DIFFERENT = 20
+SCORE_TIERS = ["structured", "exact", "normalized", "fuzzy", "semantic"]
+
+_score_tier_lock = threading.Lock()
+_score_tier_counts = dict.fromkeys(SCORE_TIERS, 0)
+
+def count_score_tier(tier: str, n: int = 1):
+    with _score_tier_lock:
+        _score_tier_counts[tier] += n
+
+def score_tier_counts() -> Dict[str, int]:
+    """Fields decided by each scoring tier since start-up (or the last reset)"""
+    with _score_tier_lock:
+        return dict(_score_tier_counts)
+
+def reset_score_tier_counts():
+    with _score_tier_lock:
+        for tier in _score_tier_counts:
+            _score_tier_counts[tier] = 0
+
+def format_score_tier_counts(counts: Dict[str, int]) -> str:
+    """One-line summary of tier counts and the share of fields that needed the model"""
+    total = sum(counts.values())
+    share = counts["semantic"] / total if total else 0.0
+    return ", ".join(f"{tier} {counts[tier]}" for tier in SCORE_TIERS) + f" ({share:.0%} needed the model)"
+
+def compact_field(text: str) -> str:
+    """Cleaned field reduced to letters and digits, with ".0" decimals dropped ("s-772.0" -> "s772")
+
+    Punctuation and spaces next to a letter are dropped, but a run of them between two digits
+    becomes one "|", so "10.5" and "105" or "1 12" and "11 2" stay different.
+    """
+    text = PATTERNS["text.zero_decimals"].sub("", text)
+   
+    def separator(match) -> str:
+        between_digits = (0 < match.start() and match.end() < len(text)
+                          and text[match.start() - 1].isdigit() and text[match.end()].isdigit())
+        return "|" if between_digits else ""
+   
+    return PATTERNS["text.non_alnum"].sub(separator, text)
+
+def tiered_score(wo_clean: str, po_clean: str) -> Tuple[str, float]:
+    """Cheapest tier that decides a cleaned WO/PO pair and its score
+
+    For the "semantic" tier the score is the fuzzy score, still to be combined with the
+    sentence model's similarity.
+    """
+    if wo_clean == po_clean:
+        return "exact", 100.0
+    wo_compact = compact_field(wo_clean)
+    if wo_compact and wo_compact == compact_field(po_clean):
+        return "normalized", 100.0
+    fuzzy_score = fuzz.token_set_ratio(wo_clean, po_clean)
+    if fuzzy_score <= FUZZY_DECIDES_DIFFERENT:
+        return "fuzzy", fuzzy_score
+    # token_set_ratio scores any token subset ("bikini" in "bikini vsd") 100, so a match
+    # is decided on the full token match instead
+    if fuzz.token_sort_ratio(wo_clean, po_clean) >= FUZZY_DECIDES_MATCH:
+        return "fuzzy", 100.0
+    return "semantic", fuzzy_score
+
+def format_number(value: float) -> str:
+    """Number without trailing zeros: 772.0 -> 772, 12.5 -> 12.5"""
+    return f"{value:.6f}".rstrip("0").rstrip(".")
+
+def parse_size_quantities(value: str) -> Optional[Dict[str, str]]:
+    """Size -> total quantity from a breakdown like S-772, M-1228.0, 2XL-50
+
+    None unless every comma-separated entry is a size-quantity pair, so a size the
+    pattern cannot read falls back to fuzzy scoring instead of being dropped.
+    """
+    quantities = {}
+    end = 0
+    for match in PATTERNS["compare.size_quantity"].finditer(value):
+        if value[end:match.start()].replace(",", " ").strip():
+            return None
+        size = match.group(1).upper()
+        quantities[size] = quantities.get(size, 0.0) + float(match.group(2).replace(",", ""))
+        end = match.end()
+    if value[end:].replace(",", " ").strip():
+        return None
+    return {size: format_number(quantity) for size, quantity in quantities.items()} or None
+
+def parse_fibre_percentages(value: str) -> Optional[Dict[str, str]]:
+    """Fibre -> percentage from "cotton - 95%, elastane - 5%" or "95% cotton, 5% elastane"; None when none are found"""
+    for pattern in PATTERNS.group("compare.fibre"):
+        percentages = {}
+        for match in pattern.finditer(value):
+            fibre = PATTERNS["text.whitespace"].sub(" ", match.group("fibre")).strip().lower()
+            percentages.setdefault(fibre, []).append(format_number(float(match.group("percent"))))
+        if percentages:
+            # A fibre used in several components (body, gusset, ...) keeps each distinct share
+            return {fibre: "/".join(sorted(set(shares), key=float)) + "%" for fibre, shares in percentages.items()}
+    return None
+
+def parse_codes(value: str) -> Dict[str, str]:
+    """VSD#/VSS# -> code with separators removed, from a value like VSD# 431650-QD4 | VSS# 11276861"""
+    codes = {}
+    for kind, code in PATTERNS["compare.code"].findall(value):
+        code = PATTERNS["text.non_alnum"].sub("", code).upper()
+        if code and code not in ("NOTFOUND", "NOTINPO", "NOTINWO"):
+            codes.setdefault(f"{kind.upper()}#", code)
+    return codes
+
+# Fields compared as typed values instead of text, with the parser for each
+STRUCTURED_FIELDS = {
+    "Size/Age Breakdown": parse_size_quantities,
+    "Garment Components & Fibre Contents": parse_fibre_percentages,
+    "VSD#": parse_codes,
+}
+
+def compare_structured(wo_values: Dict[str, str], po_values: Dict[str, str]) -> Optional[Tuple[float, str]]:
+    """Score (share of keys that agree) and verdict naming each differing key; None if both are empty"""
+    keys = list(dict.fromkeys(list(wo_values) + list(po_values)))
+    if not keys:
+        return None
+    diffs = [
+        f"{key} {wo_values.get(key, 'missing')} vs {po_values.get(key, 'missing')}"
+        for key in keys if wo_values.get(key) != po_values.get(key)
+    ]
+    score = round(100 * (len(keys) - len(diffs)) / len(keys), 1)
+    if not diffs:
+        return score, "✅ Match"
+    verdict = "⚠️ Partial Match" if len(diffs) < len(keys) else "❌ Different"
+    return score, f"{verdict} ({'; '.join(diffs)})"
+
+def compare_structured_field(field: str, wo_raw: str, po_raw: str) -> Optional[Tuple[float, str]]:
+    """compare_structured on the parsed WO and PO values of a STRUCTURED_FIELDS field; None if unparseable"""
+    parse = STRUCTURED_FIELDS[field]
+    wo_values = parse(wo_raw)
+    po_values = parse(po_raw)
+    if wo_values is None or po_values is None:
+        return None
+    return compare_structured(wo_values, po_values)
+
+def similarity_verdict(score: float) -> str:
+    """Verdict for a combined fuzzy/semantic score"""
+    if score >= 90:
+        return "✅ Excellent Match"
+    elif score >= 80:
+        return "✅ Good Match"
+    elif score >= 65:
+        return "⚠️ Partial Match"
+    elif score >= 40:
+        return "⚠️ Weak Match"
+    return "❌ Different"
+
+def compare_fields_batch(pairs: List[Tuple[Dict[str, str], Dict[str, str]]], model,
+                         embedding_cache: Optional["EmbeddingCache"] = None) -> List[pd.DataFrame]:
+    """Compare many WO/PO field sets, encoding all semantic comparisons in one batch"""
+    all_results = []
+    pending = []  # (results, row index, fuzzy score, wo_clean, po_clean) awaiting semantic scores
+   
+    for wo_data, po_data in pairs:
+        results = []
+        for field in wo_data:
+            wo_raw = wo_data[field]
+            po_raw = po_data.get(field, "Not found")
+           
+            # Special logic for Additional Instructions matching
+            if field == "Additional Instructions":
+                # First check if PO has Additional Instructions
+                if po_raw != "Not found" and po_raw.strip():
+                    # If PO has instructions, compare with WO
+                    if wo_raw != "Not found" and wo_raw.strip():
+                        # Both have values, do comparison
+                        wo_clean = clean_field(wo_raw)
+                        po_clean = clean_field(po_raw)
+                       
+                        if wo_clean == po_clean:
+                            score = 100.0
+                            verdict = "✅ Match"
+                        elif "exclusive of decoration" in wo_clean.lower() and "exclusive of decoration" in po_clean.lower():
+                            score = 100.0
+                            verdict = "✅ Match"
+                        else:
+                            # Try fuzzy matching
+                            fuzzy_score = fuzz.token_set_ratio(wo_clean, po_clean)
+                            score = fuzzy_score
+                            if score >= 80:
+                                verdict = "✅ Good Match"
+                            elif score >= 60:
+                                verdict = "⚠️ Partial Match"
+                            else:
+                                verdict = "❌ Different"
+                    else:
+                        score = 0.0
+                        verdict = "❌ WO Missing"
+                else:
+                    # PO doesn't have Additional Instructions
+                    score = 0.0
+                    verdict = "❌ PO Missing"
+           
+            # Handle "Not found" cases for other fields
+            elif wo_raw == "Not found" and po_raw == "Not found":
+                score = 0.0
+                verdict = "⚠️ Both Missing"
+            elif wo_raw == "Not found" or po_raw == "Not found":
+                score = 0.0
+                verdict = "❌ One Missing"
+            else:
+                # Clean values for comparison
+                wo_clean = clean_field(wo_raw)
+                po_clean = clean_field(po_raw)
+               
+                if not wo_clean or not po_clean:
+                    score = 0.0
+                    verdict = "❌ Empty Values"
+                elif field == "Care Instructions":
+                    # Exact match for care instructions
+                    score = 100.0 if wo_clean == po_clean else 0.0
+                    verdict = "✅ Match" if score == 100.0 else "❌ Different"
+                elif field in STRUCTURED_FIELDS:
+                    # Typed values diffed per key; values that do not parse get the fuzzy score, never the model
+                    compared = compare_structured_field(field, wo_raw, po_raw)
+                    if compared is None:
+                        count_score_tier("fuzzy")
+                        score = fuzz.token_set_ratio(wo_clean, po_clean)
+                        verdict = similarity_verdict(score)
+                    else:
+                        count_score_tier("structured")
+                        score, verdict = compared
+                else:
+                    # Cheap tiers first; semantic similarity once every ambiguous pair has been collected
+                    tier, score = tiered_score(wo_clean, po_clean)
+                    count_score_tier(tier)
+                    if tier == "semantic":
+                        pending.append((results, len(results), score, wo_clean, po_clean))
+                        results.append([field, wo_raw, po_raw, None, None])
+                        continue
+                    verdict = similarity_verdict(score)
+           
+            results.append([field, wo_raw, po_raw, f"{score:.1f}%", verdict])
+        all_results.append(results)
+   
+    try:
+        semantic_scores = semantic_similarity_batch(
+            model,
+            [wo_clean for _, _, _, wo_clean, _ in pending],
+            [po_clean for _, _, _, _, po_clean in pending],
+            embedding_cache,
+        )
+    except Exception as e:
+        logger.warning(f"Semantic similarity failed: {e}")
+        semantic_scores = [None] * len(pending)
+   
+    for (results, row, fuzzy_score, _, _), semantic_score in zip(pending, semantic_scores):
+        if semantic_score is None:
+            score = fuzzy_score
+        else:
+            # Weighted combination
+            score = combined_score(fuzzy_score, semantic_score)
+        results[row][3] = f"{score:.1f}%"
+        results[row][4] = similarity_verdict(score)
+   
+    return [
+        pd.DataFrame(results, columns=["Field", "WO Value", "PO Value", "Score", "Verdict"])
+        for results in all_results
+    ]
+
+def compare_fields_enhanced(wo_data: Dict[str, str], po_data: Dict[str, str], model,
+                            embedding_cache: Optional["EmbeddingCache"] = None) -> pd.DataFrame:
+    """Enhanced field comparison with better scoring and special Additional Instructions logic"""
+    return compare_fields_batch([(wo_data, po_data)], model, embedding_cache)[0]
+
+# ======================
+# EXTRACTION CACHE
+# ======================
+
+EXTRACTION_CACHE_MAX_ENTRIES = 32
+TABLE_CACHE_MAX_ENTRIES = 512
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 hex digest used to key cached results on file content"""
+    return hashlib.sha256(data).hexdigest()
+
+_MISSING = object()
+
+class ExtractionCache:
+    """Size-bounded LRU cache for extraction and comparison results"""
+
+    def __init__(self, max_entries: int = EXTRACTION_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Cached value for key (marking it most recently used), or default"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """Store value under key, evicting the least recently used entries beyond the cap"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, computing and storing it on a miss"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# pdfplumber tables by (content hash, page), shared by every document parsed in this process
+TABLE_CACHE = ExtractionCache(TABLE_CACHE_MAX_ENTRIES)
+
+# ======================
+# EMBEDDING CACHE
+# ======================
+
+EMBEDDING_CACHE_PATH = os.environ.get(
+    "PO_WO_EMBEDDING_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "po_wo_comparison", "embeddings.sqlite3")
+)
+EMBEDDING_CACHE_MAX_ENTRIES = 50000
+
+class EmbeddingCache:
+    """Persistent SQLite store of field embeddings keyed on model name and cleaned text"""
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+       
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    def get_many(self, model_name: str, texts: List[str]) -> Dict[str, np.ndarray]:
+        """Cached vectors for the given texts; texts that are not cached are left out"""
+        found = {}
+        with self._lock:
+            for text in texts:
+                row = self._conn.execute(
+                    "SELECT vector FROM embeddings WHERE model = ? AND text = ?", (model_name, text)
+                ).fetchone()
+                if row:
+                    found[text] = np.frombuffer(row[0], dtype=np.float32)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text = ?",
+                    [(now, model_name, text) for text in found]
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(texts) - len(found)
+        return found
+
+    def put_many(self, model_name: str, vectors: Dict[str, np.ndarray]):
+        """Store vectors and evict the least recently used entries beyond the size cap"""
+        if not vectors:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(model_name, text, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                 for text, vector in vectors.items()]
+            )
+            excess = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN "
+                    "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)", (excess,)
+                )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters for this process and the number of stored embeddings"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+def get_model_name(model) -> str:
+    """Name of the loaded embedding model (plus its backend unless torch), used to key cached embeddings"""
+    name = getattr(model, "resolved_model_name", None) or type(model).__name__
+    backend = getattr(model, "inference_backend", "torch")
+    return name if backend == "torch" else f"{name} [{backend}]"
+
+# ======================
+# MODEL LOADING
+# ======================
+
+MODELS_TO_TRY = [
+    "C:/models/all-mpnet-base-v2",
+    "all-mpnet-base-v2",
+    "paraphrase-MiniLM-L6-v2",
+    "all-MiniLM-L6-v2"
+]
+
+# Local model registry: directories from PO_WO_MODEL_DIRS (separated by os.pathsep) and then the
+# entries of the registry file (one model directory or cached hub name per line) are tried before
+# MODELS_TO_TRY. Hub names only load from the local Hugging Face cache unless PO_WO_MODEL_ONLINE=1.
+MODEL_DIRS = [d for d in os.environ.get("PO_WO_MODEL_DIRS", "").split(os.pathsep) if d.strip()]
+MODEL_REGISTRY_PATH = os.environ.get(
+    "PO_WO_MODEL_REGISTRY",
+    os.path.join(os.path.expanduser("~"), ".config", "po_wo_comparison", "models.txt")
+)
+MODEL_ONLINE = os.environ.get("PO_WO_MODEL_ONLINE") == "1"
+
+def is_model_path(name: str) -> bool:
+    """True for a filesystem path (absolute, relative to ".", "~" or a drive), False for a hub name"""
+    return (os.path.isabs(name) or name.startswith((".", "~"))
+            or (len(name) > 2 and name[1] == ":" and name[2] in "/\\"))
+
+def read_model_registry(path: str = MODEL_REGISTRY_PATH) -> List[str]:
+    """Model directories and hub names listed in a registry file, in order of preference"""
+    if not os.path.isfile(path):
+        return []
+    base = os.path.dirname(os.path.abspath(path))
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            entry = os.path.expanduser(line.split("#", 1)[0].strip())
+            if not entry:
+                continue
+            # Relative directories are resolved against the registry file's folder
+            local = os.path.join(base, entry)
+            entries.append(local if not os.path.isabs(entry) and os.path.isdir(local) else entry)
+    return entries
+
+def model_candidates() -> List[str]:
+    """Ordered, de-duplicated models to try: PO_WO_MODEL_DIRS, the registry file, then MODELS_TO_TRY"""
+    candidates = [os.path.expanduser(d.strip()) for d in MODEL_DIRS] + read_model_registry() + MODELS_TO_TRY
+    return list(dict.fromkeys(candidates))
+
+# Inference backend of the similarity model: "torch" (fp32), "int8" (PyTorch with dynamically
+# quantized Linear layers) or "onnx" (ONNX Runtime, needs sentence-transformers[onnx])
+MODEL_BACKENDS = ["torch", "int8", "onnx"]
+MODEL_BACKEND = os.environ.get("PO_WO_MODEL_BACKEND", "torch")
+# ONNX graph inside the model directory, e.g. "onnx/model_qint8_avx512_vnni.onnx" (default: onnx/model.onnx)
+ONNX_MODEL_FILE = os.environ.get("PO_WO_ONNX_FILE")
+
+def quantize_int8(model):
+    """Model with its Linear layers dynamically quantized to int8 for CPU inference"""
+    import torch
+   
+    with warnings.catch_warnings():
+        # Eager-mode quantization is deprecated in favour of torchao, which is not a dependency
+        warnings.simplefilter("ignore")
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+def load_sentence_model(models_to_try: Optional[List[str]] = None, backend: str = MODEL_BACKEND):
+    """Load the first available sentence transformer model (default: model_candidates()) on the given backend
+
+    Missing local directories are skipped without a load attempt, and hub names are looked up
+    in the local Hugging Face cache only (no network) unless PO_WO_MODEL_ONLINE=1. The model
+    records how it was resolved: load_seconds and skipped_models (candidate, reason) pairs.
+    """
+    if backend not in MODEL_BACKENDS:
+        raise ValueError(f"Unknown model backend {backend!r}; expected one of {', '.join(MODEL_BACKENDS)}")
+    if models_to_try is None:
+        models_to_try = model_candidates()
+    if not MODEL_ONLINE:
+        # Read by huggingface_hub/transformers at import time, so set before the first import
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+    # Imported here so extraction-only processes (e.g. bulk workers) never load torch
+    from sentence_transformers import SentenceTransformer
+   
+    skipped = []
+    for model_path in models_to_try:
+        if is_model_path(model_path) and not os.path.isdir(os.path.expanduser(model_path)):
+            skipped.append((model_path, "directory not found"))
+            continue
+        start = time.perf_counter()
+        try:
+            if backend == "onnx":
+                model_kwargs = {"file_name": ONNX_MODEL_FILE} if ONNX_MODEL_FILE else None
+                model = SentenceTransformer(model_path, backend="onnx", model_kwargs=model_kwargs,
+                                            local_files_only=not MODEL_ONLINE)
+            else:
+                model = SentenceTransformer(model_path, local_files_only=not MODEL_ONLINE)
+                if backend == "int8":
+                    model = quantize_int8(model)
+        except Exception as e:
+            logger.warning(f"Failed to load model {model_path}: {e}")
+            skipped.append((model_path, f"failed: {str(e).splitlines()[0] if str(e) else type(e).__name__}"))
+            continue
+        model.resolved_model_name = model_path
+        model.inference_backend = backend
+        model.load_seconds = time.perf_counter() - start
+        model.skipped_models = skipped
+        logger.info(model_load_report(model))
+        return model
+   
+    tried = "; ".join(f"{name} ({reason})" for name, reason in skipped) or "no candidates"
+    raise Exception(f"No suitable model could be loaded: {tried}")
+
+def model_load_report(model) -> str:
+    """One-line startup report: resolved model, backend, load time and the candidates skipped before it"""
+    report = (f"Model {model.resolved_model_name} ({model.inference_backend}) loaded in "
+              f"{model.load_seconds:.1f}s{'' if MODEL_ONLINE else ', offline'}")
+    skipped = getattr(model, "skipped_models", [])
+    if skipped:
+        report += "; skipped " + ", ".join(f"{name} ({reason.split(':')[0]})" for name, reason in skipped)
+    return report
+
+# Field pairs of the kinds the comparison sees, scored by check_backend_accuracy
+GOLDEN_SIMILARITY_PAIRS = [
+    ("LB5735SILHOUETTE", "LB 5735"),
+    ("Bikini Vsd", "Bikini"),
+    ("Hipster Panty", "Thong"),
+    ("VSD# 431650-QD4 | VSS# 11276861", "VSS# 11276861(PO)"),
+    ("S-772, M-1228, L-300", "S-772.0, M-1228.0, L-300.0"),
+    ("XS-120, S-340, M-410", "S-340.0, M-410.0, L-95.0"),
+    ("36013779", "36013779"),
+    ("09/25", "10/25"),
+    ("Sri Lanka", "Sri Lanka"),
+    ("Sri Lanka", "Bangladesh"),
+    ("exclusive of decoration", "exclusive of trims and decoration"),
+    ("cotton - 95%, elastane - 5%", "95% cotton, 5% elastane"),
+    ("body: nylon - 80%, elastane - 20%", "polyester - 100%"),
+    ("BEL + Colombo", "BEL Colombo"),
+    ("Victoria's Secret Stores, Columbus OH", "BEL Colombo"),
+]
+# Largest semantic score change (0-100 points) accepted from a quantized/ONNX backend
+BACKEND_SCORE_TOLERANCE = 2.0
+
+def check_backend_accuracy(model, reference_model,
+                           pairs: List[Tuple[str, str]] = GOLDEN_SIMILARITY_PAIRS) -> Dict[str, float]:
+    """Semantic scores of model against the fp32 reference_model on a golden set of (WO, PO) values
+
+    Reports the largest and mean score difference in points, the share of pairs whose
+    combined fuzzy/semantic verdict is unchanged, and the encode speedup over the reference.
+    """
+    if not pairs:
+        raise ValueError("No golden pairs to score the backend on")
+    wo_texts = [clean_field(wo) for wo, _ in pairs]
+    po_texts = [clean_field(po) for _, po in pairs]
+    fuzzy_scores = [fuzz.token_set_ratio(wo, po) for wo, po in zip(wo_texts, po_texts)]
+   
+    scores, seconds = {}, {}
+    for name, scorer in (("reference", reference_model), ("model", model)):
+        scorer.encode(wo_texts[:1])  # warm-up, so one-off initialisation is not timed
+        start = time.perf_counter()
+        scores[name] = np.array(semantic_similarity_batch(scorer, wo_texts, po_texts))
+        seconds[name] = time.perf_counter() - start
+   
+    verdicts = {
+        name: [similarity_verdict(combined_score(fuzzy, semantic)) for fuzzy, semantic in zip(fuzzy_scores, values)]
+        for name, values in scores.items()
+    }
+    differences = np.abs(scores["model"] - scores["reference"])
+    return {
+        "pairs": len(pairs),
+        "max_score_diff": float(differences.max()),
+        "mean_score_diff": float(differences.mean()),
+        "verdict_agreement": float(np.mean([a == b for a, b in zip(verdicts["model"], verdicts["reference"])])),
+        "speedup": seconds["reference"] / max(seconds["model"], 1e-9),
+    }